@@ -0,0 +1,141 @@
+# api/index.py
+# Punto de entrada serverless (ver vercel.json). Sirve los artefactos generados con
+# `python -m modulos.artefactos` usando solo la biblioteca estándar: no importa
+# pandas, plotly, dash ni openpyxl, ni recalcula agregados. Si no hay artefactos
+# se usa la aplicación Dash completa, importada recién en la primera petición.
+import time
+
+INICIO_IMPORTACION = time.perf_counter()
+
+import json
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from modulos.artefactos import DIRECTORIO_ARTEFACTOS, NOMBRE_MANIFIESTO
+from modulos.compresion import codificaciones_aceptadas
+
+TIPOS_CONTENIDO = {
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+    '.js': 'application/javascript',
+    '.css': 'text/css',
+}
+
+# Los archivos pedidos con ?v=<versión> (como los enlaza la página) se guardan en
+# el navegador sin volver a preguntar; el resto se revalida con su ETag
+CACHE_VERSIONADO = 'public, max-age=31536000, immutable'
+CACHE_PAGINA = 'public, max-age=0, must-revalidate'
+
+
+def _leer_manifiesto():
+    try:
+        with open(os.path.join(DIRECTORIO_ARTEFACTOS, NOMBRE_MANIFIESTO), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return None
+
+
+manifiesto = _leer_manifiesto()
+if manifiesto is None:
+    # Sin artefactos el arranque en frío importa la aplicación completa: se avisa en
+    # el log para que no pase inadvertido (por ejemplo, en un despliegue desde git)
+    print('No hay artefactos en %s: se usará la aplicación Dash completa (genérelos con '
+          'python -m modulos.artefactos antes de desplegar)' % DIRECTORIO_ARTEFACTOS, file=sys.stderr)
+
+# Contenido de los archivos ya leídos (cada uno se lee una sola vez por instancia)
+_contenidos = {}
+
+# Aplicación Dash completa, solo si no hay artefactos
+_aplicacion_completa = None
+
+arranque = {
+    'importacion_ms': round((time.perf_counter() - INICIO_IMPORTACION) * 1000, 2),
+    'primera_peticion_ms': None,
+    'peticiones': 0,
+    'modo': 'artefactos' if manifiesto is not None else 'completo',
+    'version': manifiesto['version'] if manifiesto is not None else None,
+}
+
+
+def _contenido(nombre, comprimido):
+    clave = nombre + '.gz' if comprimido else nombre
+    if clave not in _contenidos:
+        with open(os.path.join(DIRECTORIO_ARTEFACTOS, clave), 'rb') as archivo:
+            _contenidos[clave] = archivo.read()
+    return _contenidos[clave]
+
+
+def _responder(start_response, estado, cuerpo, cabeceras):
+    start_response(estado, cabeceras + [('Content-Length', str(len(cuerpo)))])
+    return [cuerpo]
+
+
+def _servir_artefacto(environ, start_response, cabeceras_extra):
+    nombre = environ.get('PATH_INFO', '/').lstrip('/') or 'index.html'
+    # Solo se sirven los archivos listados en el manifiesto
+    if nombre not in manifiesto['archivos']:
+        return _responder(start_response, '404 Not Found', b'No encontrado', [('Content-Type', 'text/plain; charset=utf-8')] + cabeceras_extra)
+
+    etiqueta = '"%s-%s"' % (manifiesto['version'], nombre)
+    cabeceras = [
+        ('ETag', etiqueta),
+        ('Cache-Control', CACHE_VERSIONADO if environ.get('QUERY_STRING') == 'v=' + manifiesto['version'] else CACHE_PAGINA),
+        ('Vary', 'Accept-Encoding'),
+    ] + cabeceras_extra
+    if environ.get('HTTP_IF_NONE_MATCH') == etiqueta:
+        return _responder(start_response, '304 Not Modified', b'', cabeceras)
+
+    comprimido = 'gzip' in codificaciones_aceptadas(environ.get('HTTP_ACCEPT_ENCODING', ''))
+    cabeceras.append(('Content-Type', TIPOS_CONTENIDO[os.path.splitext(nombre)[1]]))
+    if comprimido:
+        cabeceras.append(('Content-Encoding', 'gzip'))
+    return _responder(start_response, '200 OK', _contenido(nombre, comprimido), cabeceras)
+
+
+def app(environ, start_response):
+    """
+    Aplicación WSGI del modo serverless.
+
+    Sirve la página, las figuras ya serializadas, los agregados, plotly.js y los
+    estilos desde la carpeta de artefactos, con la versión gzip cuando el cliente la
+    acepta. `/_arranque` devuelve los tiempos de arranque de la instancia; la primera
+    petición de cada instancia (arranque en frío) los informa además en la cabecera
+    Server-Timing y en el log.
+    """
+    global _aplicacion_completa
+    arranque['peticiones'] += 1
+    primera = arranque['primera_peticion_ms'] is None
+    cabeceras_extra = []
+    if primera:
+        arranque['primera_peticion_ms'] = round((time.perf_counter() - INICIO_IMPORTACION) * 1000, 2)
+        cabeceras_extra.append(('Server-Timing', 'importacion;dur=%s, arranque;dur=%s' % (arranque['importacion_ms'], arranque['primera_peticion_ms'])))
+        print('Arranque en frío (%s): importación %.1f ms, primera petición a los %.1f ms' % (
+            arranque['modo'], arranque['importacion_ms'], arranque['primera_peticion_ms']), file=sys.stderr)
+
+    if environ.get('PATH_INFO') == '/_arranque':
+        cuerpo = json.dumps(dict(arranque, frio=primera)).encode('utf-8')
+        return _responder(start_response, '200 OK', cuerpo, [('Content-Type', 'application/json'), ('Cache-Control', 'no-store')] + cabeceras_extra)
+
+    if manifiesto is not None:
+        return _servir_artefacto(environ, start_response, cabeceras_extra)
+
+    if _aplicacion_completa is None:
+        inicio = time.perf_counter()
+        # En la plataforma solo se puede escribir en /tmp: la cache columnar (y la
+        # base SQLite, que va junto a ella) se guardan ahí salvo que se indique otra
+        import tempfile
+        os.environ.setdefault('DASHBOARD_DIR_CACHE', os.path.join(tempfile.gettempdir(), 'dashboard-cache'))
+        from main import server as _aplicacion_completa
+        arranque['carga_aplicacion_completa_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+    return _aplicacion_completa(environ, start_response)
+
+
+if __name__ == '__main__':
+    from wsgiref.simple_server import make_server
+
+    print('Sirviendo %s en http://127.0.0.1:8050' % (DIRECTORIO_ARTEFACTOS if manifiesto else 'la aplicación completa'))
+    make_server('127.0.0.1', 8050, app).serve_forever()
@@ -0,0 +1,52 @@
+// Carga diferida de gráficos: cuando una tarjeta entra en pantalla se hace click
+// en su centinela, lo que dispara el callback de Dash que genera la figura.
+(function () {
+    var vistos = new WeakSet();
+
+    function activar(centinela) {
+        if (vistos.has(centinela)) {
+            return;
+        }
+        vistos.add(centinela);
+        centinela.click();
+    }
+
+    var observador = null;
+    if ('IntersectionObserver' in window) {
+        observador = new IntersectionObserver(function (entradas) {
+            entradas.forEach(function (entrada) {
+                if (entrada.isIntersecting) {
+                    observador.unobserve(entrada.target);
+                    activar(entrada.target);
+                }
+            });
+        }, {rootMargin: '200px'});
+    }
+
+    function registrar() {
+        document.querySelectorAll('.centinela-diferido').forEach(function (centinela) {
+            if (vistos.has(centinela) || centinela.dataset.observado) {
+                return;
+            }
+            centinela.dataset.observado = '1';
+            if (observador) {
+                observador.observe(centinela);
+            } else {
+                // Sin IntersectionObserver se cargan todos los gráficos de inmediato
+                activar(centinela);
+            }
+        });
+    }
+
+    function iniciar() {
+        // Dash dibuja el layout después de cargar este script
+        new MutationObserver(registrar).observe(document.body, {childList: true, subtree: true});
+        registrar();
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', iniciar);
+    } else {
+        iniciar();
+    }
+})();
@@ -1,73 +1,509 @@
+import hashlib
+import json
+import os
+from functools import lru_cache, reduce
+
 import dash
-from dash import dcc, html
-import pandas as pd
+from dash import dash_table, dcc, html, Input, Output, State
+from dash.exceptions import PreventUpdate
 
 # Importar funciones desde módulos locales
-from modulos.preparar_datos import preparar_columnas_fecha
-from modulos.Proveedores_Principales import (
-    crear_barras_proveedores_top,
-    crear_barras_monto_total,
-    crear_barras_monto_promedio
+from modulos.agregados import combinar_agregados
+from modulos.almacen_sqlite import abrir_almacen
+from modulos.cache_figuras import CacheFiguras
+from modulos.carga_multiple import cargar_fuentes, es_origen_multiple, firma_fuentes, listar_fuentes
+from modulos.carga_por_bloques import agregar_por_bloques
+from modulos.cargar_datos import cargar_datos_versionados, hash_archivo, version_datos
+from modulos.compactar_figuras import OPTIMIZAR_CARGA
+from modulos.compresion import comprimir_respuestas
+from modulos.construccion_paralela import construir_figuras
+from modulos.dataset import DatasetFacturas, crear_dataset, filtrar_dataset
+from modulos.desglose_facturas import COLUMNAS_DESGLOSE, FILAS_POR_PAGINA, limpiar_ordenes, pagina_facturas
+from modulos.figuras import GRAFICOS, GRAFICOS_POR_ID
+from modulos.instrumentacion import INSTRUMENTACION, instrumentar_servidor, metricas
+from modulos.recarga import Recargador
+from modulos.reduccion_puntos import puntos_para_ancho
+
+# Modo de renderizado de los gráficos:
+#   'diferido'  -> el layout solo trae contenedores vacíos y cada figura se genera en
+#                  su propio callback cuando el gráfico entra en pantalla
+#   'inmediato' -> todas las figuras se construyen al importar (comportamiento original)
+MODO_RENDER = os.environ.get('DASHBOARD_RENDER', 'diferido')
+
+# Modo de carga de datos:
+#   'completo' -> se cargan todas las facturas (desde la cache columnar)
+#   'bloques'  -> el archivo se lee por bloques y solo se guardan los agregados;
+#                 la memoria queda acotada, pero no hay filtros ni detalle por factura
+#   'sqlite'   -> las facturas se cargan en una base SQLite compartida por todos los
+#                 workers y los agregados, los filtros y la tabla de facturas se
+#                 resuelven con consultas (ver modulos.almacen_sqlite)
+MODO_DATOS = os.environ.get('DASHBOARD_MODO_DATOS', 'completo')
+
+# Construcción de las figuras sin filtros al arrancar y al recargar los datos:
+#   'secuencial' -> cada figura se construye cuando se pide (comportamiento original)
+#   'hilos' / 'procesos' -> todas se construyen a la vez en un pool y quedan en la
+#                  cache, así que la espera es la del gráfico más lento
+MODO_CONSTRUCCION = os.environ.get('DASHBOARD_CONSTRUCCION', 'secuencial')
+TRABAJADORES = int(os.environ['DASHBOARD_TRABAJADORES']) if os.environ.get('DASHBOARD_TRABAJADORES') else None
+
+# Archivo de datos, o una carpeta / patrón glob con varios archivos xlsx o csv (por
+# ejemplo, uno por unidad de negocio y mes) que se cargan juntos
+RUTA_DATOS = os.environ.get('DASHBOARD_DATOS', "data_proveedores.xlsx")
+MULTIPLES_FUENTES = es_origen_multiple(RUTA_DATOS)
+
+# Cada cuántos segundos se revisa si hay una versión nueva de los datos (por
+# ejemplo, un lote anexado con modulos.ingesta o un Excel reemplazado)
+INTERVALO_REVISION = float(os.environ.get('DASHBOARD_INTERVALO_REVISION', 30))
+
+
+def cargar_dataset():
+    """
+    Carga el dataset desde la cache columnar (solo se lee el Excel si cambió).
+    El dataset es de solo lectura y trae los agregados compartidos por los gráficos.
+    """
+    with metricas.etapa('carga'):
+        if MODO_DATOS == 'bloques':
+            rutas = listar_fuentes(RUTA_DATOS)
+            huellas = [hash_archivo(ruta) for ruta in rutas]
+            return DatasetFacturas(
+                facturas=None,
+                agregados=reduce(combinar_agregados, [agregar_por_bloques(ruta) for ruta in rutas]),
+                version=(huellas[0] if len(huellas) == 1 else hashlib.sha256(''.join(huellas).encode('utf-8')).hexdigest())[:16],
+            )
+        if MODO_DATOS == 'sqlite':
+            almacen = abrir_almacen(RUTA_DATOS)
+            return DatasetFacturas(facturas=None, agregados=almacen.agregados(), version=almacen.version, almacen=almacen)
+        if MULTIPLES_FUENTES:
+            df, agregados, version, _ = cargar_fuentes(RUTA_DATOS)
+        else:
+            df, agregados, version = cargar_datos_versionados(RUTA_DATOS)
+        with metricas.etapa('carga.dataset'):
+            return crear_dataset(df, version=version, agregados=agregados)
+
+
+def _firma_datos():
+    if MULTIPLES_FUENTES:
+        return firma_fuentes(RUTA_DATOS)
+    return version_datos(RUTA_DATOS), os.stat(RUTA_DATOS).st_mtime_ns
+
+
+def _preparar_dataset(nuevo):
+    # Todo lo costoso de una versión nueva se hace antes de publicarla, fuera de
+    # las peticiones: el índice de filtros y las figuras sin filtros
+    if nuevo.facturas is not None:
+        nuevo.indice
+    precalentar_figuras(nuevo)
+
+
+def _al_publicar(anterior, nueva):
+    # Las caches de filtros y de órdenes se indexan por dataset: las entradas de la
+    # versión anterior ya no se usan
+    if anterior is not None:
+        dataset_filtrado.cache_clear()
+        limpiar_ordenes()
+    # Las figuras en disco de otras versiones de los datos tampoco
+    cache_figuras.descartar_versiones(nueva.datos.version)
+
+
+# El dataset vigente se publica con un reemplazo atómico de referencia; un hilo
+# revisa el origen cada INTERVALO_REVISION segundos y prepara la versión nueva
+# en segundo plano (ver modulos.recarga)
+recargador = Recargador(
+    cargar_dataset, _firma_datos, INTERVALO_REVISION, preparar=_preparar_dataset, al_publicar=_al_publicar,
 )
-from modulos.emision_recepcion_pago import crear_grafico_fecha_proveedor
-from modulos.tendencia_comparativa import crear_tendencia_comparativa_costos
-from modulos.Tendencia_diaria_evolutiva import crear_tendencia_costos
-from modulos.tendencia_evolutiva_mensual import crear_tendencia_mensual_costos
 
-# Cargar y preparar datos
-df = pd.read_excel("data_proveedores.xlsx")
-df = preparar_columnas_fecha(df)
+
+def obtener_dataset():
+    """
+    Devuelve el dataset vigente. Nunca espera una recarga: mientras se prepara una
+    versión nueva se sigue respondiendo con la anterior.
+    """
+    return recargador.vigente()
+
+
+# Cache de figuras serializadas: LRU en memoria y, si se configura una carpeta,
+# un nivel en disco compartido por todos los workers
+cache_figuras = CacheFiguras(
+    max_entradas=int(os.environ.get('DASHBOARD_CACHE_FIGURAS_MAX', 64)),
+    directorio=os.environ.get('DASHBOARD_DIR_CACHE_FIGURAS'),
+)
+
+
+def _parametros_figura(desde=None, hasta=None, proveedores=()):
+    parametros = {'desde': desde, 'hasta': hasta, 'proveedores': list(proveedores)}
+    if OPTIMIZAR_CARGA:
+        # Las figuras compactadas no se mezclan con las normales en la cache en disco
+        parametros['compacta'] = True
+    return parametros
+
+
+def precalentar_figuras(base):
+    """
+    Construye en paralelo (según MODO_CONSTRUCCION) las figuras sin filtros que aún
+    no están en la cache y las guarda en ella.
+    """
+    if MODO_CONSTRUCCION == 'secuencial':
+        return
+    parametros = _parametros_figura()
+    pendientes = [grafico for grafico in GRAFICOS if cache_figuras.buscar(grafico.id, parametros, base.version) is None]
+    with metricas.etapa('precalentar'):
+        figuras = construir_figuras(base, pendientes, MODO_CONSTRUCCION, TRABAJADORES)
+    for id_grafico, figura_json in figuras.items():
+        cache_figuras.guardar(id_grafico, parametros, base.version, figura_json)
+
+
+# Carga inicial (y precalentado) al importar, como antes
+recargador.publicacion
+
+
+# Cantidad de proveedores que se ofrecen en el filtro mientras se escribe
+MAX_OPCIONES_PROVEEDOR = 50
+
+
+@lru_cache(maxsize=8)
+def dataset_filtrado(base, desde, hasta, proveedores):
+    """
+    Devuelve (y memoriza) el dataset filtrado; todos los gráficos de una misma
+    interacción comparten el mismo subconjunto.
+    """
+    with metricas.etapa('filtro'):
+        return filtrar_dataset(base, desde, hasta, list(proveedores) or None)
+
+
+def obtener_figura(id_grafico, desde=None, hasta=None, proveedores=None, rango_x=None, ancho=None):
+    """
+    Devuelve la figura del gráfico indicado desde la cache (construyéndola si falta).
+    `rango_x` es el tramo visible tras un zoom y `ancho` el ancho en píxeles del
+    gráfico en el navegador, que fija cuántos puntos se envían (ver
+    `reduccion_puntos.puntos_para_ancho`); ambos solo para gráficos con zoom.
+    """
+    grafico = GRAFICOS_POR_ID[id_grafico]
+    base = obtener_dataset()
+    proveedores = tuple(sorted(proveedores or []))
+    parametros = _parametros_figura(desde, hasta, proveedores)
+    argumentos = {}
+    if rango_x is not None:
+        parametros['rango_x'] = argumentos['rango_x'] = list(rango_x)
+    if grafico.zoom and ancho:
+        parametros['max_puntos'] = argumentos['max_puntos'] = puntos_para_ancho(ancho)
+
+    def construir():
+        datos = dataset_filtrado(base, desde, hasta, proveedores)
+        with metricas.etapa('figura.' + grafico.id):
+            return grafico.crear(datos, **argumentos)
+
+    figura_json = cache_figuras.obtener(grafico.id, parametros, base.version, construir)
+    metricas.registrar_bytes('figura.' + grafico.id, len(figura_json))
+    return json.loads(figura_json)
+
+
+def rango_zoom(relayout):
+    """
+    Extrae el tramo del eje X de un evento `relayoutData` de un dcc.Graph.
+
+    Returns:
+        rango: Tupla (desde, hasta) tras un zoom, 'completo' si se volvió a la vista
+        completa (doble clic o autoescala) o None si el evento no cambió el eje X.
+    """
+    if not relayout:
+        return None
+    if relayout.get('xaxis.autorange'):
+        return 'completo'
+    if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+        return relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'][:2])
+    return None
+
+
+def opciones_proveedores(busqueda=None, seleccionados=None):
+    """
+    Devuelve las opciones del filtro de proveedores: los seleccionados más los que
+    coinciden con la búsqueda (o los de más facturas si no se escribió nada).
+    """
+    por_proveedor = obtener_dataset().agregados.por_proveedor
+    if busqueda:
+        nombres = por_proveedor.index[por_proveedor.index.str.contains(busqueda, case=False, regex=False)]
+    else:
+        nombres = por_proveedor['Número de Facturas'].nlargest(MAX_OPCIONES_PROVEEDOR).index
+    nombres = list(seleccionados or []) + [nombre for nombre in nombres[:MAX_OPCIONES_PROVEEDOR] if nombre not in (seleccionados or [])]
+    return [{'label': nombre, 'value': nombre} for nombre in nombres]
+
+
+def crear_filtros():
+    """
+    Crea la tarjeta con los filtros de rango de fechas y proveedores.
+    """
+    base = obtener_dataset()
+    fechas = base.agregados.por_dia.index
+    # Con el dataset cargado solo como agregados no se puede filtrar por factura
+    estilo = {'display': 'none'} if base.facturas is None and base.almacen is None else None
+    return html.Div([
+        html.H2("Filtros", className="card-title"),
+        html.Div([
+            dcc.DatePickerRange(
+                id='filtro-fechas',
+                min_date_allowed=fechas[0].date() if len(fechas) else None,
+                max_date_allowed=fechas[-1].date() if len(fechas) else None,
+                display_format='DD-MM-YYYY',
+                clearable=True,
+            ),
+            dcc.Dropdown(
+                id='filtro-proveedores',
+                options=opciones_proveedores(),
+                multi=True,
+                placeholder="Todos los proveedores",
+                className="filtro-proveedores",
+            ),
+        ], className="filtros"),
+    ], className="card", style=estilo)
+
+
+def _contenedor_detalle(grafico):
+    # Contenedor para el detalle del punto bajo el mouse (solo gráficos con detalle)
+    if grafico.detalle is None:
+        return []
+    return [html.Div(id=grafico.id + '-detalle', className="detalle-punto")]
+
+
+def _contenedor_ancho(grafico):
+    # Ancho del gráfico en el navegador (solo gráficos con zoom), que completa
+    # `registrar_callback_ancho`
+    if not grafico.zoom:
+        return []
+    return [dcc.Store(id=grafico.id + '-ancho')]
+
+
+def crear_tarjeta(grafico):
+    """
+    Crea la tarjeta del layout para un gráfico, con la figura o con un contenedor vacío.
+    """
+    if MODO_RENDER == 'inmediato':
+        return html.Div([
+            html.H2(grafico.titulo, className="card-title"),
+            html.Div(id=grafico.id + '-centinela'),
+            dcc.Graph(id=grafico.id, figure=obtener_figura(grafico.id)),
+        ] + _contenedor_ancho(grafico) + _contenedor_detalle(grafico), className="card")
+
+    # El centinela se "clickea" desde assets/graficos_diferidos.js cuando la tarjeta
+    # se vuelve visible, lo que dispara el callback que genera la figura
+    return html.Div([
+        html.H2(grafico.titulo, className="card-title"),
+        html.Div(id=grafico.id + '-centinela', className="centinela-diferido"),
+        dcc.Loading(dcc.Graph(id=grafico.id, figure={})),
+    ] + _contenedor_ancho(grafico) + _contenedor_detalle(grafico), className="card")
+
+
+def crear_desglose():
+    """
+    Crea la tarjeta con la tabla de facturas del proveedor elegido al hacer clic en
+    una barra. La tabla se pagina y ordena en el servidor: solo viaja la página visible.
+    """
+    columnas = [
+        {'name': nombre, 'id': nombre, 'type': 'numeric' if nombre in ('Nº Factura', 'Monto Total') else 'text'}
+        for nombre in COLUMNAS_DESGLOSE
+    ]
+    columnas[COLUMNAS_DESGLOSE.index('Monto Total')]['format'] = dash_table.FormatTemplate.money(0)
+    # Sin facturas cargadas (modo por bloques) no hay desglose
+    base = obtener_dataset()
+    estilo = {'display': 'none'} if base.facturas is None and base.almacen is None else None
+    return html.Div([
+        html.H2("Facturas del Proveedor", className="card-title"),
+        html.Div("Haga clic en una barra de proveedor para ver sus facturas.", id='desglose-proveedor-titulo', className="detalle-punto"),
+        dcc.Store(id='desglose-proveedor'),
+        dash_table.DataTable(
+            id='tabla-desglose',
+            columns=columnas,
+            data=[],
+            page_current=0,
+            page_size=FILAS_POR_PAGINA,
+            page_count=0,
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='single',
+            sort_by=[],
+            style_table={'overflowX': 'auto'},
+            style_header={'backgroundColor': '#1e1e1e', 'color': '#e5e8f0', 'fontWeight': 'bold'},
+            style_cell={'backgroundColor': '#2b2b2b', 'color': '#e5e8f0', 'textAlign': 'left'},
+        ),
+    ], className="card", style=estilo)
+
 
 # Crear aplicación Dash
 app = dash.Dash(__name__)
 app.title = "Panel de Proveedores"
 
+def crear_layout():
+    """
+    Crea el layout de la app; se evalúa en cada carga de página para reflejar la
+    versión vigente de los datos.
+    """
+    tarjetas = [crear_tarjeta(grafico) for grafico in GRAFICOS]
+    # La tabla de facturas va a continuación del último gráfico de proveedores
+    posicion = max(i for i, grafico in enumerate(GRAFICOS) if grafico.desglose) + 1
+    tarjetas.insert(posicion, crear_desglose())
+    return html.Div(
+        [html.H1("Análisis de Proveedores", className="header-title"), crear_filtros()] + tarjetas
+    )
+
+
 # Layout de la app
-app.layout = html.Div([
-    html.H1("Análisis de Proveedores", className="header-title"),
-
-    html.Div([
-        html.H2("Top 10 Proveedores por Número de Facturas", className="card-title"),
-        dcc.Graph(id='top-proveedores', figure=crear_barras_proveedores_top(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Proveedores por Monto Total", className="card-title"),
-        dcc.Graph(id='grafico-monto-total', figure=crear_barras_monto_total(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Proveedores por Monto Promedio", className="card-title"),
-        dcc.Graph(id='grafico-monto-promedio', figure=crear_barras_monto_promedio(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Tendencia Diaria Evolutiva de los Costos", className="card-title"),
-        dcc.Graph(id='tendencia-diaria-evolutiva', figure=crear_tendencia_costos(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Tendencia Evolutiva Mensual de los Costos", className="card-title"),
-        dcc.Graph(id='tendencia-evolutiva-mensual', figure=crear_tendencia_mensual_costos(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Tendencia Comparativa de los Costos (2023 - 2025)", className="card-title"),
-        dcc.Graph(id='tendencia-comparativa', figure=crear_tendencia_comparativa_costos(df)),
-    ], className="card"),
-
-    html.Div([
-        html.H2("Fechas de Emisión, Recepción y Pago", className="card-title"),
-        dcc.Graph(id='grafico-fechas', figure=crear_grafico_fecha_proveedor(df)),
-    ], className="card"),
-])
+app.layout = crear_layout
+
+
+def registrar_callback_figura(grafico):
+    entradas = [
+        Input(grafico.id + '-centinela', 'n_clicks'),
+        Input('filtro-fechas', 'start_date'),
+        Input('filtro-fechas', 'end_date'),
+        Input('filtro-proveedores', 'value'),
+    ]
+    if grafico.zoom:
+        # Al hacer zoom se vuelve a generar la figura solo para el tramo visible,
+        # con tantos puntos como permita el ancho del gráfico
+        entradas.append(Input(grafico.id, 'relayoutData'))
+        entradas.append(Input(grafico.id + '-ancho', 'data'))
+
+    @app.callback(Output(grafico.id, 'figure'), *entradas, prevent_initial_call=True)
+    def actualizar_figura(n_clicks, desde, hasta, proveedores, relayout=None, ancho=None):
+        # En modo diferido, un gráfico que aún no entró en pantalla no se genera;
+        # cuando sea visible el centinela lo pedirá con los filtros vigentes
+        if MODO_RENDER != 'inmediato' and not n_clicks:
+            raise PreventUpdate
+        rango = rango_zoom(relayout)
+        disparadores = {disparo['prop_id'] for disparo in dash.callback_context.triggered}
+        if disparadores == {grafico.id + '.relayoutData'} and rango is None:
+            # Eventos que no cambian el eje X (autosize, arrastre en Y, etc.)
+            raise PreventUpdate
+        # El zoom vigente se conserva también cuando cambian los filtros
+        return obtener_figura(grafico.id, desde, hasta, proveedores, None if rango in (None, 'completo') else rango, ancho)
+
+
+def registrar_callback_ancho(grafico):
+    # Guarda el ancho del gráfico en el navegador al mostrarlo y cuando cambia (el
+    # redimensionado de la ventana llega como un relayoutData con autosize)
+    app.clientside_callback(
+        """
+        function (n_clicks, relayout, anterior) {
+            var grafico = document.getElementById('%s');
+            var ancho = grafico ? Math.round(grafico.getBoundingClientRect().width) : 0;
+            if (!ancho || ancho === anterior) {
+                return window.dash_clientside.no_update;
+            }
+            return ancho;
+        }
+        """ % grafico.id,
+        Output(grafico.id + '-ancho', 'data'),
+        Input(grafico.id + '-centinela', 'n_clicks'),
+        Input(grafico.id, 'relayoutData'),
+        State(grafico.id + '-ancho', 'data'),
+    )
+
+
+def registrar_callback_detalle(grafico):
+    @app.callback(
+        Output(grafico.id + '-detalle', 'children'),
+        Input(grafico.id, 'hoverData'),
+        State('filtro-fechas', 'start_date'),
+        State('filtro-fechas', 'end_date'),
+        State('filtro-proveedores', 'value'),
+        prevent_initial_call=True,
+    )
+    def mostrar_detalle(hover, desde, hasta, proveedores):
+        # El detalle de cada punto no viaja con la figura: se consulta al pasar el mouse
+        if not hover or not hover.get('points'):
+            raise PreventUpdate
+        datos = dataset_filtrado(obtener_dataset(), desde, hasta, tuple(sorted(proveedores or [])))
+        detalle = grafico.detalle(datos, hover['points'][0])
+        if detalle is None:
+            return []
+        return [html.Span([html.B(campo + ': '), valor]) for campo, valor in detalle.items()]
+
+
+for grafico in GRAFICOS:
+    registrar_callback_figura(grafico)
+    if grafico.zoom:
+        registrar_callback_ancho(grafico)
+    if grafico.detalle is not None:
+        registrar_callback_detalle(grafico)
+
+
+@app.callback(
+    Output('desglose-proveedor', 'data'),
+    Output('tabla-desglose', 'page_current'),
+    *[Input(grafico.id, 'clickData') for grafico in GRAFICOS if grafico.desglose],
+    prevent_initial_call=True,
+)
+def seleccionar_proveedor(*clics):
+    # El clic en una barra elige el proveedor del desglose y vuelve a la primera página
+    disparador = dash.callback_context.triggered[0] if dash.callback_context.triggered else {}
+    clic = disparador.get('value')
+    if not clic or not clic.get('points'):
+        raise PreventUpdate
+    proveedor = clic['points'][0].get('x')
+    base = obtener_dataset()
+    # La barra "Otros" no corresponde a un proveedor
+    if (base.facturas is None and base.almacen is None) or proveedor not in base.agregados.por_proveedor.index:
+        raise PreventUpdate
+    return proveedor, 0
+
+
+@app.callback(
+    Output('tabla-desglose', 'data'),
+    Output('tabla-desglose', 'page_count'),
+    Output('desglose-proveedor-titulo', 'children'),
+    Input('desglose-proveedor', 'data'),
+    Input('tabla-desglose', 'page_current'),
+    Input('tabla-desglose', 'sort_by'),
+    Input('filtro-fechas', 'start_date'),
+    Input('filtro-fechas', 'end_date'),
+    prevent_initial_call=True,
+)
+def actualizar_desglose(proveedor, pagina, orden, desde, hasta):
+    if not proveedor:
+        raise PreventUpdate
+    if orden:
+        orden = (orden[0]['column_id'], orden[0]['direction'] == 'desc')
+    with metricas.etapa('desglose'):
+        registros, total = pagina_facturas(obtener_dataset(), proveedor, desde, hasta, pagina or 0, FILAS_POR_PAGINA, orden or None)
+    paginas = max(1, -(-total // FILAS_POR_PAGINA))
+    return registros, paginas, '%s: %s facturas' % (proveedor, format(total, ',').replace(',', '.'))
+
+
+@app.callback(
+    Output('filtro-proveedores', 'options'),
+    Input('filtro-proveedores', 'search_value'),
+    State('filtro-proveedores', 'value'),
+    prevent_initial_call=True,
+)
+def actualizar_opciones_proveedores(busqueda, seleccionados):
+    return opciones_proveedores(busqueda, seleccionados)
 
 # Necesario para Render
 server = app.server
 
-# Ejecutar localmente
-if __name__ == '__main__':
-    app.run_server(debug=True)
 
+def estado_caches():
+    """
+    Información de las caches y de los datos vigentes para el endpoint de métricas.
+    """
+    return {
+        'version_datos': obtener_dataset().version,
+        'recarga': recargador.estado(),
+        'cache_figuras': cache_figuras.estadisticas(),
+        'cache_filtros': dataset_filtrado.cache_info()._asdict(),
+    }
 
 
+# Cabeceras Server-Timing y endpoint de métricas (solo con DASHBOARD_INSTRUMENTACION=1)
+if INSTRUMENTACION:
+    instrumentar_servidor(server, estado_caches)
+
+# Compresión gzip/brotli de las respuestas (se registra al final para que sea lo
+# primero que se aplica a la respuesta y la instrumentación mida lo que se envía)
+if OPTIMIZAR_CARGA:
+    comprimir_respuestas(server)
+
+# Ejecutar localmente
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -1,18 +1,24 @@
 import plotly.express as px
 import pandas as pd
 
-def crear_barras_proveedores_top(df):
+from modulos.agregados import obtener_agregados
+from modulos.ranking import TOP_PROVEEDORES
+
+def crear_barras_proveedores_top(datos, n=None, otros=None):
     """
-    Crea un gráfico de barras con los 10 proveedores principales por número de facturas.
+    Crea un gráfico de barras con los proveedores principales por número de facturas.
     
     Args:
-        df: DataFrame con los datos de proveedores.
+        datos: Agregados precalculados (o DataFrame con los datos de proveedores).
+        n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+        otros: Agregar una barra "Otros" con el resto de los proveedores (por defecto BARRA_OTROS).
     
     Returns:
         fig: Figura de plotly con el gráfico de barras.
     """
-    # Análisis de los 10 proveedores principales por número de facturas
-    top_providers = df['Proveedor Facturador'].value_counts().head(10)
+    # Análisis de los proveedores principales por número de facturas
+    n = TOP_PROVEEDORES if n is None else n
+    top_providers = obtener_agregados(datos).ranking.top('Número de Facturas', n, otros)
     
     # Convertimos el índice (proveedores) en una columna del DataFrame para evitar el conflicto
     top_providers_df = top_providers.reset_index()
@@ -24,7 +30,7 @@ def crear_barras_proveedores_top(df):
         x='Proveedor',
         y='Número de Facturas',
         labels={'x': 'Proveedor', 'y': 'Número de Facturas'},
-        title='Top 10 Proveedores por Número de Facturas',
+        title='Top %d Proveedores por Número de Facturas' % n,
         text='Número de Facturas',
         hover_data={'Proveedor': True},
         color='Número de Facturas',
@@ -55,19 +61,22 @@ def crear_barras_proveedores_top(df):
     return fig
 
 
-def crear_barras_monto_total(df):
+def crear_barras_monto_total(datos, n=None, otros=None):
     """
     Crea un gráfico de barras con el monto total por proveedor.
     
     Args:
-        df: DataFrame con los datos de proveedores.
+        datos: Agregados precalculados (o DataFrame con los datos de proveedores).
+        n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+        otros: Agregar una barra "Otros" con el resto de los proveedores (por defecto BARRA_OTROS).
     
     Returns:
         fig: Figura de plotly con el gráfico de barras.
     """
-    provider_amounts = df.groupby('Proveedor Facturador')['Monto Total'].sum().sort_values(ascending=False)
+    n = TOP_PROVEEDORES if n is None else n
+    provider_amounts = obtener_agregados(datos).ranking.top('Monto Total', n, otros)
     
-    provider_amounts_df = provider_amounts.head(10).reset_index()
+    provider_amounts_df = provider_amounts.reset_index()
     provider_amounts_df.columns = ['Proveedor', 'Monto Total']
     
     # Crear gráfico interactivo de barras para el monto total por proveedor
@@ -76,7 +85,7 @@ def crear_barras_monto_total(df):
         x='Proveedor',
         y='Monto Total',
         labels={'x': 'Proveedor', 'y': 'Monto Total'},
-        title='Monto Total por Proveedor (Top 10)',
+        title='Monto Total por Proveedor (Top %d)' % n,
         text='Monto Total',
         hover_data={'Proveedor': True},
         color='Monto Total',
@@ -107,19 +116,24 @@ def crear_barras_monto_total(df):
     return fig
 
 
-def crear_barras_monto_promedio(df):
+def crear_barras_monto_promedio(datos, n=None, otros=None, min_facturas=None):
     """
     Crea un gráfico de barras con el monto promedio por proveedor.
     
     Args:
-        df: DataFrame con los datos de proveedores.
+        datos: Agregados precalculados (o DataFrame con los datos de proveedores).
+        n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+        otros: Agregar una barra "Otros" con el resto de los proveedores (por defecto BARRA_OTROS).
+        min_facturas: Facturas con monto mínimas para entrar al ranking (por defecto
+            MIN_FACTURAS_PROMEDIO).
     
     Returns:
         fig: Figura de plotly con el gráfico de barras.
     """
-    average_invoice_amount = df.groupby('Proveedor Facturador')['Monto Total'].mean().sort_values(ascending=False)
+    n = TOP_PROVEEDORES if n is None else n
+    average_invoice_amount = obtener_agregados(datos).ranking.top('Monto Promedio', n, otros, min_facturas)
     
-    average_invoice_amount_df = average_invoice_amount.head(10).reset_index()
+    average_invoice_amount_df = average_invoice_amount.reset_index()
     average_invoice_amount_df.columns = ['Proveedor', 'Monto Promedio']
     
     # Crear gráfico interactivo de barras para el monto promedio por proveedor
@@ -128,7 +142,7 @@ def crear_barras_monto_promedio(df):
         x='Proveedor',
         y='Monto Promedio',
         labels={'x': 'Proveedor', 'y': 'Monto Promedio'},
-        title='Monto Promedio por Proveedor (Top 10)',
+        title='Monto Promedio por Proveedor (Top %d)' % n,
         text='Monto Promedio',
         hover_data={'Proveedor': True},
         color='Monto Promedio',
@@ -1,24 +1,27 @@
-import pandas as pd
 import plotly.express as px
 
-def crear_tendencia_costos(df):
+from modulos.agregados import obtener_agregados
+from modulos.reduccion_puntos import reducir_serie
+
+def crear_tendencia_costos(datos, rango_x=None, max_puntos=None):
     """
     Crea un gráfico de línea para la tendencia evolutiva diaria de los costos en el tiempo.
+
+    Si hay más días que `max_puntos` la serie se reduce (ver `modulos.reduccion_puntos`)
+    conservando los picos; con `rango_x` solo se dibuja el tramo visible, con el
+    detalle que permita `max_puntos`.
     
     Args:
-        df: DataFrame con los datos de facturación (Proveedor, Fecha de Emisión, Monto Total).
+        datos: Agregados precalculados (o DataFrame con los datos de facturación).
+        rango_x: Tupla (desde, hasta) con el tramo visible tras un zoom (opcional).
+        max_puntos: Máximo de puntos de la línea (por defecto MAX_PUNTOS_SERIE).
     
     Returns:
         fig: Figura de plotly con el gráfico de la tendencia evolutiva de los costos.
     """
-    # Agrupar los datos por fecha de emisión y sumar el monto total
-    cost_trend = df.groupby('Fecha de Emisión')['Monto Total'].sum().reset_index()
-
-    # Asegurar que la columna 'Fecha de Emisión' esté en formato datetime
-    cost_trend['Fecha de Emisión'] = pd.to_datetime(cost_trend['Fecha de Emisión'], format='%d-%m-%Y')
-
-    # Ordenar por fecha
-    cost_trend = cost_trend.sort_values('Fecha de Emisión')
+    # Monto total por fecha de emisión (ya agrupado en los agregados, con fechas
+    # datetime y ordenado), recortado y reducido a lo que se puede ver
+    cost_trend = reducir_serie(obtener_agregados(datos).por_dia, max_puntos, rango_x).reset_index()
 
     # Crear el gráfico de línea de tendencia usando Plotly
     fig = px.line(
@@ -51,6 +54,10 @@ def crear_tendencia_costos(df):
         showticklabels=True  # Mostrar las etiquetas de las fechas en el eje X
     )
 
+    # Tras un zoom se conserva el tramo que estaba viendo el usuario
+    if rango_x is not None:
+        fig.update_xaxes(range=list(rango_x))
+
     # Cambiar la visualización del tooltip para mostrar la fecha completa y sin el signo de peso en el monto
     fig.update_traces(
         hovertemplate="<b>%{x}</b><br>Monto Total: %{y:,.0f}<extra></extra>",  # Mostrar monto sin el signo de peso
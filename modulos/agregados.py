@@ -0,0 +1,237 @@
+# modulos/agregados.py
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from modulos.latencias import calcular_histogramas, combinar_histogramas, estadisticas_latencia
+from modulos.ranking import RankingProveedores
+
+
+@dataclass(frozen=True)
+class Agregados:
+    """
+    Agregados precalculados que comparten todos los gráficos del dashboard.
+
+    Attributes:
+        por_proveedor: DataFrame indexado por 'Proveedor Facturador' con las columnas
+            'Número de Facturas', 'Monto Total', 'Monto Promedio' y 'Facturas con Monto'
+            (facturas con monto informado, necesaria para combinar promedios).
+        por_dia: Serie con el 'Monto Total' sumado por 'Fecha de Emisión'.
+        por_mes: Serie con el 'Monto Total' sumado por mes (fin de mes), sin huecos.
+        por_anio_mes: DataFrame año x mes (filas 'Año', columnas 1 a 12) con el
+            'Monto Total' de cada mes; 0 si un mes no tuvo facturas y NaN fuera del
+            período con datos. `por_mes` se deriva de esta matriz.
+        por_fechas: DataFrame con la cantidad de facturas ('Facturas') por cada
+            combinación de 'Fecha de Emisión', 'Fecha Recepción' y 'Fecha Estimada Pago'
+            (permite dibujar el gráfico de fechas sin las facturas individuales).
+        latencias: Histogramas de los días de emisión a recepción y a pago estimado
+            por proveedor y mes de emisión (ver `modulos.latencias`).
+    """
+    por_proveedor: pd.DataFrame
+    por_dia: pd.Series
+    por_mes: pd.Series
+    por_fechas: pd.DataFrame
+    por_anio_mes: pd.DataFrame
+    latencias: pd.DataFrame
+
+    @cached_property
+    def ranking(self):
+        """
+        Ranking de proveedores (cantidad, monto total y promedio) sobre `por_proveedor`,
+        construido la primera vez que se usa.
+        """
+        return RankingProveedores.desde_por_proveedor(self.por_proveedor)
+
+    @cached_property
+    def latencia_por_proveedor(self):
+        """
+        Cantidad, promedio, mediana, p90 y p99 de las demoras por proveedor y medida.
+        """
+        return estadisticas_latencia(self.latencias, 'Proveedor Facturador')
+
+    @cached_property
+    def latencia_por_mes(self):
+        """
+        Cantidad, promedio, mediana, p90 y p99 de las demoras por mes de emisión y medida.
+        """
+        return estadisticas_latencia(self.latencias, 'Mes')
+
+
+COLUMNAS_FECHAS = ['Fecha de Emisión', 'Fecha Recepción', 'Fecha Estimada Pago']
+
+MESES = list(range(1, 13))
+
+
+def calcular_matriz_anio_mes(por_dia):
+    """
+    Calcula en una sola pasada el monto por año y mes a partir del monto por día.
+
+    Args:
+        por_dia: Serie con el monto total por fecha de emisión.
+
+    Returns:
+        matriz: DataFrame con una fila por año (índice 'Año', desde el primero hasta
+        el último con datos) y una columna por mes (1 a 12). Los meses sin facturas
+        dentro del período con datos valen 0; los anteriores al primer día o
+        posteriores al último valen NaN.
+    """
+    if por_dia.empty:
+        return pd.DataFrame(columns=MESES, index=pd.Index([], name='Año', dtype='int64'), dtype=float)
+    fechas = por_dia.index
+    matriz = por_dia.groupby([fechas.year, fechas.month]).sum().unstack()
+    anios = range(fechas[0].year, fechas[-1].year + 1)
+    matriz = matriz.reindex(index=anios, columns=MESES).fillna(0)
+
+    # Meses fuera del período con datos
+    periodo = np.add.outer(np.asarray(anios) * 12, np.asarray(MESES))
+    primero = fechas[0].year * 12 + fechas[0].month
+    ultimo = fechas[-1].year * 12 + fechas[-1].month
+    matriz = matriz.where((periodo >= primero) & (periodo <= ultimo))
+    matriz.index.name = 'Año'
+    matriz.columns.name = 'Mes'
+    return matriz
+
+
+def serie_mensual(matriz, dtype=None):
+    """
+    Convierte la matriz año x mes en la serie mensual continua (fechas de fin de mes).
+
+    Args:
+        matriz: DataFrame de `calcular_matriz_anio_mes`.
+        dtype: Tipo de los montos (por ejemplo, el de la serie diaria).
+
+    Returns:
+        por_mes: Serie 'Monto Total' indexada por 'Fecha de Emisión' (fin de mes).
+    """
+    montos = matriz.stack().dropna()
+    fechas = pd.to_datetime(pd.DataFrame({
+        'year': montos.index.get_level_values(0),
+        'month': montos.index.get_level_values(1),
+        'day': 1,
+    })) + pd.offsets.MonthEnd(0)
+    por_mes = pd.Series(montos.to_numpy(), index=pd.DatetimeIndex(fechas, name='Fecha de Emisión'), name='Monto Total')
+    if dtype is not None:
+        por_mes = por_mes.astype(dtype)
+    return por_mes
+
+
+def _montos_anchos(serie):
+    # Las sumas de montos se guardan como int64 (o float64): los montos de las
+    # facturas pueden venir compactados a enteros chicos y sus sumas desbordarían
+    return serie.astype('int64' if serie.dtype.kind in 'iub' else 'float64')
+
+
+def construir_agregados(facturas_por_proveedor, con_monto_por_proveedor, monto_por_proveedor, por_dia, por_fechas, latencias):
+    """
+    Arma un objeto Agregados a partir de los conteos y sumas básicos.
+
+    El promedio por proveedor y la serie mensual se derivan de esos valores, por lo
+    que combinar agregados solo requiere sumar conteos y montos.
+
+    Args:
+        facturas_por_proveedor: Serie con el número de facturas por proveedor.
+        con_monto_por_proveedor: Serie con las facturas con monto informado por proveedor.
+        monto_por_proveedor: Serie con el monto total por proveedor.
+        por_dia: Serie con el monto total por fecha de emisión.
+        por_fechas: DataFrame con las facturas por combinación de fechas.
+        latencias: Histogramas de demoras de `modulos.latencias`.
+
+    Returns:
+        agregados: Objeto Agregados.
+    """
+    monto_por_proveedor = _montos_anchos(monto_por_proveedor)
+    por_proveedor = pd.DataFrame({
+        'Número de Facturas': facturas_por_proveedor,
+        'Monto Total': monto_por_proveedor,
+        'Monto Promedio': monto_por_proveedor / con_monto_por_proveedor,
+        'Facturas con Monto': con_monto_por_proveedor,
+    })
+    # Índice de texto plano aunque las facturas traigan el proveedor como categórica
+    por_proveedor.index = pd.Index(por_proveedor.index.astype(object), name='Proveedor Facturador')
+
+    # Los meses se derivan de los días (no de las facturas): primero la matriz año x
+    # mes y de ella la serie mensual, así ambos gráficos comparten el mismo cálculo
+    por_dia = _montos_anchos(por_dia).sort_index().rename('Monto Total')
+    por_dia.index.name = 'Fecha de Emisión'
+    por_anio_mes = calcular_matriz_anio_mes(por_dia)
+    por_mes = serie_mensual(por_anio_mes, por_dia.dtype)
+
+    return Agregados(
+        por_proveedor=por_proveedor, por_dia=por_dia, por_mes=por_mes, por_fechas=por_fechas, por_anio_mes=por_anio_mes,
+        latencias=latencias,
+    )
+
+
+def _contar_fechas(df):
+    # Las fechas faltantes se conservan como grupo propio (dropna=False) para que
+    # cada serie del gráfico de fechas descarte solo lo que le corresponde
+    return df.groupby(COLUMNAS_FECHAS, dropna=False, sort=False).size().rename('Facturas').reset_index()
+
+
+def calcular_agregados(df):
+    """
+    Calcula en una sola pasada los agregados por proveedor, por día y por mes.
+
+    Args:
+        df: DataFrame con los datos de proveedores (fechas ya preparadas).
+
+    Returns:
+        agregados: Objeto Agregados con las tablas precalculadas.
+    """
+    # Un único groupby por proveedor para cantidad, suma y promedio
+    por_proveedor = df.groupby('Proveedor Facturador', sort=False, observed=True)['Monto Total'].agg(['size', 'sum', 'count'])
+
+    # Un único groupby por día
+    por_dia = df.groupby('Fecha de Emisión')['Monto Total'].sum()
+
+    return construir_agregados(
+        por_proveedor['size'], por_proveedor['count'], por_proveedor['sum'], por_dia, _contar_fechas(df),
+        calcular_histogramas(df),
+    )
+
+
+def combinar_agregados(anteriores, nuevos):
+    """
+    Combina dos agregados (por ejemplo, los del histórico y los de un lote nuevo)
+    sin volver a recorrer las facturas.
+
+    Args:
+        anteriores: Agregados existentes.
+        nuevos: Agregados del lote a incorporar.
+
+    Returns:
+        agregados: Agregados equivalentes a los del conjunto completo.
+    """
+    columnas = ['Número de Facturas', 'Facturas con Monto', 'Monto Total']
+    por_proveedor = anteriores.por_proveedor[columnas].apply(_montos_anchos).add(
+        nuevos.por_proveedor[columnas].apply(_montos_anchos), fill_value=0,
+    )
+    por_dia = _montos_anchos(anteriores.por_dia).add(_montos_anchos(nuevos.por_dia), fill_value=0)
+    por_fechas = (
+        pd.concat([anteriores.por_fechas, nuevos.por_fechas], ignore_index=True)
+        .groupby(COLUMNAS_FECHAS, dropna=False, sort=False)['Facturas'].sum().reset_index()
+    )
+    return construir_agregados(
+        por_proveedor['Número de Facturas'].astype('int64'),
+        por_proveedor['Facturas con Monto'].astype('int64'),
+        por_proveedor['Monto Total'],
+        por_dia,
+        por_fechas,
+        combinar_histogramas(anteriores.latencias, nuevos.latencias),
+    )
+
+
+def obtener_agregados(datos):
+    """
+    Devuelve los agregados de `datos`, calculándolos si se recibe un DataFrame.
+
+    Permite que las funciones de gráficos acepten los agregados compartidos, un
+    DatasetFacturas (que ya los trae calculados) o un DataFrame suelto.
+    """
+    if isinstance(datos, Agregados):
+        return datos
+    if isinstance(datos, pd.DataFrame):
+        return calcular_agregados(datos)
+    return datos.agregados
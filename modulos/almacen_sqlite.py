@@ -0,0 +1,501 @@
+# modulos/almacen_sqlite.py
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modulos.agregados import COLUMNAS_FECHAS, construir_agregados
+from modulos.carga_multiple import es_origen_multiple, listar_fuentes
+from modulos.carga_por_bloques import COLUMNAS_AGREGADOS, TAMANO_BLOQUE, leer_por_bloques
+from modulos.cargar_datos import _bloqueo, directorio_cache_para, hash_archivo
+from modulos.desglose_facturas import COLUMNAS_DESGLOSE
+from modulos.emision_recepcion_pago import CELDAS_POR_EJE, _ancho_celda
+from modulos.instrumentacion import metricas
+from modulos.latencias import COLUMNAS_HISTOGRAMA, LIMITE_DIAS_EXACTOS, LIMITE_DIAS_SEMANAS, MEDIDAS
+
+# Se incrementa cuando cambia el esquema de la base, para reconstruirla
+VERSION_FORMATO_BASE = 3
+
+# Memoria de páginas de SQLite por conexión (KiB) y bytes del archivo mapeados en
+# memoria (el mapeo lo comparten todos los workers a través de la cache del sistema)
+CACHE_SQLITE_KIB = 65536
+MMAP_SQLITE = 1 << 30
+
+# Segundos que un worker espera a que otro termine de crear la base
+ESPERA_CREACION = 600
+
+# Columna de las facturas -> columna de la tabla
+COLUMNAS_SQL = {
+    'Nº Factura': 'numero',
+    'Tipo Factura': 'tipo',
+    'Proveedor Facturador': 'proveedor',
+    'Fecha de Emisión': 'emision',
+    'Fecha Recepción': 'recepcion',
+    'Fecha Estimada Pago': 'pago',
+    'Monto Total': 'monto',
+    'Estado Documento': 'estado_documento',
+    'Estado Pago': 'estado_pago',
+}
+
+# Columnas de la tabla de facturas que se leen del archivo si las trae (además de
+# las de los agregados, que son obligatorias)
+COLUMNAS_OPCIONALES = ['Nº Factura', 'Tipo Factura', 'Estado Documento', 'Estado Pago']
+
+COLUMNAS_FECHA_SQL = ('emision', 'recepcion', 'pago')
+
+# Las fechas se guardan como días desde 1970-01-01 y el mes de emisión como meses
+# desde 1970-01: comparar, restar y agrupar enteros es mucho más rápido que texto
+ESQUEMA = '''
+CREATE TABLE facturas (
+    numero INTEGER,
+    tipo TEXT,
+    proveedor TEXT,
+    emision INTEGER,
+    recepcion INTEGER,
+    pago INTEGER,
+    monto NUMERIC,
+    estado_documento TEXT,
+    estado_pago TEXT,
+    mes INTEGER
+);
+CREATE TABLE metadatos (clave TEXT PRIMARY KEY, valor TEXT);
+'''
+
+# Tablas con los agregados de todas las facturas (ver `consultas_agregados`)
+TABLAS_RESUMEN = ('resumen_proveedor', 'resumen_dia', 'resumen_fechas', 'resumen_latencias')
+
+# Se crean después de insertar las filas (es mucho más rápido que mantenerlos
+# durante la carga). Incluyen el monto para que los agregados por proveedor y por
+# día se resuelvan solo con el índice, sin leer la tabla
+INDICES = '''
+CREATE INDEX facturas_proveedor_emision ON facturas (proveedor, emision, monto);
+CREATE INDEX facturas_emision ON facturas (emision, monto);
+'''
+
+
+def ruta_base_para(origen):
+    """
+    Devuelve la ruta por defecto del archivo SQLite de un origen de datos.
+
+    Se guarda junto a la cache columnar ('.cache/data_proveedores.sqlite'); con
+    varias fuentes, como '.cache/facturas.sqlite' junto a la primera. Se puede
+    cambiar con la variable de entorno DASHBOARD_BASE_SQLITE.
+    """
+    if os.environ.get('DASHBOARD_BASE_SQLITE'):
+        return os.environ['DASHBOARD_BASE_SQLITE']
+    if es_origen_multiple(origen):
+        return os.path.join(os.path.dirname(directorio_cache_para(listar_fuentes(origen)[0])), 'facturas.sqlite')
+    return directorio_cache_para(origen) + '.sqlite'
+
+
+def _numero_fecha(serie, unidad='D'):
+    # Días (o meses) desde 1970 como Int64, con faltantes para las fechas NaT
+    valores = serie.to_numpy(dtype='datetime64[ns]')
+    numeros = valores.astype('datetime64[%s]' % unidad).astype(np.int64)
+    return pd.Series(pd.arrays.IntegerArray(numeros, np.isnat(valores)), index=serie.index)
+
+
+def _fechas(valores):
+    # Días desde 1970 (o None) -> datetime64[ns]
+    return pd.to_datetime(pd.Series(valores, dtype='float64'), unit='D').astype('datetime64[ns]')
+
+
+def _filas_bloque(bloque):
+    emision = bloque['Fecha de Emisión']
+    columnas = {
+        'Nº Factura': bloque['Nº Factura'],
+        'Tipo Factura': bloque['Tipo Factura'],
+        'Proveedor Facturador': bloque['Proveedor Facturador'],
+        'Fecha de Emisión': _numero_fecha(emision),
+        'Fecha Recepción': _numero_fecha(bloque['Fecha Recepción']),
+        'Fecha Estimada Pago': _numero_fecha(bloque['Fecha Estimada Pago']),
+        'Monto Total': bloque['Monto Total'],
+        'Estado Documento': bloque['Estado Documento'],
+        'Estado Pago': bloque['Estado Pago'],
+        'Mes': _numero_fecha(emision, 'M'),
+    }
+    valores = [serie.astype(object).where(serie.notna(), None).tolist() for serie in columnas.values()]
+    return zip(*valores)
+
+
+def _estado_fuentes(rutas, con_hash=True):
+    estados = []
+    for ruta in rutas:
+        info = os.stat(ruta)
+        estado = {'ruta': os.path.abspath(ruta), 'mtime_ns': info.st_mtime_ns, 'tamano': info.st_size}
+        if con_hash:
+            estado['sha256'] = hash_archivo(ruta)
+        estados.append(estado)
+    return estados
+
+
+def _leer_metadatos(ruta_base):
+    try:
+        conexion = sqlite3.connect('file:%s?mode=ro' % ruta_base, uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        metadatos = dict(conexion.execute('SELECT clave, valor FROM metadatos'))
+    except sqlite3.Error:
+        return None
+    finally:
+        conexion.close()
+    if metadatos.get('formato') != str(VERSION_FORMATO_BASE):
+        return None
+    return metadatos
+
+
+def base_vigente(origen, ruta_base):
+    """
+    Indica si la base SQLite existe y corresponde a los archivos actuales del origen.
+
+    Igual que la cache columnar, primero compara fecha de modificación y tamaño de
+    cada archivo y solo si difieren compara el hash del contenido.
+    """
+    metadatos = _leer_metadatos(ruta_base) if os.path.exists(ruta_base) else None
+    if metadatos is None:
+        return False
+    guardadas = json.loads(metadatos['fuentes'])
+    actuales = _estado_fuentes(listar_fuentes(origen), con_hash=False)
+    if [estado['ruta'] for estado in actuales] != [estado['ruta'] for estado in guardadas]:
+        return False
+    for actual, guardada in zip(actuales, guardadas):
+        if (actual['mtime_ns'], actual['tamano']) != (guardada['mtime_ns'], guardada['tamano']):
+            if hash_archivo(actual['ruta']) != guardada['sha256']:
+                return False
+    return True
+
+
+def crear_base(origen, ruta_base, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Carga los archivos de facturas de un origen en una base SQLite.
+
+    Los archivos se leen por bloques (ver `modulos.carga_por_bloques`), así que la
+    memoria no depende del tamaño de los datos. La base se arma en un archivo
+    temporal y reemplaza a la anterior de forma atómica: los workers que la estén
+    leyendo siguen viendo la versión anterior hasta que la vuelvan a abrir.
+
+    Args:
+        origen: Archivo, carpeta o patrón glob con los archivos de facturas.
+        ruta_base: Ruta del archivo SQLite a crear.
+        tamano_bloque: Filas por bloque de lectura.
+
+    Returns:
+        version: Versión de los datos guardada en la base.
+    """
+    rutas = listar_fuentes(origen)
+    estados = _estado_fuentes(rutas)
+    version = hashlib.sha256(''.join(estado['sha256'] for estado in estados).encode('utf-8')).hexdigest()[:16]
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_base)), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(ruta_base)), suffix='.sqlite.tmp')
+    os.close(descriptor)
+    try:
+        conexion = sqlite3.connect(temporal)
+        try:
+            conexion.execute('PRAGMA journal_mode = OFF')
+            conexion.execute('PRAGMA synchronous = OFF')
+            conexion.executescript(ESQUEMA)
+            insercion = 'INSERT INTO facturas (%s, mes) VALUES (%s)' % (
+                ', '.join(COLUMNAS_SQL.values()), ', '.join('?' * (len(COLUMNAS_SQL) + 1)),
+            )
+            for ruta in rutas:
+                for bloque in leer_por_bloques(ruta, tamano_bloque, COLUMNAS_AGREGADOS, COLUMNAS_OPCIONALES):
+                    conexion.executemany(insercion, _filas_bloque(bloque))
+            conexion.executescript(INDICES)
+            # Los agregados sin filtros (los que se piden al iniciar cada worker) se
+            # guardan ya calculados
+            grilla = grilla_fechas(conexion, [], [])
+            for tabla, (sql, argumentos) in consultas_agregados([], [], grilla).items():
+                conexion.execute('CREATE TABLE %s AS %s' % (tabla, sql), argumentos)
+            conexion.executemany('INSERT INTO metadatos VALUES (?, ?)', [
+                ('formato', str(VERSION_FORMATO_BASE)), ('version', version), ('fuentes', json.dumps(estados)),
+            ])
+            conexion.commit()
+            conexion.execute('ANALYZE')
+        finally:
+            conexion.close()
+        os.replace(temporal, ruta_base)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return version
+
+
+def _dia(fecha):
+    return int(np.datetime64(pd.Timestamp(fecha).normalize(), 'D').astype(np.int64))
+
+
+def _filtro(desde=None, hasta=None, proveedores=None):
+    # Condición WHERE (y sus parámetros) equivalente a `filtrar_dataset`
+    condiciones, parametros = [], []
+    if desde is not None:
+        condiciones.append('emision >= ?')
+        parametros.append(_dia(desde))
+    if hasta is not None:
+        condiciones.append('emision <= ?')
+        parametros.append(_dia(hasta))
+    if proveedores:
+        condiciones.append('proveedor IN (%s)' % ', '.join('?' * len(proveedores)))
+        parametros.extend(proveedores)
+    return condiciones, parametros
+
+
+def _donde(condiciones):
+    return (' WHERE ' + ' AND '.join(condiciones)) if condiciones else ''
+
+
+def grilla_fechas(conexion, condiciones, parametros, celdas=None):
+    """
+    Calcula la grilla de fechas del gráfico de dispersión para las facturas que
+    cumplen `condiciones` (ver `emision_recepcion_pago._agrupar_coincidentes`).
+
+    Args:
+        conexion: Conexión a la base.
+        condiciones: Condiciones WHERE de `_filtro`.
+        parametros: Parámetros de las condiciones.
+        celdas: Celdas por eje (por defecto CELDAS_POR_EJE).
+
+    Returns:
+        grilla: Lista con (origen, días por celda) de la emisión, la recepción y el
+        pago. El origen es el comienzo de la primera celda, alineada con 1970-01-01
+        como en `_agrupar_coincidentes`.
+    """
+    if celdas is None:
+        celdas = CELDAS_POR_EJE
+    extremos = conexion.execute(
+        'SELECT %s FROM facturas%s' % (
+            ', '.join('MIN(%s), MAX(%s)' % (columna, columna) for columna in COLUMNAS_FECHA_SQL), _donde(condiciones),
+        ),
+        parametros,
+    ).fetchone()
+    grilla = []
+    for minimo, maximo in zip(extremos[::2], extremos[1::2]):
+        if minimo is None:
+            grilla.append((0, 1))
+        else:
+            ancho = _ancho_celda(np.array([minimo, maximo]), celdas)
+            grilla.append((minimo // ancho * ancho, ancho))
+    return grilla
+
+
+def consultas_agregados(condiciones, parametros, grilla):
+    """
+    Devuelve las consultas GROUP BY de cada agregado para las facturas que cumplen
+    `condiciones`.
+
+    Las facturas por combinación de fechas se agrupan en la celda de `grilla` de
+    cada fecha y en si la recepción fue posterior a la emisión, así la tabla queda
+    acotada por la grilla del gráfico de dispersión y no por los días distintos.
+    Cada grupo se ubica en el promedio de cada fecha de sus facturas, redondeado a
+    días (ROUND de SQLite redondea las mitades hacia arriba, así que un grupo con
+    recepción posterior a la emisión la sigue teniendo).
+
+    Args:
+        condiciones: Condiciones WHERE de `_filtro`.
+        parametros: Parámetros de las condiciones.
+        grilla: Resultado de `grilla_fechas` para las mismas condiciones.
+
+    Returns:
+        consultas: Diccionario tabla de resumen -> (sql, parámetros); sin condiciones
+        son las consultas con que se llenan las tablas de resumen.
+    """
+    consultas = {
+        'resumen_proveedor': (
+            'SELECT proveedor, COUNT(*), COUNT(monto), COALESCE(SUM(monto), 0) FROM facturas%s GROUP BY proveedor'
+            % _donde(condiciones + ['proveedor IS NOT NULL']), parametros,
+        ),
+        'resumen_dia': (
+            'SELECT emision, COALESCE(SUM(monto), 0) FROM facturas%s GROUP BY emision'
+            % _donde(condiciones + ['emision IS NOT NULL']), parametros,
+        ),
+        'resumen_fechas': (
+            '''SELECT CAST(ROUND(AVG(emision)) AS INTEGER), CAST(ROUND(AVG(recepcion)) AS INTEGER),
+                      CAST(ROUND(AVG(pago)) AS INTEGER), COUNT(*)
+               FROM facturas%s
+               GROUP BY (emision - ?) / ?, (recepcion - ?) / ?, (pago - ?) / ?, recepcion > emision'''
+            % _donde(condiciones), parametros + [valor for celda in grilla for valor in celda],
+        ),
+    }
+
+    # Misma agrupación que `calcular_histogramas`: días exactos hasta
+    # LIMITE_DIAS_EXACTOS, luego semanas y meses de 30 días
+    histogramas, argumentos = [], []
+    for posicion, columna in enumerate(MEDIDAS.values()):
+        sql_columna = COLUMNAS_SQL[columna]
+        donde = _donde(condiciones + ['proveedor IS NOT NULL', 'emision IS NOT NULL', sql_columna + ' IS NOT NULL'])
+        histogramas.append(
+            '''SELECT proveedor, mes, %d AS medida,
+                   CASE WHEN abs(dias) <= ? THEN dias
+                        WHEN abs(dias) <= ? THEN (abs(dias) / 7 * 7) * (CASE WHEN dias < 0 THEN -1 ELSE 1 END)
+                        ELSE (abs(dias) / 30 * 30) * (CASE WHEN dias < 0 THEN -1 ELSE 1 END) END AS intervalo,
+                   COUNT(*), SUM(dias)
+               FROM (SELECT proveedor, mes, %s - emision AS dias FROM facturas%s)
+               GROUP BY proveedor, mes, intervalo''' % (posicion, sql_columna, donde)
+        )
+        argumentos += [LIMITE_DIAS_EXACTOS, LIMITE_DIAS_SEMANAS] + parametros
+    consultas['resumen_latencias'] = (' UNION ALL '.join(histogramas), argumentos)
+    return consultas
+
+
+class AlmacenSQLite:
+    """
+    Facturas guardadas en un archivo SQLite, con índices por proveedor y por fecha
+    de emisión.
+
+    Los agregados de los gráficos (por proveedor, por día, por combinación de
+    fechas y los histogramas de demoras) se calculan con consultas GROUP BY dentro
+    de SQLite, con los filtros del dashboard como condiciones WHERE, y la tabla de
+    facturas de un proveedor se pagina con LIMIT/OFFSET sobre el índice. Ningún
+    worker necesita tener las facturas en memoria y todos comparten el mismo
+    archivo. Cada hilo usa su propia conexión de solo lectura.
+    """
+
+    def __init__(self, ruta_base):
+        self.ruta_base = ruta_base
+        self._locales = threading.local()
+        self.version = _leer_metadatos(ruta_base)['version']
+
+    def conexion(self):
+        """
+        Devuelve la conexión de solo lectura del hilo actual.
+        """
+        conexion = getattr(self._locales, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect('file:%s?mode=ro' % self.ruta_base, uri=True, check_same_thread=False)
+            conexion.execute('PRAGMA cache_size = -%d' % CACHE_SQLITE_KIB)
+            conexion.execute('PRAGMA mmap_size = %d' % MMAP_SQLITE)
+            self._locales.conexion = conexion
+        return conexion
+
+    def consultar(self, sql, parametros=()):
+        """
+        Ejecuta una consulta y devuelve todas sus filas.
+        """
+        with metricas.etapa('sqlite'):
+            return self.conexion().execute(sql, parametros).fetchall()
+
+    def agregados(self, desde=None, hasta=None, proveedores=None):
+        """
+        Calcula los agregados de las facturas que cumplen los filtros con consultas a la base.
+
+        Sin filtros se leen las tablas de resumen guardadas al crear la base; con
+        filtros, las mismas consultas se ejecutan sobre las facturas con los filtros
+        como condiciones WHERE (resueltas con los índices).
+
+        Args:
+            desde: Fecha de emisión mínima (inclusive) o None.
+            hasta: Fecha de emisión máxima (inclusive) o None.
+            proveedores: Lista de proveedores a incluir o None para todos.
+
+        Returns:
+            agregados: Objeto Agregados, igual al de `calcular_agregados` sobre las
+            mismas facturas salvo `por_fechas`, que viene ya agrupado en la grilla
+            del gráfico de dispersión (ver `consultas_agregados`).
+        """
+        condiciones, parametros = _filtro(desde, hasta, proveedores)
+        if condiciones:
+            consultas = consultas_agregados(condiciones, parametros, grilla_fechas(self.conexion(), condiciones, parametros))
+        else:
+            consultas = {tabla: ('SELECT * FROM %s' % tabla, []) for tabla in TABLAS_RESUMEN}
+        filas = {tabla: self.consultar(sql, argumentos) for tabla, (sql, argumentos) in consultas.items()}
+
+        nombres, facturas, con_monto, montos = zip(*filas['resumen_proveedor']) if filas['resumen_proveedor'] else ([],) * 4
+        indice = pd.Index(nombres, dtype=object, name='Proveedor Facturador')
+        dias, montos_dia = zip(*filas['resumen_dia']) if filas['resumen_dia'] else ([],) * 2
+
+        fechas = pd.DataFrame(filas['resumen_fechas'], columns=COLUMNAS_FECHAS + ['Facturas'])
+        for columna in COLUMNAS_FECHAS:
+            fechas[columna] = _fechas(fechas[columna])
+        fechas['Facturas'] = fechas['Facturas'].astype(np.int64)
+
+        proveedor, mes, medida, intervalo, cantidad, suma = zip(*filas['resumen_latencias']) if filas['resumen_latencias'] else ([],) * 6
+        latencias = pd.DataFrame({
+            'Proveedor Facturador': pd.Categorical(proveedor),
+            'Mes': np.asarray(mes, dtype=np.int64).astype('datetime64[M]').astype('datetime64[ns]'),
+            'Medida': pd.Categorical.from_codes(np.asarray(medida, dtype=np.int8), list(MEDIDAS)),
+            'Dias': np.asarray(intervalo, dtype=np.int64),
+            'Facturas': np.asarray(cantidad, dtype=np.int64),
+            'Suma Dias': np.asarray(suma, dtype=np.int64),
+        })[COLUMNAS_HISTOGRAMA]
+
+        return construir_agregados(
+            pd.Series(facturas, index=indice, dtype=np.int64),
+            pd.Series(con_monto, index=indice, dtype=np.int64),
+            pd.Series(montos, index=indice),
+            pd.Series(montos_dia, index=pd.DatetimeIndex(_fechas(dias))),
+            fechas,
+            latencias,
+        )
+
+    def pagina_facturas(self, proveedor, desde=None, hasta=None, pagina=0, filas_por_pagina=25, orden=None):
+        """
+        Devuelve una página de las facturas de un proveedor (ver
+        `modulos.desglose_facturas.pagina_facturas`).
+
+        El orden por defecto (fecha de emisión) recorre el índice (proveedor,
+        emisión) y solo lee las filas de la página.
+        """
+        condiciones, parametros = _filtro(desde, hasta)
+        condiciones = ['proveedor = ?'] + condiciones
+        parametros = [proveedor] + parametros
+        if orden is None:
+            orden = ('Fecha de Emisión', False)
+        columna, descendente = orden
+        if columna not in COLUMNAS_DESGLOSE:
+            raise ValueError('No se puede ordenar por %s' % columna)
+        sql_columna = COLUMNAS_SQL[columna]
+        if columna == 'Fecha de Emisión' and not descendente:
+            criterio = 'emision, rowid'
+        else:
+            # Los faltantes al final y los empates en orden de fecha, como en memoria
+            criterio = '%s IS NULL, %s%s, emision, rowid' % (sql_columna, sql_columna, ' DESC' if descendente else '')
+
+        total = self.consultar('SELECT COUNT(*) FROM facturas%s' % _donde(condiciones), parametros)[0][0]
+        filas = self.consultar(
+            'SELECT %s FROM facturas%s ORDER BY %s LIMIT ? OFFSET ?' % (
+                ', '.join(COLUMNAS_SQL[nombre] for nombre in COLUMNAS_DESGLOSE), _donde(condiciones), criterio,
+            ),
+            parametros + [filas_por_pagina, max(pagina, 0) * filas_por_pagina],
+        )
+        registros = [dict(zip(COLUMNAS_DESGLOSE, fila)) for fila in filas]
+        for registro in registros:
+            for nombre in COLUMNAS_DESGLOSE:
+                if COLUMNAS_SQL[nombre] in COLUMNAS_FECHA_SQL and registro[nombre] is not None:
+                    registro[nombre] = str(np.datetime64(registro[nombre], 'D'))
+        return registros, total
+
+
+def abrir_almacen(origen, ruta_base=None):
+    """
+    Abre la base SQLite de un origen de datos, creándola o reconstruyéndola si los
+    archivos cambiaron.
+
+    La creación se hace con el mismo bloqueo de archivo que la cache columnar: si
+    varios workers arrancan a la vez, solo uno crea la base y los demás esperan y
+    la abren.
+
+    Args:
+        origen: Archivo, carpeta o patrón glob con los archivos de facturas.
+        ruta_base: Ruta del archivo SQLite (por defecto `ruta_base_para(origen)`).
+
+    Returns:
+        almacen: AlmacenSQLite listo para consultar.
+    """
+    if ruta_base is None:
+        ruta_base = ruta_base_para(origen)
+    if not base_vigente(origen, ruta_base):
+        directorio = os.path.dirname(os.path.abspath(ruta_base))
+        os.makedirs(directorio, exist_ok=True)
+        with _bloqueo(directorio, ESPERA_CREACION):
+            # Otro worker pudo haberla creado mientras se esperaba el bloqueo
+            if not base_vigente(origen, ruta_base):
+                with metricas.etapa('carga.sqlite'):
+                    crear_base(origen, ruta_base)
+    return AlmacenSQLite(ruta_base)
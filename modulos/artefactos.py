@@ -0,0 +1,212 @@
+# modulos/artefactos.py
+import argparse
+import gzip
+import html
+import json
+import os
+import shutil
+import time
+
+# Las dependencias pesadas (pandas, plotly, openpyxl) se importan dentro de las
+# funciones: este módulo solo las necesita al construir los artefactos
+
+# Carpeta con los artefactos que sirve api/index.py
+DIRECTORIO_ARTEFACTOS = os.environ.get(
+    'DASHBOARD_ARTEFACTOS', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artefactos'),
+)
+
+NOMBRE_MANIFIESTO = 'manifiesto.json'
+
+# Se incrementa cuando cambia la estructura de los artefactos
+VERSION_FORMATO_ARTEFACTOS = 1
+
+PLANTILLA_PAGINA = '''<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Panel de Proveedores</title>
+<link rel="stylesheet" href="/styles.css?v={version}">
+<script src="/plotly.min.js?v={version}" defer></script>
+</head>
+<body>
+<h1 class="header-title">Análisis de Proveedores</h1>
+{tarjetas}
+<script>
+// Cada figura se pide cuando su tarjeta entra en pantalla (como graficos_diferidos.js)
+document.addEventListener('DOMContentLoaded', function () {{
+    function dibujar(contenedor) {{
+        fetch(contenedor.dataset.figura).then(function (respuesta) {{
+            return respuesta.json();
+        }}).then(function (figura) {{
+            Plotly.newPlot(contenedor, figura.data, figura.layout, {{responsive: true}});
+        }});
+    }}
+    var graficos = document.querySelectorAll('.grafico-prearmado');
+    if (!('IntersectionObserver' in window)) {{
+        graficos.forEach(dibujar);
+        return;
+    }}
+    var observador = new IntersectionObserver(function (entradas) {{
+        entradas.forEach(function (entrada) {{
+            if (entrada.isIntersecting) {{
+                observador.unobserve(entrada.target);
+                dibujar(entrada.target);
+            }}
+        }});
+    }}, {{rootMargin: '200px'}});
+    graficos.forEach(function (grafico) {{ observador.observe(grafico); }});
+}});
+</script>
+</body>
+</html>
+'''
+
+PLANTILLA_TARJETA = '''<div class="card">
+<h2 class="card-title">{titulo}</h2>
+<div class="grafico-prearmado" id="{id}" data-figura="/figuras/{id}.json?v={version}" style="min-height: 450px"></div>
+</div>'''
+
+
+def _escribir(directorio, nombre, contenido):
+    # Cada archivo se guarda también comprimido con gzip al máximo nivel, así el
+    # servidor no comprime nada al responder
+    if isinstance(contenido, str):
+        contenido = contenido.encode('utf-8')
+    ruta = os.path.join(directorio, nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as archivo:
+        archivo.write(contenido)
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    with open(ruta + '.gz', 'wb') as archivo:
+        archivo.write(comprimido)
+    return {'bytes': len(contenido), 'bytes_gzip': len(comprimido)}
+
+
+def _cargar_dataset(origen):
+    from modulos.carga_multiple import cargar_fuentes, es_origen_multiple
+    from modulos.cargar_datos import cargar_datos_versionados
+    from modulos.dataset import crear_dataset
+
+    if es_origen_multiple(origen):
+        df, agregados, version, _ = cargar_fuentes(origen)
+    else:
+        df, agregados, version = cargar_datos_versionados(origen)
+    return crear_dataset(df, version=version, agregados=agregados)
+
+
+def _agregados_json(agregados, version):
+    # Tablas chicas en formato 'split' de pandas, con fechas ISO
+    tablas = {
+        'por_proveedor': agregados.por_proveedor,
+        'por_mes': agregados.por_mes.to_frame(),
+        'por_anio_mes': agregados.por_anio_mes,
+        'latencia_por_proveedor': agregados.latencia_por_proveedor.reset_index(),
+        'latencia_por_mes': agregados.latencia_por_mes.reset_index(),
+    }
+    contenido = {
+        nombre: json.loads(tabla.to_json(orient='split', date_format='iso'))
+        for nombre, tabla in tablas.items()
+    }
+    contenido['version'] = version
+    return json.dumps(contenido, ensure_ascii=False)
+
+
+def construir_artefactos(origen="data_proveedores.xlsx", directorio=None):
+    """
+    Genera los artefactos del modo serverless a partir de los datos.
+
+    Se cargan los datos una vez, se construyen todas las figuras sin filtros
+    (compactadas si el plotly.js que se incluye entiende arreglos tipados, ver
+    `modulos.compactar_figuras`) y se guardan ya serializadas junto con los
+    agregados, la página HTML, plotly.js y los estilos, cada archivo también
+    comprimido con gzip. La carpeta anterior se reemplaza al final, así que nunca
+    queda a medio escribir.
+
+    Args:
+        origen: Archivo, carpeta o patrón glob con los datos.
+        directorio: Carpeta de salida (por defecto DIRECTORIO_ARTEFACTOS).
+
+    Returns:
+        manifiesto: Diccionario con la versión de los datos, los archivos generados
+        con sus tamaños y el tiempo de cada etapa.
+    """
+    import plotly.io as pio
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    from modulos.compactar_figuras import compactar_figura, soporta_arreglos_binarios
+    from modulos.figuras import GRAFICOS
+
+    # La página usa el plotly.js del paquete plotly instalado al construir
+    version_plotlyjs = tuple(int(parte) for parte in get_plotlyjs_version().split('.')[:3])
+    compactar = soporta_arreglos_binarios(version_plotlyjs)
+
+    directorio = directorio or DIRECTORIO_ARTEFACTOS
+    temporal = directorio.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    tiempos = {}
+    inicio = time.perf_counter()
+    dataset = _cargar_dataset(origen)
+    tiempos['datos'] = time.perf_counter() - inicio
+
+    archivos = {}
+    graficos = []
+    for grafico in GRAFICOS:
+        inicio = time.perf_counter()
+        figura = grafico.crear(dataset)
+        figura_json = pio.to_json(compactar_figura(figura) if compactar else figura, validate=False)
+        nombre = 'figuras/%s.json' % grafico.id
+        archivos[nombre] = _escribir(temporal, nombre, figura_json)
+        graficos.append({'id': grafico.id, 'titulo': grafico.titulo, 'archivo': nombre})
+        tiempos['figura.' + grafico.id] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    archivos['agregados.json'] = _escribir(temporal, 'agregados.json', _agregados_json(dataset.agregados, dataset.version))
+    tiempos['agregados'] = time.perf_counter() - inicio
+
+    tarjetas = '\n'.join(
+        PLANTILLA_TARJETA.format(titulo=html.escape(grafico['titulo']), id=grafico['id'], version=dataset.version)
+        for grafico in graficos
+    )
+    archivos['index.html'] = _escribir(temporal, 'index.html', PLANTILLA_PAGINA.format(version=dataset.version, tarjetas=tarjetas))
+    archivos['plotly.min.js'] = _escribir(temporal, 'plotly.min.js', get_plotlyjs())
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'styles.css'), 'rb') as archivo:
+        archivos['styles.css'] = _escribir(temporal, 'styles.css', archivo.read())
+
+    manifiesto = {
+        'formato': VERSION_FORMATO_ARTEFACTOS,
+        'version': dataset.version,
+        'plotlyjs': get_plotlyjs_version(),
+        'figuras_compactadas': compactar,
+        'generado': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'graficos': graficos,
+        'archivos': archivos,
+        'tiempos_s': {etapa: round(segundos, 3) for etapa, segundos in tiempos.items()},
+    }
+    with open(os.path.join(temporal, NOMBRE_MANIFIESTO), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=1)
+
+    # La carpeta anterior se aparta con un rename antes de poner la nueva en su
+    # lugar y recién después se borra: la carpeta solo falta entre los dos renames
+    # (no mientras se borran los archivos) y nunca se ve a medio escribir
+    anterior = directorio.rstrip(os.sep) + '.anterior'
+    shutil.rmtree(anterior, ignore_errors=True)
+    if os.path.exists(directorio):
+        os.replace(directorio, anterior)
+    os.replace(temporal, directorio)
+    shutil.rmtree(anterior, ignore_errors=True)
+    return manifiesto
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera los artefactos del modo serverless (api/index.py).')
+    parser.add_argument('--datos', default="data_proveedores.xlsx", help='Archivo, carpeta o patrón glob con los datos')
+    parser.add_argument('--salida', default=None, help='Carpeta de salida (por defecto DASHBOARD_ARTEFACTOS o artefactos/)')
+    argumentos = parser.parse_args()
+    manifiesto = construir_artefactos(argumentos.datos, argumentos.salida)
+    for nombre, tamanos in manifiesto['archivos'].items():
+        print('%-45s %10d B %10d B gzip' % (nombre, tamanos['bytes'], tamanos['bytes_gzip']))
+    print('Versión de los datos:', manifiesto['version'])
+    print('Tiempos (s):', manifiesto['tiempos_s'])
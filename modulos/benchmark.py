@@ -0,0 +1,308 @@
+# modulos/benchmark.py
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+from modulos.agregados import calcular_agregados
+from modulos.carga_por_bloques import agregar_por_bloques
+from modulos.cargar_datos import cargar_datos_versionados, leer_fuente
+from modulos.dataset import crear_dataset
+from modulos.figuras import GRAFICOS
+from modulos.memoria import reporte_memoria
+from modulos.preparar_datos import preparar_columnas_fecha
+
+# Columnas de data_proveedores.xlsx, en el mismo orden
+COLUMNAS_FUENTE = [
+    'Nº Factura',
+    'Tipo Factura',
+    'Proveedor Facturador',
+    'RUT Facturador',
+    'Fecha de Emisión',
+    'Fecha Recepción',
+    'Fecha Estimada Pago',
+    'Monto Total',
+    'Estado Documento',
+    'Estado Asociación',
+    'Estado Pago',
+    'Estado Sii',
+    'Usuario Envío Aprobación',
+]
+
+# Un xlsx no admite más filas que estas (incluido el encabezado)
+MAX_FILAS_XLSX = 1048575
+
+
+def generar_facturas(filas, proveedores, semilla=0, desde='2023-01-01', hasta='2025-03-31'):
+    """
+    Genera un DataFrame sintético con el esquema de data_proveedores.xlsx.
+
+    Los proveedores siguen una distribución sesgada (pocos concentran muchas
+    facturas, como en los datos reales), la recepción llega entre 0 y unos pocos
+    días después de la emisión y el pago se estima 30 días después de la recepción.
+    Alrededor de un 1% de las facturas no tiene fecha de recepción ni de pago.
+
+    Args:
+        filas: Cantidad de facturas.
+        proveedores: Cantidad de proveedores distintos.
+        semilla: Semilla del generador aleatorio (mismos argumentos, mismos datos).
+        desde: Primera fecha de emisión posible.
+        hasta: Última fecha de emisión posible.
+
+    Returns:
+        df: DataFrame con las fechas como datetime64 (se escriben como dd-mm-aaaa).
+    """
+    rng = np.random.default_rng(semilla)
+
+    pesos = 1 / np.arange(1, proveedores + 1) ** 1.1
+    codigos = rng.choice(proveedores, size=filas, p=pesos / pesos.sum())
+    nombres = np.array(['PROVEEDOR %06d S.A.' % numero for numero in range(proveedores)], dtype=object)
+    ruts = np.array(['%d-%d' % (76000000 + numero, numero % 10) for numero in range(proveedores)], dtype=object)
+
+    inicio = np.datetime64(desde, 'D')
+    dias = (np.datetime64(hasta, 'D') - inicio).astype(int) + 1
+    emision = inicio + rng.integers(0, dias, size=filas).astype('timedelta64[D]')
+    recepcion = emision + rng.geometric(0.5, size=filas).astype('timedelta64[D]') - np.timedelta64(1, 'D')
+    sin_recepcion = rng.random(filas) < 0.01
+    recepcion = np.where(sin_recepcion, np.datetime64('NaT'), recepcion).astype('datetime64[ns]')
+    pago = recepcion + np.timedelta64(30, 'D')
+
+    def elegir(valores):
+        return pd.Categorical.from_codes(rng.integers(0, len(valores), size=filas), valores)
+
+    return pd.DataFrame({
+        'Nº Factura': rng.integers(1, 100000000, size=filas),
+        'Tipo Factura': elegir(['Afecta', 'Exenta', 'Afecta Exenta']),
+        'Proveedor Facturador': pd.Categorical.from_codes(codigos, nombres),
+        'RUT Facturador': pd.Categorical.from_codes(codigos, ruts),
+        'Fecha de Emisión': emision.astype('datetime64[ns]'),
+        'Fecha Recepción': recepcion,
+        'Fecha Estimada Pago': pago,
+        'Monto Total': np.round(rng.lognormal(13, 1.5, size=filas)).astype(np.int64),
+        'Estado Documento': elegir(['Aprobada', 'Pendiente', 'Rechazada']),
+        'Estado Asociación': elegir(['Totalmente Asociada', 'Parcialmente Asociada', 'Sin Asociar']),
+        'Estado Pago': elegir(['Pagada', 'Pendiente']),
+        'Estado Sii': elegir(['Aceptado SII', 'Reclamado']),
+        'Usuario Envío Aprobación': elegir(['Usuario %02d <usuario%02d@py.cl>' % (n, n) for n in range(20)]),
+    }, columns=COLUMNAS_FUENTE)
+
+
+def escribir_fuente(df, ruta):
+    """
+    Escribe las facturas generadas como csv o xlsx, con las fechas en dd-mm-aaaa
+    igual que el archivo real.
+    """
+    if ruta.lower().endswith('.csv'):
+        df.to_csv(ruta, index=False, date_format='%d-%m-%Y')
+        return
+    if len(df) > MAX_FILAS_XLSX:
+        raise ValueError('Un xlsx admite como máximo %d filas; use formato csv' % MAX_FILAS_XLSX)
+    df = df.copy()
+    for columna in ['Fecha de Emisión', 'Fecha Recepción', 'Fecha Estimada Pago']:
+        df[columna] = df[columna].dt.strftime('%d-%m-%Y')
+    df.to_excel(ruta, index=False)
+
+
+def medir(etapa, funcion, repeticiones=1, preparar=None):
+    """
+    Mide el tiempo y la memoria máxima de una etapa.
+
+    La función se ejecuta `repeticiones` veces para el tiempo y una vez más con
+    tracemalloc activo para la memoria (tracemalloc hace más lenta la ejecución,
+    por eso no se mezcla con la medición de tiempo).
+
+    Args:
+        etapa: Nombre de la etapa.
+        funcion: Función a medir; recibe lo que devuelve `preparar` (si se indica).
+        repeticiones: Cantidad de ejecuciones cronometradas.
+        preparar: Función opcional que genera el argumento de cada ejecución fuera
+            de la medición (por ejemplo, una copia de los datos de entrada).
+
+    Returns:
+        resultado: Diccionario con la medición y el valor devuelto (clave 'valor').
+    """
+    tiempos = []
+    valor = None
+    for _ in range(repeticiones):
+        argumentos = () if preparar is None else (preparar(),)
+        inicio = time.perf_counter()
+        valor = funcion(*argumentos)
+        tiempos.append(time.perf_counter() - inicio)
+    del valor
+
+    argumentos = () if preparar is None else (preparar(),)
+    tracemalloc.start()
+    try:
+        valor = funcion(*argumentos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'etapa': etapa,
+        'segundos': statistics.median(tiempos),
+        'segundos_min': min(tiempos),
+        'repeticiones': repeticiones,
+        'memoria_pico_bytes': pico,
+        'valor': valor,
+    }
+
+
+def _entorno():
+    return {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'maquina': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def ejecutar_benchmark(filas, proveedores, repeticiones=3, formato='csv', semilla=0, directorio=None):
+    """
+    Ejecuta el benchmark completo para un tamaño de datos.
+
+    Mide por separado la lectura del archivo, la preparación de fechas, la
+    creación del dataset compacto, los agregados, la carga con cache (en frío y
+    en caliente), la carga por bloques y cada función de gráfico (construcción y
+    serialización, con el tamaño del JSON resultante).
+
+    Args:
+        filas: Cantidad de facturas a generar.
+        proveedores: Cantidad de proveedores distintos.
+        repeticiones: Ejecuciones cronometradas por etapa.
+        formato: 'csv' o 'xlsx' para el archivo de origen.
+        semilla: Semilla del generador de facturas.
+        directorio: Carpeta de trabajo (por defecto una temporal que se borra al final).
+
+    Returns:
+        resultados: Lista de diccionarios, uno por etapa y uno por gráfico.
+    """
+    temporal = directorio is None
+    if temporal:
+        directorio = tempfile.mkdtemp(prefix='benchmark-dashboard-')
+    ruta = os.path.join(directorio, 'facturas_%d_%d.%s' % (filas, proveedores, formato))
+    comun = dict(_entorno(), filas=filas, proveedores=proveedores, formato=formato, semilla=semilla)
+    resultados = []
+
+    def registrar(medicion, **extra):
+        valor = medicion.pop('valor')
+        resultados.append(dict(comun, **medicion, **extra))
+        return valor
+
+    try:
+        generado = registrar(medir('generar', lambda: generar_facturas(filas, proveedores, semilla)))
+        registrar(medir('escribir_fuente', lambda: escribir_fuente(generado, ruta)), bytes_fuente=os.path.getsize(ruta))
+        del generado
+
+        crudo = registrar(medir('leer_fuente', lambda: leer_fuente(ruta), repeticiones))
+        preparado = registrar(medir('preparar_columnas_fecha', preparar_columnas_fecha, repeticiones, crudo.copy))
+        del crudo
+        dataset = registrar(medir('crear_dataset', crear_dataset, repeticiones, preparado.copy))
+        registrar(medir('calcular_agregados', calcular_agregados, repeticiones, lambda: dataset.facturas))
+        del preparado
+
+        cache = os.path.join(directorio, 'cache')
+
+        def cache_vacia():
+            shutil.rmtree(cache, ignore_errors=True)
+            return cache
+
+        registrar(medir('cargar_datos_frio', lambda d: cargar_datos_versionados(ruta, d), repeticiones, cache_vacia))
+        registrar(medir('cargar_datos_caliente', lambda: cargar_datos_versionados(ruta, cache), repeticiones))
+        registrar(medir('agregar_por_bloques', lambda: agregar_por_bloques(ruta), repeticiones))
+
+        for grafico in GRAFICOS:
+            figura = registrar(medir('grafico:' + grafico.id, lambda: grafico.crear(dataset), repeticiones))
+            serializado = medir('serializar:' + grafico.id, lambda: pio.to_json(figura, validate=False), repeticiones)
+            registrar(serializado, bytes_figura=len(serializado['valor'].encode('utf-8')))
+    finally:
+        if temporal:
+            shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def leer_resultados(ruta):
+    """
+    Lee un archivo de resultados (una línea JSON por medición) como DataFrame.
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        return pd.DataFrame([json.loads(linea) for linea in archivo if linea.strip()])
+
+
+def comparar_resultados(anteriores, actuales):
+    """
+    Compara dos corridas del benchmark etapa por etapa.
+
+    Args:
+        anteriores: DataFrame de resultados de referencia.
+        actuales: DataFrame de resultados nuevos.
+
+    Returns:
+        comparacion: DataFrame indexado por (filas, proveedores, etapa) con los
+        segundos y la memoria de ambas corridas y la razón actual / anterior
+        (valores mayores que 1 indican una regresión).
+    """
+    claves = ['filas', 'proveedores', 'etapa']
+    medidas = ['segundos', 'memoria_pico_bytes']
+    # Si un archivo tiene varias corridas del mismo tamaño se usa la última
+    anteriores = anteriores.drop_duplicates(claves, keep='last').set_index(claves)[medidas]
+    actuales = actuales.drop_duplicates(claves, keep='last').set_index(claves)[medidas]
+    comparacion = anteriores.join(actuales, how='inner', lsuffix=' anterior', rsuffix=' actual')
+    for medida in medidas:
+        comparacion['razón ' + medida] = comparacion[medida + ' actual'] / comparacion[medida + ' anterior']
+    return comparacion
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide la carga, los agregados y los gráficos del dashboard con datos sintéticos.")
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000], help="Cantidades de facturas (p. ej. 10000 1000000 10000000)")
+    parser.add_argument('--proveedores', type=int, nargs='+', default=[100], help="Cantidades de proveedores (p. ej. 100 100000)")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Ejecuciones cronometradas por etapa")
+    parser.add_argument('--formato', choices=['csv', 'xlsx'], default='csv', help="Formato del archivo de origen")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="Archivo donde se agregan los resultados (una línea JSON por medición)")
+    parser.add_argument('--comparar', help="Resultados anteriores contra los que comparar esta corrida")
+    parser.add_argument('--memoria', metavar='ARCHIVO', help="Solo muestra la memoria por columna de ARCHIVO antes y después de compactar")
+    argumentos = parser.parse_args()
+
+    if argumentos.memoria:
+        original = preparar_columnas_fecha(leer_fuente(argumentos.memoria))
+        compacto = crear_dataset(original.copy()).facturas
+        with pd.option_context('display.width', 120, 'display.float_format', '{:.1%}'.format):
+            print(reporte_memoria(original, compacto))
+        sys.exit(0)
+
+    resultados = []
+    for filas in argumentos.filas:
+        for proveedores in argumentos.proveedores:
+            corrida = ejecutar_benchmark(filas, proveedores, argumentos.repeticiones, argumentos.formato, argumentos.semilla)
+            lineas = [json.dumps(resultado, ensure_ascii=False) for resultado in corrida]
+            if argumentos.salida:
+                with open(argumentos.salida, 'a', encoding='utf-8') as archivo:
+                    archivo.write('\n'.join(lineas) + '\n')
+            else:
+                print('\n'.join(lineas))
+            for resultado in corrida:
+                print('%9d filas %7d proveedores  %-40s %9.4f s %12d B' % (
+                    filas, proveedores, resultado['etapa'], resultado['segundos'], resultado['memoria_pico_bytes'],
+                ), file=sys.stderr)
+            resultados.extend(corrida)
+
+    if argumentos.comparar:
+        with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.max_columns', None):
+            print(comparar_resultados(leer_resultados(argumentos.comparar), pd.DataFrame(resultados)), file=sys.stderr)
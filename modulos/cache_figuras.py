@@ -0,0 +1,237 @@
+# modulos/cache_figuras.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from modulos.instrumentacion import metricas
+
+# Se incrementa cuando cambian las funciones de gráficos, para que las figuras
+# guardadas en disco por versiones anteriores del código no se reutilicen
+VERSION_CACHE_FIGURAS = 1
+
+# Tamaño máximo del nivel en disco; al superarlo se borran las figuras usadas
+# hace más tiempo hasta bajar a FRACCION_RECORTE de este valor
+MAX_BYTES_DISCO = int(float(os.environ.get('DASHBOARD_CACHE_FIGURAS_MAX_MB', 256)) * 1024 * 1024)
+FRACCION_RECORTE = 0.8
+
+
+def clave_figura(nombre, parametros, version_datos):
+    """
+    Calcula la clave de cache de una figura.
+
+    Args:
+        nombre: Nombre del gráfico (o de la función que lo construye).
+        parametros: Diccionario con los filtros/parámetros de la figura.
+        version_datos: Versión del dataset con que se construye.
+
+    Returns:
+        clave: Cadena hexadecimal estable entre procesos.
+    """
+    contenido = json.dumps(
+        [VERSION_CACHE_FIGURAS, nombre, parametros or {}, version_datos],
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+
+def _carpeta_version(version_datos):
+    # Una subcarpeta por versión de los datos, para poder descartar las anteriores
+    # de una vez
+    return 'v' + hashlib.sha1(str(version_datos).encode('utf-8')).hexdigest()[:16]
+
+
+class CacheFiguras:
+    """
+    Cache de figuras serializadas (JSON) con un nivel en memoria LRU y un nivel
+    opcional en disco compartido entre los workers.
+
+    El nivel en disco guarda una subcarpeta por versión de los datos y tiene un
+    tamaño máximo: al superarlo se borran las figuras leídas o escritas hace más
+    tiempo, y `descartar_versiones` borra las de versiones que ya no se usan.
+
+    Args:
+        max_entradas: Máximo de figuras que se guardan en memoria.
+        directorio: Carpeta para el nivel en disco (None para desactivarlo).
+        max_bytes_disco: Tamaño máximo del nivel en disco (por defecto MAX_BYTES_DISCO).
+    """
+
+    def __init__(self, max_entradas=64, directorio=None, max_bytes_disco=None):
+        self.max_entradas = max_entradas
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco or MAX_BYTES_DISCO
+        self._entradas = OrderedDict()
+        self._candado = threading.Lock()
+        self._candado_disco = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.borrados_disco = 0
+        # Bytes escritos desde el último recorte: el disco se recorre solo cuando
+        # se escribió una parte apreciable del máximo
+        self._escritos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            self._recortar_disco()
+
+    def _ruta(self, clave, version_datos):
+        return os.path.join(self.directorio, _carpeta_version(version_datos), clave + '.json')
+
+    def _leer_disco(self, clave, version_datos):
+        if not self.directorio:
+            return None
+        ruta = self._ruta(clave, version_datos)
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                figura_json = archivo.read()
+            # La fecha de modificación marca el último uso para el recorte por tamaño
+            os.utime(ruta)
+            return figura_json
+        except OSError:
+            return None
+
+    def _escribir_disco(self, clave, version_datos, figura_json):
+        if not self.directorio:
+            return
+        ruta = self._ruta(clave, version_datos)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Escritura atómica para que otro worker nunca lea un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            archivo.write(figura_json)
+        os.replace(temporal, ruta)
+        with self._candado_disco:
+            self._escritos += len(figura_json)
+            recortar = self._escritos >= self.max_bytes_disco * (1 - FRACCION_RECORTE)
+        if recortar:
+            self._recortar_disco()
+
+    def _recortar_disco(self):
+        # Borra las figuras usadas hace más tiempo hasta quedar por debajo de
+        # FRACCION_RECORTE del máximo (los demás workers ven los mismos archivos)
+        with self._candado_disco:
+            self._escritos = 0
+            archivos = []
+            for carpeta in os.scandir(self.directorio):
+                if not carpeta.is_dir():
+                    continue
+                for entrada in os.scandir(carpeta.path):
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    archivos.append((info.st_mtime_ns, info.st_size, entrada.path))
+            total = sum(tamano for _, tamano, _ in archivos)
+            if total <= self.max_bytes_disco:
+                return
+            for _, tamano, ruta in sorted(archivos):
+                if total <= self.max_bytes_disco * FRACCION_RECORTE:
+                    break
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    continue
+                total -= tamano
+                self.borrados_disco += 1
+
+    def descartar_versiones(self, version_vigente):
+        """
+        Borra del disco las figuras de todas las versiones de datos salvo `version_vigente`
+        (por ejemplo, al publicar una versión nueva).
+        """
+        if not self.directorio:
+            return
+        vigente = _carpeta_version(version_vigente)
+        for entrada in os.scandir(self.directorio):
+            if entrada.name == vigente:
+                continue
+            if entrada.is_dir():
+                shutil.rmtree(entrada.path, ignore_errors=True)
+            elif entrada.name.endswith('.json'):
+                # Figuras guardadas sin subcarpeta por versiones anteriores del código
+                os.remove(entrada.path)
+
+    def _guardar_memoria(self, clave, figura_json):
+        with self._candado:
+            self._entradas[clave] = figura_json
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def buscar(self, nombre, parametros, version_datos):
+        """
+        Devuelve el JSON guardado de una figura (en memoria o en disco), o None si no está.
+        """
+        clave = clave_figura(nombre, parametros, version_datos)
+        with self._candado:
+            figura_json = self._entradas.get(clave)
+            if figura_json is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return figura_json
+
+        figura_json = self._leer_disco(clave, version_datos)
+        if figura_json is not None:
+            with self._candado:
+                self.aciertos_disco += 1
+            self._guardar_memoria(clave, figura_json)
+        return figura_json
+
+    def guardar(self, nombre, parametros, version_datos, figura_json):
+        """
+        Guarda el JSON de una figura construida fuera de la cache (por ejemplo, en paralelo).
+        """
+        clave = clave_figura(nombre, parametros, version_datos)
+        self._guardar_memoria(clave, figura_json)
+        self._escribir_disco(clave, version_datos, figura_json)
+
+    def obtener(self, nombre, parametros, version_datos, construir):
+        """
+        Devuelve el JSON de una figura, construyéndola solo si no está en cache.
+
+        Args:
+            nombre: Nombre del gráfico.
+            parametros: Diccionario con los filtros/parámetros de la figura.
+            version_datos: Versión del dataset.
+            construir: Función sin argumentos que devuelve la figura.
+
+        Returns:
+            figura_json: Figura serializada como JSON.
+        """
+        figura_json = self.buscar(nombre, parametros, version_datos)
+        if figura_json is not None:
+            return figura_json
+
+        with self._candado:
+            self.fallos += 1
+        figura = construir()
+        with metricas.etapa('serializar.' + nombre):
+            figura_json = pio.to_json(figura, validate=False)
+        self.guardar(nombre, parametros, version_datos, figura_json)
+        return figura_json
+
+    def limpiar(self):
+        """
+        Vacía el nivel en memoria (el nivel en disco se recorta por tamaño y por versión).
+        """
+        with self._candado:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de la cache.
+        """
+        with self._candado:
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'borrados_disco': self.borrados_disco,
+            }
@@ -0,0 +1,199 @@
+# modulos/carga_multiple.py
+import glob
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from modulos.agregados import calcular_agregados, combinar_agregados
+from modulos.cargar_datos import cache_vigente, cargar_datos, cargar_datos_versionados, directorio_cache_para, version_datos
+
+EXTENSIONES = ('.xlsx', '.csv')
+
+
+def es_origen_multiple(origen):
+    """
+    Indica si `origen` es una carpeta o un patrón glob (y no un único archivo).
+    """
+    return os.path.isdir(origen) or glob.has_magic(origen)
+
+
+def listar_fuentes(origen):
+    """
+    Devuelve los archivos de facturas de un origen, en orden alfabético.
+
+    Args:
+        origen: Un archivo, una carpeta (se toman sus archivos .xlsx y .csv,
+            incluidas las subcarpetas) o un patrón glob ('datos/*/2024-*.xlsx').
+
+    Returns:
+        rutas: Lista de rutas a archivos .xlsx o .csv.
+
+    Raises:
+        FileNotFoundError: Si el origen no tiene ningún archivo de facturas.
+    """
+    if os.path.isdir(origen):
+        rutas = glob.glob(os.path.join(origen, '**', '*'), recursive=True)
+    elif glob.has_magic(origen):
+        rutas = glob.glob(origen, recursive=True)
+    else:
+        rutas = [origen]
+    # Los archivos temporales de Excel ('~$archivo.xlsx') no son datos
+    rutas = sorted(
+        ruta for ruta in rutas
+        if os.path.isfile(ruta) and ruta.lower().endswith(EXTENSIONES) and not os.path.basename(ruta).startswith('~$')
+    )
+    if not rutas:
+        raise FileNotFoundError('No hay archivos xlsx o csv en %s' % origen)
+    return rutas
+
+
+def firma_fuentes(origen, directorio_cache=None):
+    """
+    Devuelve una firma que cambia cuando se agrega, quita o modifica un archivo del
+    origen (o cuando se anexa un lote a alguno de ellos).
+    """
+    return tuple(
+        (ruta, os.stat(ruta).st_mtime_ns, version_datos(ruta, directorio_cache))
+        for ruta in listar_fuentes(origen)
+    )
+
+
+def _actualizar_cache(ruta, directorio_cache):
+    # Se ejecuta en un proceso del pool: lee el archivo y guarda su cache columnar;
+    # solo se devuelve la versión, no los datos
+    cargar_datos(ruta, directorio_cache)
+    return version_datos(ruta, directorio_cache)
+
+
+def _tipo_valores(serie):
+    # Tipo de los valores (el de las categorías en las categóricas)
+    return serie.cat.categories.dtype if isinstance(serie.dtype, pd.CategoricalDtype) else serie.dtype
+
+
+def _como_texto(serie):
+    # Valores como texto, conservando los faltantes
+    valores = serie.astype(object)
+    return valores.where(valores.isna(), valores.astype(str)).astype('category')
+
+
+def _normalizar_tipos(series):
+    # Una misma columna puede venir numérica en un archivo y como texto en otro
+    # (por ejemplo, 'Nº Factura' exportado desde Excel y desde un CSV): si los tipos
+    # no se pueden unir, todas las partes pasan a texto con el mismo tipo
+    tipos = {_tipo_valores(serie) for serie in series}
+    if len(tipos) == 1:
+        return series
+    hay_categoricas = any(isinstance(serie.dtype, pd.CategoricalDtype) for serie in series)
+    numericos = all(isinstance(tipo, np.dtype) and tipo.kind in 'biuf' for tipo in tipos)
+    if numericos and not hay_categoricas:
+        # Los números se unen con np.result_type
+        return series
+    return [_como_texto(serie) for serie in series]
+
+
+def concatenar_facturas(partes):
+    """
+    Une las facturas de varios archivos en un único DataFrame.
+
+    Cada columna se arma una sola vez con su tamaño final: las numéricas y de fecha
+    se copian por tramos a un arreglo reservado de antemano y las categóricas se
+    unen recodificando los códigos a la unión de categorías. No se crean DataFrames
+    intermedios ni columnas de texto con un objeto Python por fila. Si una columna
+    trae tipos incompatibles en distintos archivos (números en uno, texto en otro)
+    se une como texto.
+
+    Args:
+        partes: Lista de DataFrames con las mismas columnas (por ejemplo, los de
+            `cargar_datos` de cada archivo).
+
+    Returns:
+        df: DataFrame con todas las facturas, en el orden de `partes`.
+
+    Raises:
+        ValueError: Si los archivos no tienen las mismas columnas.
+    """
+    columnas = list(partes[0].columns)
+    for parte in partes[1:]:
+        if set(parte.columns) != set(columnas):
+            diferentes = set(parte.columns) ^ set(columnas)
+            raise ValueError('Los archivos no tienen las mismas columnas: %s' % ', '.join(sorted(map(str, diferentes))))
+    if len(partes) == 1:
+        return partes[0]
+
+    total = sum(len(parte) for parte in partes)
+    datos = {}
+    for nombre in columnas:
+        series = _normalizar_tipos([parte[nombre] for parte in partes])
+        if any(isinstance(serie.dtype, pd.CategoricalDtype) for serie in series):
+            datos[nombre] = union_categoricals([serie.astype('category').array for serie in series])
+        elif all(isinstance(serie.dtype, np.dtype) for serie in series):
+            destino = np.empty(total, dtype=np.result_type(*[serie.dtype for serie in series]))
+            inicio = 0
+            for serie in series:
+                destino[inicio:inicio + len(serie)] = serie.to_numpy()
+                inicio += len(serie)
+            datos[nombre] = destino
+        else:
+            datos[nombre] = pd.concat(series, ignore_index=True)
+    return pd.DataFrame(datos, columns=columnas, copy=False)
+
+
+def cargar_fuentes(origen, directorio_cache=None, trabajadores=None):
+    """
+    Carga todos los archivos de facturas de una carpeta o patrón glob.
+
+    Cada archivo conserva su propia cache columnar (ver `cargar_datos`), cuyo
+    manifiesto guarda el tamaño, la fecha de modificación y el hash del archivo.
+    Los archivos sin cambios no se vuelven a leer; los nuevos o modificados se leen
+    y preparan en paralelo, uno por proceso. Luego se unen las columnas de todas
+    las caches y se combinan sus agregados, sin recalcularlos.
+
+    Args:
+        origen: Carpeta, patrón glob o archivo (ver `listar_fuentes`).
+        directorio_cache: Carpeta base para las caches (opcional).
+        trabajadores: Procesos para leer los archivos modificados (por defecto,
+            uno por archivo sin superar los CPUs).
+
+    Returns:
+        df: DataFrame con las facturas de todos los archivos.
+        agregados: Agregados del conjunto.
+        version: Versión de los datos (cambia si cambia cualquiera de los archivos).
+        leidos: Lista de los archivos que hubo que leer (los demás salieron de la cache).
+
+    Raises:
+        FileNotFoundError: Si el origen no tiene archivos.
+        ValueError: Si dos archivos comparten la carpeta de cache (mismo nombre sin
+            extensión) o no tienen las mismas columnas.
+    """
+    rutas = listar_fuentes(origen)
+    carpetas = {}
+    for ruta in rutas:
+        carpeta = directorio_cache_para(ruta, directorio_cache)
+        if carpeta in carpetas:
+            raise ValueError('%s y %s usarían la misma cache (%s); renombre uno de ellos' % (carpetas[carpeta], ruta, carpeta))
+        carpetas[carpeta] = ruta
+
+    leidos = [ruta for ruta in rutas if not cache_vigente(ruta, directorio_cache)]
+    if len(leidos) > 1:
+        if trabajadores is None:
+            trabajadores = min(len(leidos), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            list(pool.map(_actualizar_cache, leidos, [directorio_cache] * len(leidos)))
+
+    partes, agregados, versiones = [], [], []
+    for ruta in rutas:
+        df, agregados_archivo, version = cargar_datos_versionados(ruta, directorio_cache)
+        partes.append(df)
+        agregados.append(agregados_archivo if agregados_archivo is not None else calcular_agregados(df))
+        versiones.append('%s:%s' % (os.path.basename(ruta), version or ''))
+
+    if len(rutas) == 1:
+        version = versiones[0].split(':', 1)[1]
+    else:
+        version = hashlib.sha256('\n'.join(versiones).encode('utf-8')).hexdigest()[:16]
+    return concatenar_facturas(partes), reduce(combinar_agregados, agregados), version, leidos
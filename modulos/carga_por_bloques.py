@@ -0,0 +1,122 @@
+# modulos/carga_por_bloques.py
+import pandas as pd
+
+from modulos.agregados import calcular_agregados, combinar_agregados
+from modulos.preparar_datos import preparar_columnas_fecha
+
+# Filas que se leen y procesan a la vez; la memoria máxima depende de este valor
+# y no del tamaño del archivo
+TAMANO_BLOQUE = 50000
+
+# Columnas que necesitan los agregados; el resto no se lee
+COLUMNAS_AGREGADOS = [
+    'Proveedor Facturador',
+    'Fecha de Emisión',
+    'Fecha Recepción',
+    'Fecha Estimada Pago',
+    'Monto Total',
+]
+
+
+def _bloques_excel(ruta, tamano_bloque, columnas, opcionales=()):
+    # openpyxl en modo solo lectura recorre la hoja fila a fila sin cargarla entera
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = list(next(filas, ()))
+        faltantes = [columna for columna in columnas if columna not in encabezado]
+        if faltantes:
+            raise ValueError('Al archivo %s le faltan columnas: %s' % (ruta, ', '.join(faltantes)))
+        columnas = list(columnas) + [columna for columna in opcionales if columna in encabezado]
+        posiciones = [encabezado.index(columna) for columna in columnas]
+
+        bloque = []
+        for fila in filas:
+            bloque.append([fila[posicion] for posicion in posiciones])
+            if len(bloque) == tamano_bloque:
+                yield pd.DataFrame(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=columnas)
+    finally:
+        libro.close()
+
+
+def tipar_bloque(df):
+    """
+    Convierte un bloque recién leído a tipos compactos.
+
+    'Proveedor Facturador' pasa a categórica, las fechas a datetime64 (igual que
+    `preparar_columnas_fecha`) y 'Monto Total' a int64 si todos los montos son
+    enteros (o float64 si no): los montos se suman, así que no se reducen a enteros
+    más chicos.
+
+    Args:
+        df: DataFrame del bloque con los valores tal como vienen del archivo.
+
+    Returns:
+        df: El mismo bloque con los tipos convertidos.
+    """
+    df = preparar_columnas_fecha(df)
+    df['Proveedor Facturador'] = df['Proveedor Facturador'].astype('category')
+    monto = pd.to_numeric(df['Monto Total'], errors='coerce')
+    if monto.notna().all() and (monto % 1 == 0).all():
+        df['Monto Total'] = monto.astype('int64')
+    else:
+        df['Monto Total'] = monto
+    return df
+
+
+def leer_por_bloques(ruta, tamano_bloque=TAMANO_BLOQUE, columnas=COLUMNAS_AGREGADOS, opcionales=()):
+    """
+    Lee un archivo de facturas (xlsx o csv) en bloques de filas ya tipados.
+
+    Args:
+        ruta: Ruta al archivo.
+        tamano_bloque: Filas por bloque.
+        columnas: Columnas a leer (error si falta alguna).
+        opcionales: Columnas que se leen si el archivo las trae; si no, los bloques
+            las traen vacías.
+
+    Yields:
+        bloque: DataFrame con a lo sumo `tamano_bloque` filas, con `columnas` y
+        `opcionales`.
+    """
+    if ruta.lower().endswith('.csv'):
+        encabezado = pd.read_csv(ruta, nrows=0).columns
+        presentes = list(columnas) + [columna for columna in opcionales if columna in encabezado]
+        bloques = pd.read_csv(ruta, usecols=presentes, chunksize=tamano_bloque)
+    else:
+        bloques = _bloques_excel(ruta, tamano_bloque, columnas, opcionales)
+    for bloque in bloques:
+        for columna in opcionales:
+            if columna not in bloque.columns:
+                bloque[columna] = None
+        yield tipar_bloque(bloque)
+
+
+def agregar_por_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Calcula los agregados de un archivo de facturas sin cargarlo completo en memoria.
+
+    Cada bloque se agrega y se combina con lo acumulado, así que la memoria usada
+    depende del tamaño del bloque y de la cantidad de proveedores y días, no de la
+    cantidad de facturas. El resultado sirve para todos los gráficos (el de fechas
+    se dibuja en su modo agrupado).
+
+    Args:
+        ruta: Ruta al archivo (xlsx o csv).
+        tamano_bloque: Filas por bloque.
+
+    Returns:
+        agregados: Agregados del archivo completo.
+    """
+    agregados = None
+    for bloque in leer_por_bloques(ruta, tamano_bloque):
+        nuevos = calcular_agregados(bloque)
+        agregados = nuevos if agregados is None else combinar_agregados(agregados, nuevos)
+    if agregados is None:
+        agregados = calcular_agregados(tipar_bloque(pd.DataFrame(columns=COLUMNAS_AGREGADOS)))
+    return agregados
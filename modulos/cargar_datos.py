@@ -0,0 +1,481 @@
+# modulos/cargar_datos.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from modulos.agregados import COLUMNAS_FECHAS, calcular_agregados, combinar_agregados, construir_agregados
+from modulos.latencias import COLUMNAS_HISTOGRAMA, MEDIDAS
+from modulos.instrumentacion import metricas
+from modulos.preparar_datos import preparar_columnas_fecha
+
+# Se incrementa cuando cambia la forma en que se guardan las columnas en disco,
+# para que las caches antiguas se reconstruyan automáticamente.
+VERSION_FORMATO_CACHE = 4
+
+NOMBRE_MANIFIESTO = 'manifiesto.json'
+NOMBRE_BLOQUEO = 'bloqueo'
+
+
+def leer_fuente(ruta):
+    """
+    Lee un archivo de facturas (xlsx o csv) tal como viene, sin preparar columnas.
+
+    Args:
+        ruta: Ruta al archivo de origen.
+
+    Returns:
+        df: DataFrame con los datos crudos del archivo.
+    """
+    if ruta.lower().endswith('.csv'):
+        return pd.read_csv(ruta)
+    return pd.read_excel(ruta)
+
+
+def directorio_cache_para(ruta_fuente, directorio_cache=None):
+    """
+    Devuelve el directorio donde se guarda la cache columnar de un archivo de origen.
+
+    Por defecto se usa una carpeta '.cache' junto al archivo; puede cambiarse con el
+    argumento `directorio_cache` o con la variable de entorno DASHBOARD_DIR_CACHE.
+    """
+    if directorio_cache is None:
+        directorio_cache = os.environ.get('DASHBOARD_DIR_CACHE')
+    if directorio_cache is None:
+        directorio_cache = os.path.join(os.path.dirname(os.path.abspath(ruta_fuente)), '.cache')
+    nombre = os.path.splitext(os.path.basename(ruta_fuente))[0]
+    return os.path.join(directorio_cache, nombre)
+
+
+def hash_archivo(ruta, tamano_bloque=1 << 20):
+    """
+    Calcula el hash SHA-256 de un archivo leyéndolo por bloques.
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(tamano_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, NOMBRE_MANIFIESTO), encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    if manifiesto.get('formato') != VERSION_FORMATO_CACHE:
+        return None
+    return manifiesto
+
+
+def _escribir_manifiesto(directorio, manifiesto):
+    # Escritura atómica: otros workers nunca ven un manifiesto a medio escribir
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False)
+    os.replace(temporal, os.path.join(directorio, NOMBRE_MANIFIESTO))
+
+
+def _estado_fuente(ruta_fuente):
+    info = os.stat(ruta_fuente)
+    return {'mtime_ns': info.st_mtime_ns, 'tamano': info.st_size}
+
+
+def _cache_vigente(ruta_fuente, directorio, manifiesto):
+    """
+    Comprueba si la cache corresponde al archivo de origen actual.
+
+    Primero compara mtime y tamaño (barato); si difieren, compara el hash del
+    contenido para no reconstruir cuando el archivo solo fue tocado o copiado.
+    """
+    if manifiesto is None:
+        return False
+    estado = _estado_fuente(ruta_fuente)
+    fuente = manifiesto['fuente']
+    if estado['mtime_ns'] == fuente['mtime_ns'] and estado['tamano'] == fuente['tamano']:
+        return True
+    if hash_archivo(ruta_fuente) != fuente['sha256']:
+        return False
+    manifiesto['fuente'].update(estado)
+    _escribir_manifiesto(directorio, manifiesto)
+    return True
+
+
+def cache_vigente(ruta_fuente, directorio_cache=None):
+    """
+    Indica si la cache de `ruta_fuente` existe y corresponde al archivo actual
+    (sin leer sus columnas).
+    """
+    directorio = directorio_cache_para(ruta_fuente, directorio_cache)
+    return _cache_vigente(ruta_fuente, directorio, _leer_manifiesto(directorio))
+
+
+def _tipo_columna(serie):
+    if serie.dtype.kind == 'M':
+        return 'fecha'
+    if serie.dtype.kind in 'biuf':
+        return 'numero'
+    return 'texto'
+
+
+@contextmanager
+def _bloqueo(directorio, espera_maxima=60):
+    # Evita que dos procesos anexen lotes a la vez (funciona también en Windows)
+    ruta = os.path.join(directorio, NOMBRE_BLOQUEO)
+    limite = time.monotonic() + espera_maxima
+    while True:
+        try:
+            descriptor = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > limite:
+                raise TimeoutError('La cache %s está bloqueada por otro proceso' % directorio)
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.close(descriptor)
+        os.remove(ruta)
+
+
+def _codificar_columna(serie, entrada, filas):
+    """
+    Convierte una columna al formato guardado en disco según su entrada del manifiesto.
+
+    En las columnas de texto las categorías nuevas se agregan al final de la lista,
+    así los códigos de los segmentos ya guardados siguen siendo válidos.
+    """
+    if serie is None:
+        if entrada['tipo'] == 'fecha':
+            return np.full(filas, np.datetime64('NaT'), dtype='datetime64[ns]')
+        if entrada['tipo'] == 'numero':
+            return np.full(filas, np.nan)
+        return np.full(filas, -1, dtype=np.int32)
+
+    if entrada['tipo'] == 'fecha':
+        if serie.dtype.kind != 'M':
+            serie = pd.to_datetime(serie, errors='coerce', dayfirst=True)
+        return serie.to_numpy(dtype='datetime64[ns]')
+    if entrada['tipo'] == 'numero':
+        if serie.dtype.kind not in 'biuf':
+            serie = pd.to_numeric(serie)
+        return serie.to_numpy()
+
+    texto = serie.map(str, na_action='ignore')
+    categorias = entrada.setdefault('categorias', [])
+    nuevas = pd.Index(texto.dropna().unique()).difference(categorias)
+    categorias.extend(nuevas)
+    return pd.Index(categorias).get_indexer(texto).astype(np.int32)
+
+
+def _escribir_segmento(directorio, df, columnas, prefijo):
+    # Cada segmento se escribe en su propia subcarpeta y solo se publica al
+    # actualizar el manifiesto, así un worker que está leyendo nunca ve columnas mezcladas
+    carpeta = tempfile.mkdtemp(dir=directorio, prefix=prefijo)
+    for entrada in columnas:
+        serie = df[entrada['nombre']] if entrada['nombre'] in df.columns else None
+        valores = _codificar_columna(serie, entrada, len(df))
+        np.save(os.path.join(carpeta, entrada['archivo']), valores, allow_pickle=False)
+    return {'carpeta': os.path.basename(carpeta), 'filas': len(df)}
+
+
+def _guardar_agregados(directorio, agregados, categorias_proveedor):
+    # Los proveedores se guardan como códigos de la columna 'Proveedor Facturador',
+    # así el archivo es puramente numérico
+    por_proveedor = agregados.por_proveedor
+    latencias = agregados.latencias
+    descriptor, ruta = tempfile.mkstemp(dir=directorio, prefix='agregados-', suffix='.npz')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        np.savez(
+            archivo,
+            proveedores=pd.Index(categorias_proveedor).get_indexer(por_proveedor.index.astype(str)),
+            facturas=por_proveedor['Número de Facturas'].to_numpy(),
+            con_monto=por_proveedor['Facturas con Monto'].to_numpy(),
+            montos=por_proveedor['Monto Total'].to_numpy(),
+            dias=agregados.por_dia.index.to_numpy(dtype='datetime64[ns]'),
+            montos_dia=agregados.por_dia.to_numpy(),
+            emision=agregados.por_fechas['Fecha de Emisión'].to_numpy(dtype='datetime64[ns]'),
+            recepcion=agregados.por_fechas['Fecha Recepción'].to_numpy(dtype='datetime64[ns]'),
+            pago=agregados.por_fechas['Fecha Estimada Pago'].to_numpy(dtype='datetime64[ns]'),
+            facturas_fechas=agregados.por_fechas['Facturas'].to_numpy(),
+            latencia_proveedores=pd.Index(categorias_proveedor).get_indexer(latencias['Proveedor Facturador'].astype(str)),
+            latencia_meses=latencias['Mes'].to_numpy(dtype='datetime64[ns]'),
+            latencia_medidas=pd.Categorical(latencias['Medida'], categories=list(MEDIDAS)).codes,
+            latencia_dias=latencias['Dias'].to_numpy(),
+            latencia_facturas=latencias['Facturas'].to_numpy(),
+            latencia_suma=latencias['Suma Dias'].to_numpy(),
+        )
+    return os.path.basename(ruta)
+
+
+def _categorias_proveedor(manifiesto):
+    for entrada in manifiesto['columnas']:
+        if entrada['nombre'] == 'Proveedor Facturador':
+            return entrada.get('categorias', [])
+    return []
+
+
+def leer_agregados(directorio, manifiesto):
+    """
+    Lee los agregados guardados junto a la cache.
+
+    Returns:
+        agregados: Objeto Agregados, o None si la cache no los tiene.
+    """
+    if not manifiesto.get('agregados'):
+        return None
+    with np.load(os.path.join(directorio, manifiesto['agregados']), allow_pickle=False) as datos:
+        categorias = np.asarray(_categorias_proveedor(manifiesto), dtype=object)
+        proveedores = pd.Index(categorias[datos['proveedores']])
+        latencias = pd.DataFrame(dict(zip(COLUMNAS_HISTOGRAMA, [
+            pd.Categorical(categorias[datos['latencia_proveedores']]),
+            datos['latencia_meses'],
+            pd.Categorical.from_codes(datos['latencia_medidas'], list(MEDIDAS)),
+            datos['latencia_dias'],
+            datos['latencia_facturas'],
+            datos['latencia_suma'],
+        ])))
+        return construir_agregados(
+            pd.Series(datos['facturas'], index=proveedores),
+            pd.Series(datos['con_monto'], index=proveedores),
+            pd.Series(datos['montos'], index=proveedores),
+            pd.Series(datos['montos_dia'], index=pd.DatetimeIndex(datos['dias'])),
+            pd.DataFrame(dict(zip(
+                COLUMNAS_FECHAS + ['Facturas'],
+                [datos['emision'], datos['recepcion'], datos['pago'], datos['facturas_fechas']],
+            ))),
+            latencias,
+        )
+
+
+def guardar_cache(df, directorio, estado_fuente):
+    """
+    Guarda un DataFrame ya preparado como columnas .npy en el directorio de cache.
+
+    Las columnas numéricas y de fecha se guardan tal cual (se pueden abrir con
+    memory-map); las columnas de texto se guardan como códigos enteros más la lista
+    de categorías en el manifiesto. Junto a las columnas se guardan los agregados,
+    que luego se actualizan de forma incremental al anexar lotes.
+
+    Args:
+        df: DataFrame preparado con `preparar_columnas_fecha`.
+        directorio: Directorio de cache del archivo de origen.
+        estado_fuente: Diccionario con mtime_ns, tamano y sha256 del origen.
+    """
+    os.makedirs(directorio, exist_ok=True)
+
+    columnas = [
+        {'nombre': nombre, 'tipo': _tipo_columna(df[nombre]), 'archivo': 'col_%03d.npy' % posicion}
+        for posicion, nombre in enumerate(df.columns)
+    ]
+    segmento = _escribir_segmento(directorio, df, columnas, 'v-')
+    manifiesto = {
+        'formato': VERSION_FORMATO_CACHE,
+        'fuente': estado_fuente,
+        'version': estado_fuente['sha256'][:16],
+        'filas': len(df),
+        'segmentos': [segmento],
+        'columnas': columnas,
+    }
+    manifiesto['agregados'] = _guardar_agregados(directorio, calcular_agregados(df), _categorias_proveedor(manifiesto))
+
+    anterior = _leer_manifiesto(directorio)
+    _escribir_manifiesto(directorio, manifiesto)
+
+    # Los segmentos antiguos se pueden borrar: en Linux los archivos ya abiertos
+    # con memory-map siguen siendo válidos para quien los esté usando
+    if anterior is not None:
+        for viejo in anterior['segmentos']:
+            shutil.rmtree(os.path.join(directorio, viejo['carpeta']), ignore_errors=True)
+        if anterior.get('agregados'):
+            _eliminar(os.path.join(directorio, anterior['agregados']))
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+def anexar_a_cache(directorio, lote, huella_lote):
+    """
+    Agrega un lote de facturas ya preparado a la cache como un segmento nuevo.
+
+    No se reescriben las columnas existentes: se guarda solo el lote, se amplían
+    las categorías de texto y se combinan los agregados guardados con los del lote.
+
+    Args:
+        directorio: Directorio de cache del archivo de origen (ya creado con `cargar_datos`).
+        lote: DataFrame del lote, con las fechas preparadas.
+        huella_lote: Hash del contenido del lote, para calcular la nueva versión.
+
+    Returns:
+        version: Nueva versión de los datos.
+
+    Raises:
+        ValueError: Si no existe la cache o el lote trae columnas que el histórico no tiene.
+    """
+    with _bloqueo(directorio):
+        manifiesto = _leer_manifiesto(directorio)
+        if manifiesto is None:
+            raise ValueError('No existe una cache de datos en %s; cargue primero el archivo de origen' % directorio)
+
+        nombres = [entrada['nombre'] for entrada in manifiesto['columnas']]
+        sobrantes = [nombre for nombre in lote.columns if nombre not in nombres]
+        if sobrantes:
+            raise ValueError('El lote trae columnas desconocidas: %s' % ', '.join(map(str, sobrantes)))
+
+        agregados = leer_agregados(directorio, manifiesto)
+        if agregados is None:
+            agregados = calcular_agregados(leer_cache(directorio, manifiesto))
+
+        segmento = _escribir_segmento(directorio, lote, manifiesto['columnas'], 'l-')
+        manifiesto['segmentos'].append(segmento)
+        manifiesto['filas'] += len(lote)
+
+        anteriores = manifiesto.get('agregados')
+        manifiesto['agregados'] = _guardar_agregados(
+            directorio, combinar_agregados(agregados, calcular_agregados(lote)), _categorias_proveedor(manifiesto),
+        )
+        manifiesto['version'] = hashlib.sha256((manifiesto['version'] + huella_lote).encode('utf-8')).hexdigest()[:16]
+        _escribir_manifiesto(directorio, manifiesto)
+        if anteriores:
+            _eliminar(os.path.join(directorio, anteriores))
+        return manifiesto['version']
+
+
+def _leer_columna(directorio, manifiesto, entrada):
+    partes = [
+        np.load(os.path.join(directorio, segmento['carpeta'], entrada['archivo']), mmap_mode='r', allow_pickle=False)
+        for segmento in manifiesto['segmentos']
+    ]
+    # Con un único segmento se usa directamente el memory-map
+    return partes[0] if len(partes) == 1 else np.concatenate(partes)
+
+
+def leer_cache(directorio, manifiesto):
+    """
+    Reconstruye el DataFrame a partir de las columnas guardadas en la cache.
+
+    Args:
+        directorio: Directorio de cache del archivo de origen.
+        manifiesto: Manifiesto leído del directorio.
+
+    Returns:
+        df: DataFrame con las fechas como las deja `preparar_columnas_fecha` y las
+        columnas de texto como categóricas.
+    """
+    datos = {}
+    for entrada in manifiesto['columnas']:
+        valores = _leer_columna(directorio, manifiesto, entrada)
+        if entrada['tipo'] == 'texto':
+            # El texto queda como categórica: no se crea un objeto Python por fila
+            datos[entrada['nombre']] = pd.Categorical.from_codes(np.asarray(valores), entrada['categorias'])
+        else:
+            datos[entrada['nombre']] = valores
+    return pd.DataFrame(datos, columns=[entrada['nombre'] for entrada in manifiesto['columnas']], copy=False)
+
+
+def version_datos(ruta_fuente, directorio_cache=None):
+    """
+    Devuelve la versión de los datos cargados desde `ruta_fuente`.
+
+    Corresponde al hash del archivo de origen y cambia además cada vez que se
+    anexa un lote.
+
+    Args:
+        ruta_fuente: Ruta al archivo de datos ya cargado con `cargar_datos`.
+        directorio_cache: Carpeta base para la cache (opcional).
+
+    Returns:
+        version: Cadena que cambia cuando cambian los datos, o None si todavía no
+        existe cache para ese archivo.
+    """
+    manifiesto = _leer_manifiesto(directorio_cache_para(ruta_fuente, directorio_cache))
+    if manifiesto is None:
+        return None
+    return manifiesto['version']
+
+
+def cargar_agregados(ruta_fuente, directorio_cache=None):
+    """
+    Devuelve los agregados guardados en la cache de `ruta_fuente` (o None si no hay).
+    """
+    directorio = directorio_cache_para(ruta_fuente, directorio_cache)
+    manifiesto = _leer_manifiesto(directorio)
+    if manifiesto is None:
+        return None
+    return leer_agregados(directorio, manifiesto)
+
+
+def _cargar(ruta_fuente, directorio_cache):
+    directorio = directorio_cache_para(ruta_fuente, directorio_cache)
+    manifiesto = _leer_manifiesto(directorio)
+    if _cache_vigente(ruta_fuente, directorio, manifiesto):
+        try:
+            with metricas.etapa('carga.cache'):
+                return leer_cache(directorio, manifiesto), directorio, manifiesto
+        except (OSError, ValueError):
+            # Otro worker pudo reemplazar la cache mientras la leíamos
+            pass
+
+    estado = _estado_fuente(ruta_fuente)
+    estado['sha256'] = hash_archivo(ruta_fuente)
+    with metricas.etapa('carga.fuente'):
+        df = leer_fuente(ruta_fuente)
+    with metricas.etapa('carga.fechas'):
+        df = preparar_columnas_fecha(df)
+    with metricas.etapa('carga.guardar_cache'):
+        guardar_cache(df, directorio, estado)
+    # Se devuelve lo que quedó en la cache, así la primera carga tiene los mismos
+    # tipos (texto como categórica) que las siguientes
+    manifiesto = _leer_manifiesto(directorio)
+    with metricas.etapa('carga.cache'):
+        return leer_cache(directorio, manifiesto), directorio, manifiesto
+
+
+def cargar_datos(ruta_fuente, directorio_cache=None):
+    """
+    Carga el archivo de facturas usando una cache columnar en disco.
+
+    La primera vez se lee el Excel, se preparan las fechas con
+    `preparar_columnas_fecha` y se guarda el resultado como columnas .npy. Las
+    siguientes cargas (incluidos los demás workers de gunicorn) leen directamente
+    de esa cache, que solo se reconstruye cuando cambia el archivo de origen. Los
+    lotes anexados con `modulos.ingesta` se incluyen mientras el origen no cambie.
+
+    Args:
+        ruta_fuente: Ruta al archivo de datos (xlsx o csv).
+        directorio_cache: Carpeta base para la cache (opcional).
+
+    Returns:
+        df: DataFrame con los datos preparados.
+    """
+    return _cargar(ruta_fuente, directorio_cache)[0]
+
+
+def cargar_datos_versionados(ruta_fuente, directorio_cache=None):
+    """
+    Igual que `cargar_datos`, pero devuelve además los agregados guardados y la
+    versión, leídos del mismo manifiesto (consistentes entre sí aunque se esté
+    anexando un lote en paralelo).
+
+    Returns:
+        df: DataFrame con los datos preparados.
+        agregados: Agregados guardados en la cache (o None).
+        version: Versión de los datos.
+    """
+    df, directorio, manifiesto = _cargar(ruta_fuente, directorio_cache)
+    if manifiesto is None:
+        return df, None, None
+    with metricas.etapa('carga.agregados'):
+        agregados = leer_agregados(directorio, manifiesto)
+    return df, agregados, manifiesto['version']
@@ -0,0 +1,240 @@
+# modulos/compactar_figuras.py
+import base64
+import functools
+import glob
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Si es '1' las figuras se envían compactadas (arreglos binarios en base64, fechas
+# como milisegundos y floats recortados), el detalle de cada factura del gráfico de
+# fechas se pide al pasar el mouse en vez de ir dentro de la figura y las
+# respuestas del servidor se comprimen (ver modulos.compresion)
+OPTIMIZAR_CARGA = os.environ.get('DASHBOARD_OPTIMIZAR_CARGA', '0') == '1'
+
+# Dígitos significativos que deben conservar los floats; si float32 alcanza para
+# representarlos se envían con la mitad de bytes
+DIGITOS_SIGNIFICATIVOS = int(os.environ.get('DASHBOARD_DIGITOS_SIGNIFICATIVOS', 7))
+
+# Primera versión de plotly.js que entiende los arreglos tipados ({'dtype', 'bdata'})
+VERSION_MINIMA_ARREGLOS = (2, 28, 0)
+
+registro = logging.getLogger(__name__)
+
+# Tipos enteros que entiende plotly.js, del más chico al más grande
+TIPOS_ENTEROS = ('u1', 'i1', 'u2', 'i2', 'u4', 'i4')
+
+# Claves de las trazas que pueden venir como listas de números o de fechas en texto
+CLAVES_DATOS = ('x', 'y', 'z', 'customdata', 'text')
+
+
+@functools.lru_cache(maxsize=None)
+def version_plotlyjs():
+    """
+    Devuelve la versión de plotly.js que recibe el navegador, como tupla de enteros.
+
+    Dash 2 trae su propia copia de plotly.js dentro de dash.dcc (el número de
+    versión está en su archivo de licencia); las versiones más nuevas de Dash usan
+    la del paquete plotly.
+    """
+    import dash.dcc
+
+    for ruta in sorted(glob.glob(os.path.join(os.path.dirname(dash.dcc.__file__), '*plotly*LICENSE*'))):
+        with open(ruta, encoding='utf-8', errors='replace') as archivo:
+            coincidencia = re.search(r'plotly\.js v(\d+)\.(\d+)\.(\d+)', archivo.read())
+        if coincidencia:
+            return tuple(int(parte) for parte in coincidencia.groups())
+
+    from plotly.offline import get_plotlyjs_version
+    return tuple(int(parte) for parte in re.findall(r'\d+', get_plotlyjs_version())[:3])
+
+
+def soporta_arreglos_binarios(version=None):
+    """
+    Indica si plotly.js (`version`, por defecto la de `version_plotlyjs`) dibuja las
+    figuras compactadas.
+    """
+    return (version or version_plotlyjs()) >= VERSION_MINIMA_ARREGLOS
+
+
+def arreglo_binario(valores):
+    """
+    Codifica un arreglo NumPy en el formato de arreglos tipados de plotly.js
+    ({'dtype', 'bdata'[, 'shape']}), con los bytes en base64.
+    """
+    valores = np.ascontiguousarray(valores)
+    codificado = {'dtype': valores.dtype.str.lstrip('<|='), 'bdata': base64.b64encode(valores.tobytes()).decode('ascii')}
+    if valores.ndim > 1:
+        codificado['shape'] = ', '.join(str(dimension) for dimension in valores.shape)
+    return codificado
+
+
+def _decodificar(valor):
+    valores = np.frombuffer(base64.b64decode(valor['bdata']), dtype=valor['dtype'])
+    if 'shape' in valor:
+        valores = valores.reshape([int(dimension) for dimension in str(valor['shape']).split(',')])
+    return valores
+
+
+def _reducir_tipo(valores, digitos):
+    # Enteros (o floats sin decimales) al entero más chico que los contiene; floats a
+    # float32 si conserva `digitos` dígitos significativos
+    if valores.dtype.kind == 'b':
+        return valores.astype('u1')
+    if valores.dtype.kind == 'f':
+        faltantes = np.isnan(valores)
+        if not faltantes.any() and len(valores) and np.array_equal(valores, np.round(valores)):
+            valores = valores.astype(np.int64) if np.abs(valores).max() < 2 ** 62 else valores
+    if valores.dtype.kind in 'iu':
+        if not len(valores):
+            return valores.astype('i4')
+        minimo, maximo = valores.min(), valores.max()
+        for tipo in TIPOS_ENTEROS:
+            informacion = np.iinfo(tipo)
+            if informacion.min <= minimo and maximo <= informacion.max:
+                return valores.astype(tipo)
+        return valores.astype('f8')
+    simples = valores.astype('f4')
+    with np.errstate(invalid='ignore', over='ignore'):
+        error = np.abs(simples.astype('f8') - valores)
+        conserva = (error <= np.abs(valores) * 10.0 ** -digitos) | np.isnan(valores)
+    return simples if conserva.all() else valores.astype('f8')
+
+
+def _fechas_en_texto(valores):
+    # Fechas ISO en texto ('2024-01-31' o '2024-01-31T00:00:00'), como las generan
+    # plotly y las figuras rápidas
+    if not len(valores) or valores.dtype.kind not in 'OU':
+        return None
+    primero = valores.flat[0]
+    if not isinstance(primero, str) or len(primero) < 10 or primero[4:5] != '-' or primero[7:8] != '-':
+        return None
+    try:
+        return valores.astype('datetime64[ms]')
+    except (ValueError, TypeError):
+        return None
+
+
+def compactar_arreglo(valores, digitos=None, fechas=False):
+    """
+    Convierte un arreglo de una traza al formato binario más chico que lo representa.
+
+    Args:
+        valores: Arreglo NumPy, Serie/Index de pandas, lista o arreglo ya codificado
+            ({'dtype', 'bdata'}).
+        digitos: Dígitos significativos a conservar en los floats (por defecto
+            DIGITOS_SIGNIFICATIVOS).
+        fechas: Si es True, también se convierten las fechas en texto.
+
+    Returns:
+        codificado: Diccionario {'dtype', 'bdata'} o None si el arreglo no es numérico
+            ni de fechas (por ejemplo, nombres de proveedores).
+        es_fecha: True si eran fechas (se envían como milisegundos desde 1970, por lo
+            que el eje debe declararse de tipo 'date').
+    """
+    if digitos is None:
+        digitos = DIGITOS_SIGNIFICATIVOS
+    if isinstance(valores, dict):
+        valores = _decodificar(valores)
+    elif isinstance(valores, (pd.Series, pd.Index)):
+        valores = valores.to_numpy()
+    valores = np.asarray(valores)
+
+    es_fecha = False
+    if valores.dtype.kind == 'M':
+        es_fecha = True
+    elif fechas:
+        convertidas = _fechas_en_texto(valores)
+        if convertidas is not None:
+            valores, es_fecha = convertidas, True
+    if es_fecha:
+        milisegundos = valores.astype('datetime64[ms]')
+        valores = milisegundos.astype(np.int64).astype('f8')
+        valores[np.isnat(milisegundos)] = np.nan
+        return arreglo_binario(valores), True
+
+    if valores.dtype.kind == 'O':
+        try:
+            valores = valores.astype('f8')
+        except (ValueError, TypeError):
+            return None, False
+    if valores.dtype.kind not in 'biuf':
+        return None, False
+    return arreglo_binario(_reducir_tipo(valores, digitos)), False
+
+
+def _compactar_traza(traza, digitos, ejes_fecha):
+    compacta = {}
+    for clave, valor in traza.items():
+        if isinstance(valor, dict) and 'bdata' not in valor:
+            compacta[clave] = _compactar_traza(valor, digitos, ejes_fecha)
+            continue
+        es_arreglo = isinstance(valor, (np.ndarray, pd.Series, pd.Index)) or (isinstance(valor, dict) and 'bdata' in valor)
+        if es_arreglo or (clave in CLAVES_DATOS and isinstance(valor, (list, tuple)) and len(valor)):
+            codificado, es_fecha = compactar_arreglo(valor, digitos, fechas=clave in ('x', 'y'))
+            if codificado is not None:
+                compacta[clave] = codificado
+                if es_fecha:
+                    ejes_fecha.add(traza.get(clave + 'axis', clave))
+                continue
+        compacta[clave] = valor
+    return compacta
+
+
+def compactar_figura(figura, digitos=None):
+    """
+    Devuelve una copia de la figura con los arreglos de sus trazas en formato binario.
+
+    Los números van como arreglos tipados (enteros al tipo más chico, floats a
+    float32 si alcanza para `digitos` dígitos significativos) y las fechas como
+    milisegundos, declarando 'date' como tipo de sus ejes. Los textos (nombres de
+    proveedores, etc.) y el diseño quedan como estaban.
+
+    Args:
+        figura: Figura de plotly o diccionario con 'data' y 'layout'.
+        digitos: Dígitos significativos de los floats (por defecto DIGITOS_SIGNIFICATIVOS).
+
+    Returns:
+        figura: Diccionario con 'data' y 'layout' (no modifica la figura original).
+    """
+    if not isinstance(figura, dict):
+        figura = figura.to_plotly_json()
+    ejes_fecha = set()
+    datos = [_compactar_traza(traza, digitos, ejes_fecha) for traza in figura.get('data', [])]
+    layout = dict(figura.get('layout', {}))
+    for eje in ejes_fecha:
+        # 'x' -> 'xaxis', 'x2' -> 'xaxis2'
+        nombre = eje[0] + 'axis' + eje[1:]
+        layout[nombre] = dict(layout.get(nombre) or {}, type='date')
+    return dict(figura, data=datos, layout=layout)
+
+
+def con_figura_compacta(crear):
+    """
+    Envuelve una función de gráfico para que devuelva la figura compactada.
+    """
+    @functools.wraps(crear)
+    def envoltura(datos, *args, **kwargs):
+        return compactar_figura(crear(datos, *args, **kwargs))
+    return envoltura
+
+
+def _compactacion_disponible():
+    if not OPTIMIZAR_CARGA:
+        return False
+    if soporta_arreglos_binarios():
+        return True
+    registro.warning(
+        'plotly.js %s no entiende arreglos tipados (se necesita %s o posterior): las figuras se envían sin compactar',
+        '.'.join(map(str, version_plotlyjs())), '.'.join(map(str, VERSION_MINIMA_ARREGLOS)),
+    )
+    return False
+
+
+# Las figuras se compactan con DASHBOARD_OPTIMIZAR_CARGA=1 y solo si el plotly.js
+# que recibe el navegador entiende los arreglos tipados; el resto de la
+# optimización (detalle bajo demanda, compresión) no depende de la versión
+COMPACTAR_FIGURAS = _compactacion_disponible()
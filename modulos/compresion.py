@@ -0,0 +1,122 @@
+# modulos/compresion.py
+import gzip
+import threading
+from collections import OrderedDict
+
+from modulos.instrumentacion import metricas
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se usa gzip
+    brotli = None
+
+# Respuestas más chicas que esto no se comprimen (no compensa)
+MINIMO_BYTES = 1024
+
+TIPOS_COMPRIMIBLES = ('application/json', 'application/javascript', 'text/', 'image/svg+xml')
+
+# Archivos estáticos comprimidos (plotly.js, los componentes de Dash, assets/):
+# se comprimen una sola vez por versión y codificación
+MAX_ESTATICOS = 64
+
+
+def codificaciones_aceptadas(cabecera):
+    """
+    Devuelve las codificaciones que acepta un cliente según su cabecera
+    Accept-Encoding (las que tienen q=0 quedan afuera; '*' acepta gzip y br salvo
+    que se rechacen explícitamente).
+    """
+    aceptadas, rechazadas = set(), set()
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.partition(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        for parametro in parametros.split(';'):
+            clave, _, valor = parametro.partition('=')
+            if clave.strip().lower() == 'q':
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        (aceptadas if calidad > 0 else rechazadas).add(nombre)
+    if '*' in aceptadas:
+        aceptadas |= {'gzip', 'br'} - rechazadas
+    return aceptadas - {'*'}
+
+
+def _codificacion_aceptada(cabecera):
+    aceptadas = codificaciones_aceptadas(cabecera)
+    if brotli is not None and 'br' in aceptadas:
+        return 'br'
+    if 'gzip' in aceptadas:
+        return 'gzip'
+    return None
+
+
+def comprimir(cuerpo, codificacion, nivel_gzip=6, nivel_brotli=5):
+    """
+    Comprime un cuerpo de respuesta con 'br' o 'gzip'.
+    """
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=nivel_brotli)
+    return gzip.compress(cuerpo, compresslevel=nivel_gzip, mtime=0)
+
+
+def comprimir_respuestas(server, minimo=MINIMO_BYTES):
+    """
+    Comprime con brotli (si está instalado) o gzip las respuestas de la app Flask
+    cuando el navegador lo acepta: el layout, las respuestas de los callbacks con
+    las figuras y los archivos JavaScript/CSS que sirve Dash.
+
+    Los archivos estáticos se comprimen una sola vez y se guardan en memoria.
+
+    Args:
+        server: App Flask (`app.server`).
+        minimo: Tamaño mínimo en bytes para comprimir una respuesta.
+    """
+    from flask import request
+
+    estaticos = OrderedDict()
+    candado = threading.Lock()
+
+    @server.after_request
+    def _comprimir(respuesta):
+        if (
+            respuesta.status_code != 200
+            or 'Content-Encoding' in respuesta.headers
+            or not (respuesta.mimetype or '').startswith(TIPOS_COMPRIMIBLES)
+        ):
+            return respuesta
+        codificacion = _codificacion_aceptada(request.headers.get('Accept-Encoding', ''))
+        if codificacion is None:
+            return respuesta
+
+        estatico = respuesta.direct_passthrough
+        clave = (request.path, respuesta.headers.get('ETag') or respuesta.headers.get('Last-Modified'), codificacion)
+        with candado:
+            comprimido = estaticos.get(clave) if estatico else None
+        if comprimido is None:
+            respuesta.direct_passthrough = False
+            cuerpo = respuesta.get_data()
+            if len(cuerpo) < minimo:
+                return respuesta
+            with metricas.etapa('compresion'):
+                comprimido = comprimir(cuerpo, codificacion)
+            if estatico:
+                with candado:
+                    estaticos[clave] = comprimido
+                    while len(estaticos) > MAX_ESTATICOS:
+                        estaticos.popitem(last=False)
+        else:
+            # El archivo original no se lee, pero hay que cerrarlo
+            original = respuesta.response
+            if hasattr(original, 'close'):
+                respuesta.call_on_close(original.close)
+            respuesta.direct_passthrough = False
+
+        respuesta.set_data(comprimido)
+        respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+        return respuesta
@@ -0,0 +1,170 @@
+# modulos/construccion_paralela.py
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from modulos.dataset import DatasetFacturas
+from modulos.figuras import GRAFICOS_POR_ID
+
+# Formas de construir varias figuras:
+#   'secuencial' -> una tras otra en el proceso actual
+#   'hilos'      -> en un pool de hilos que comparten el mismo dataset
+#   'procesos'   -> en un pool de procesos; las columnas del dataset se copian una
+#                   sola vez a memoria compartida y los procesos las leen sin copiarlas
+MODOS_CONSTRUCCION = ('secuencial', 'hilos', 'procesos')
+
+
+def construir_figura_json(grafico, dataset):
+    """
+    Construye la figura de un gráfico y la devuelve serializada (como la guarda CacheFiguras).
+    """
+    return pio.to_json(grafico.crear(dataset), validate=False)
+
+
+def _copiar_a_memoria(arreglo, segmentos):
+    segmento = shared_memory.SharedMemory(create=True, size=max(arreglo.nbytes, 1))
+    segmentos.append(segmento)
+    np.ndarray(arreglo.shape, dtype=arreglo.dtype, buffer=segmento.buf)[...] = arreglo
+    return segmento.name, arreglo.dtype.str, arreglo.shape
+
+
+def _abrir_de_memoria(parte, segmentos):
+    nombre, tipo, forma = parte
+    segmento = shared_memory.SharedMemory(name=nombre)
+    segmentos.append(segmento)
+    arreglo = np.ndarray(forma, dtype=np.dtype(tipo), buffer=segmento.buf)
+    arreglo.flags.writeable = False
+    return arreglo
+
+
+def compartir_facturas(facturas, segmentos):
+    """
+    Copia las columnas de las facturas a segmentos de memoria compartida.
+
+    Las columnas NumPy se copian tal cual, las categóricas como códigos (las
+    categorías viajan en la descripción) y las enteras con faltantes (Int16) como
+    valores más máscara. Cualquier otra columna se incluye entera en la descripción.
+
+    Args:
+        facturas: DataFrame de un DatasetFacturas.
+        segmentos: Lista a la que se agregan los segmentos creados; quien llama
+            debe cerrarlos y liberarlos (`close` y `unlink`) al terminar.
+
+    Returns:
+        descripcion: Estructura liviana (se puede enviar a otro proceso) para
+        reconstruir las facturas con `abrir_facturas`.
+    """
+    columnas = []
+    for nombre in facturas.columns:
+        serie = facturas[nombre]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            partes = {
+                'codigos': _copiar_a_memoria(np.asarray(serie.cat.codes), segmentos),
+                'categorias': serie.cat.categories,
+            }
+            columnas.append((nombre, 'categorica', partes))
+        elif isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'biufM':
+            columnas.append((nombre, 'numpy', _copiar_a_memoria(serie.to_numpy(), segmentos)))
+        elif isinstance(serie.array, pd.api.extensions.ExtensionArray) and serie.dtype.name in ('Int8', 'Int16', 'Int32', 'Int64'):
+            partes = {
+                'valores': _copiar_a_memoria(serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0), segmentos),
+                'mascara': _copiar_a_memoria(serie.isna().to_numpy(), segmentos),
+                'tipo': serie.dtype.name,
+            }
+            columnas.append((nombre, 'enmascarada', partes))
+        else:
+            columnas.append((nombre, 'serie', serie))
+    return {'indice': facturas.index, 'columnas': columnas}
+
+
+def abrir_facturas(descripcion, segmentos):
+    """
+    Reconstruye las facturas a partir de la descripción de `compartir_facturas`,
+    sin copiar los datos que están en memoria compartida.
+
+    Args:
+        descripcion: Resultado de `compartir_facturas`.
+        segmentos: Lista a la que se agregan los segmentos abiertos (deben seguir
+            abiertos mientras se use el DataFrame).
+
+    Returns:
+        facturas: DataFrame de solo lectura.
+    """
+    datos = {}
+    for nombre, tipo, partes in descripcion['columnas']:
+        if tipo == 'categorica':
+            datos[nombre] = pd.Categorical.from_codes(_abrir_de_memoria(partes['codigos'], segmentos), partes['categorias'])
+        elif tipo == 'numpy':
+            datos[nombre] = _abrir_de_memoria(partes, segmentos)
+        elif tipo == 'enmascarada':
+            clase = pd.api.types.pandas_dtype(partes['tipo']).construct_array_type()
+            datos[nombre] = clase(_abrir_de_memoria(partes['valores'], segmentos), _abrir_de_memoria(partes['mascara'], segmentos))
+        else:
+            datos[nombre] = partes
+    return pd.DataFrame(datos, index=descripcion['indice'], copy=False)
+
+
+# Estado de cada proceso del pool (se inicializa una vez por proceso)
+_dataset_trabajador = None
+_segmentos_trabajador = []
+
+
+def _iniciar_trabajador(descripcion, agregados, version):
+    global _dataset_trabajador
+    facturas = None if descripcion is None else abrir_facturas(descripcion, _segmentos_trabajador)
+    _dataset_trabajador = DatasetFacturas(facturas=facturas, agregados=agregados, version=version)
+
+
+def _construir_en_trabajador(id_grafico):
+    return construir_figura_json(GRAFICOS_POR_ID[id_grafico], _dataset_trabajador)
+
+
+def construir_figuras(dataset, graficos, modo='hilos', trabajadores=None):
+    """
+    Construye y serializa varias figuras sobre el mismo dataset, en paralelo si se pide.
+
+    Las funciones de gráficos solo leen el dataset, por lo que pueden ejecutarse a
+    la vez. Con 'hilos' todas usan el mismo objeto; con 'procesos' las facturas se
+    publican en memoria compartida y cada proceso las abre sin copiarlas (solo los
+    agregados, que son pequeños, se envían a cada proceso). En ambos casos el tiempo
+    total tiende al del gráfico más lento.
+
+    Args:
+        dataset: DatasetFacturas sobre el que se construyen las figuras.
+        graficos: Lista de Grafico (en modo 'procesos' deben estar en GRAFICOS_POR_ID).
+        modo: Uno de MODOS_CONSTRUCCION.
+        trabajadores: Tamaño del pool (por defecto, uno por gráfico sin superar los CPUs).
+
+    Returns:
+        figuras: Diccionario id del gráfico -> figura serializada como JSON.
+    """
+    if modo not in MODOS_CONSTRUCCION:
+        raise ValueError('Modo de construcción desconocido: %s' % modo)
+    ids = [grafico.id for grafico in graficos]
+    if modo == 'secuencial' or len(graficos) < 2:
+        return {grafico.id: construir_figura_json(grafico, dataset) for grafico in graficos}
+
+    if trabajadores is None:
+        trabajadores = min(len(graficos), os.cpu_count() or 1)
+
+    if modo == 'hilos':
+        with ThreadPoolExecutor(max_workers=trabajadores) as pool:
+            return dict(zip(ids, pool.map(lambda grafico: construir_figura_json(grafico, dataset), graficos)))
+
+    segmentos = []
+    try:
+        descripcion = None if dataset.facturas is None else compartir_facturas(dataset.facturas, segmentos)
+        with ProcessPoolExecutor(
+            max_workers=trabajadores,
+            initializer=_iniciar_trabajador,
+            initargs=(descripcion, dataset.agregados, dataset.version),
+        ) as pool:
+            return dict(zip(ids, pool.map(_construir_en_trabajador, ids)))
+    finally:
+        for segmento in segmentos:
+            segmento.close()
+            segmento.unlink()
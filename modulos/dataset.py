@@ -0,0 +1,278 @@
+# modulos/dataset.py
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from modulos.agregados import Agregados, calcular_agregados
+from modulos.preparar_datos import compactar_columnas, preparar_columnas_fecha
+
+COLUMNAS_FECHA = ['Fecha de Emisión', 'Fecha Recepción', 'Fecha Estimada Pago']
+
+# Estados según la diferencia en días respecto de la emisión
+CATEGORIAS_ESTADO = ['Emisión', 'Recepción']
+
+
+@dataclass(frozen=True, eq=False)
+class DatasetFacturas:
+    """
+    Conjunto de facturas preparado una sola vez y compartido por todos los gráficos.
+
+    Los gráficos solo leen de este objeto: las columnas numéricas y de fecha son
+    arreglos de solo lectura, por lo que se puede construir varias figuras a la vez
+    sobre el mismo dataset sin copias ni efectos secundarios. Dos datasets solo son
+    iguales si son el mismo objeto (se pueden usar como clave de caches).
+
+    Attributes:
+        facturas: DataFrame con las facturas, fechas en datetime64, las columnas
+            derivadas 'Diferencia Fecha Recepción' y 'Diferencia Fecha Pago Estimado'
+            (Int16) y la clasificación 'Estado Recepción' de la primera
+            (None si el dataset se cargó solo como agregados, ver `modulos.carga_por_bloques`).
+        agregados: Agregados precalculados sobre `facturas`.
+        version: Identificador de los datos de origen; cambia cuando cambian los datos
+            y sirve como parte de la clave de las caches de figuras.
+        almacen: Base SQLite con las facturas (ver `modulos.almacen_sqlite`) cuando
+            no están en memoria; los filtros y la tabla de facturas se resuelven con
+            consultas a ella.
+    """
+    facturas: pd.DataFrame
+    agregados: Agregados
+    version: str
+    almacen: object = None
+
+    @cached_property
+    def indice(self):
+        """
+        Índices de fecha y proveedor sobre `facturas` (se construyen la primera vez que se usan).
+        """
+        return IndiceFacturas.desde_facturas(self.facturas)
+
+
+@dataclass(frozen=True)
+class IndiceFacturas:
+    """
+    Índices para filtrar las facturas sin recorrer la tabla completa.
+
+    Las facturas están ordenadas por 'Fecha de Emisión', así que un rango de fechas
+    es un rango de filas que se obtiene con búsqueda binaria. Para los proveedores
+    se guardan las posiciones de sus filas agrupadas (formato CSR): las filas del
+    proveedor `i` son `filas_por_proveedor[inicios[i]:inicios[i + 1]]`, en orden de fecha.
+
+    Attributes:
+        emision: Arreglo datetime64 ordenado con la fecha de emisión de cada fila.
+        proveedores: Index con el nombre de cada proveedor (posición = código).
+        filas_por_proveedor: Posiciones de fila agrupadas por proveedor.
+        inicios: Desplazamiento de inicio de cada proveedor en `filas_por_proveedor`.
+    """
+    emision: np.ndarray
+    proveedores: pd.Index
+    filas_por_proveedor: np.ndarray
+    inicios: np.ndarray
+
+    @classmethod
+    def desde_facturas(cls, facturas):
+        proveedor = facturas['Proveedor Facturador']
+        if isinstance(proveedor.dtype, pd.CategoricalDtype):
+            # Los códigos de la categórica ya identifican a cada proveedor
+            codigos, proveedores = np.asarray(proveedor.cat.codes), proveedor.cat.categories
+        else:
+            codigos, proveedores = pd.factorize(proveedor)
+        # El orden estable conserva dentro de cada proveedor el orden por fecha
+        filas = np.argsort(codigos, kind='stable')
+        filas = filas[codigos[filas] >= 0]
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(proveedores))
+        inicios = np.concatenate([[0], np.cumsum(conteos)])
+        return cls(
+            emision=facturas['Fecha de Emisión'].to_numpy(dtype='datetime64[ns]'),
+            proveedores=pd.Index(proveedores),
+            filas_por_proveedor=filas,
+            inicios=inicios,
+        )
+
+    def rango_fechas(self, desde=None, hasta=None):
+        """
+        Devuelve el rango de filas [inicio, fin) con emisión entre `desde` y `hasta` (inclusive, por día).
+        """
+        inicio = 0
+        fin = len(self.emision)
+        if desde is not None:
+            inicio = int(np.searchsorted(self.emision, np.datetime64(pd.Timestamp(desde).normalize(), 'ns'), 'left'))
+        if hasta is not None:
+            limite = pd.Timestamp(hasta).normalize() + pd.Timedelta(days=1)
+            fin = int(np.searchsorted(self.emision, np.datetime64(limite, 'ns'), 'left'))
+        elif desde is not None:
+            # Sin límite superior se excluyen igualmente las fechas faltantes (NaT, al final)
+            fin = int(np.searchsorted(self.emision, np.datetime64('NaT'), 'left'))
+        return inicio, max(inicio, fin)
+
+    def filas(self, desde=None, hasta=None, proveedores=None):
+        """
+        Devuelve las filas que cumplen los filtros.
+
+        Returns:
+            filas: `slice` si solo se filtra por fecha, o arreglo ordenado de posiciones
+            si además se filtra por proveedor.
+        """
+        inicio, fin = self.rango_fechas(desde, hasta)
+        if proveedores is None:
+            return slice(inicio, fin)
+
+        segmentos = []
+        for codigo in self.proveedores.get_indexer(list(proveedores)):
+            if codigo < 0:
+                continue
+            segmento = self.filas_por_proveedor[self.inicios[codigo]:self.inicios[codigo + 1]]
+            # Las filas de cada proveedor están ordenadas: el rango de fechas se recorta
+            # también con búsqueda binaria
+            a, b = np.searchsorted(segmento, [inicio, fin])
+            segmentos.append(segmento[a:b])
+        if not segmentos:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(segmentos))
+
+
+def clasificar_diferencia(dias):
+    """
+    Clasifica diferencias en días como "Emisión" (<= 0) o "Recepción" (> 0).
+
+    Args:
+        dias: Arreglo o Serie con la diferencia en días respecto de la fecha de emisión.
+
+    Returns:
+        estados: Categorical con las categorías de CATEGORIAS_ESTADO (los valores
+        faltantes se clasifican como "Recepción", igual que antes).
+    """
+    dias = pd.Series(dias).to_numpy(dtype=float, na_value=np.nan)
+    codigos = np.where(dias <= 0, 0, 1).astype(np.int8)
+    return pd.Categorical.from_codes(codigos, CATEGORIAS_ESTADO)
+
+
+def _dias_entre(fin, inicio):
+    # Diferencia en días como entero de 16 bits con valores faltantes (Int16)
+    dias = (fin - inicio).dt.days.clip(np.iinfo(np.int16).min + 1, np.iinfo(np.int16).max)
+    return dias.astype('Int16')
+
+
+def _solo_lectura(serie):
+    # Solo las columnas NumPy numéricas y de fecha se guardan como arreglos de solo
+    # lectura; las categóricas y las enteras con faltantes se dejan tal cual
+    if not isinstance(serie.dtype, np.dtype) or serie.dtype.kind not in 'biufM':
+        return serie.array
+    valores = serie.to_numpy()
+    if valores.flags.writeable:
+        valores = valores.copy()
+        valores.flags.writeable = False
+    return valores
+
+
+def preparar_facturas(df):
+    """
+    Construye la tabla de facturas de solo lectura que usa DatasetFacturas.
+
+    Las fechas solo se convierten si aún no están en datetime64, y las diferencias
+    en días entre emisión, recepción y pago estimado se calculan de forma vectorial
+    una única vez (como Int16), junto con la clasificación 'Estado Recepción'
+    (categórica). 'Estado Pago' se conserva tal como viene del archivo. El texto se
+    guarda como categórico y los enteros con el tipo más pequeño posible. El
+    DataFrame recibido no se modifica.
+
+    Args:
+        df: DataFrame con los datos de proveedores (por ejemplo, el de `cargar_datos`).
+
+    Returns:
+        facturas: Nuevo DataFrame con fechas tipadas y columnas de diferencias en días.
+    """
+    if any(df[columna].dtype.kind != 'M' for columna in COLUMNAS_FECHA):
+        df = preparar_columnas_fecha(df.copy())
+
+    # Ordenar por fecha de emisión (fechas faltantes al final) para poder filtrar
+    # rangos de fechas con búsqueda binaria
+    orden = np.argsort(df['Fecha de Emisión'].to_numpy(dtype='datetime64[ns]'), kind='stable')
+    if (orden != np.arange(len(orden))).any():
+        df = df.take(orden)
+
+    df = compactar_columnas(df)
+    emision = df['Fecha de Emisión']
+    columnas = {nombre: _solo_lectura(df[nombre]) for nombre in df.columns}
+    columnas['Diferencia Fecha Recepción'] = _dias_entre(df['Fecha Recepción'], emision).array
+    columnas['Diferencia Fecha Pago Estimado'] = _dias_entre(df['Fecha Estimada Pago'], emision).array
+    columnas['Estado Recepción'] = clasificar_diferencia(columnas['Diferencia Fecha Recepción'])
+    return pd.DataFrame(columnas, columns=list(columnas), copy=False)
+
+
+def version_contenido(df):
+    """
+    Calcula una versión a partir del contenido del DataFrame (hash de sus filas).
+    """
+    huella = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(huella.tobytes()).hexdigest()[:16]
+
+
+def crear_dataset(df, version=None, agregados=None):
+    """
+    Prepara el dataset inmutable de facturas y sus agregados a partir de un DataFrame cargado.
+
+    Args:
+        df: DataFrame con los datos de proveedores (por ejemplo, el de `cargar_datos`).
+        version: Versión de los datos (por ejemplo, `version_datos` del archivo de
+            origen). Si no se indica, se calcula a partir del contenido.
+        agregados: Agregados ya calculados para `df` (por ejemplo, los guardados en
+            la cache). Si no se indican, se calculan.
+
+    Returns:
+        dataset: DatasetFacturas listo para los gráficos.
+    """
+    if version is None:
+        version = version_contenido(df)
+    facturas = preparar_facturas(df)
+    if agregados is None:
+        agregados = calcular_agregados(facturas)
+    return DatasetFacturas(facturas=facturas, agregados=agregados, version=version)
+
+
+def obtener_facturas(datos):
+    """
+    Devuelve el DataFrame de facturas de `datos`, preparándolo si se recibe un DataFrame suelto.
+
+    Devuelve None si `datos` solo trae agregados (por ejemplo, los de una carga por bloques).
+    """
+    if isinstance(datos, DatasetFacturas):
+        return datos.facturas
+    if isinstance(datos, Agregados):
+        return None
+    return preparar_facturas(datos)
+
+
+def filtrar_dataset(dataset, desde=None, hasta=None, proveedores=None):
+    """
+    Devuelve un DatasetFacturas con las facturas que cumplen los filtros.
+
+    Solo se recorren las filas seleccionadas (por rango de fechas y por las filas
+    de cada proveedor) y sus agregados se recalculan sobre ese subconjunto.
+
+    Args:
+        dataset: DatasetFacturas completo.
+        desde: Fecha de emisión mínima (inclusive) o None.
+        hasta: Fecha de emisión máxima (inclusive) o None.
+        proveedores: Lista de proveedores a incluir o None para todos.
+
+    Returns:
+        dataset: Nuevo DatasetFacturas con la misma versión que el original.
+    """
+    if desde is None and hasta is None and not proveedores:
+        return dataset
+    if dataset.almacen is not None:
+        # Los agregados del subconjunto se calculan con consultas a la base
+        agregados = dataset.almacen.agregados(desde, hasta, proveedores or None)
+        return DatasetFacturas(facturas=None, agregados=agregados, version=dataset.version, almacen=dataset.almacen)
+    if dataset.facturas is None:
+        return dataset
+    filas = dataset.indice.filas(desde, hasta, proveedores or None)
+    if isinstance(filas, slice):
+        facturas = dataset.facturas.iloc[filas]
+    else:
+        facturas = dataset.facturas.take(filas)
+    facturas = facturas.reset_index(drop=True)
+    return DatasetFacturas(facturas=facturas, agregados=calcular_agregados(facturas), version=dataset.version)
@@ -0,0 +1,134 @@
+# modulos/desglose_facturas.py
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Columnas de la tabla de facturas de un proveedor, en el orden en que se muestran
+COLUMNAS_DESGLOSE = [
+    'Nº Factura', 'Tipo Factura', 'Fecha de Emisión', 'Fecha Recepción',
+    'Fecha Estimada Pago', 'Monto Total', 'Estado Documento', 'Estado Pago',
+]
+
+# Filas por página de la tabla (solo esas filas viajan al navegador)
+FILAS_POR_PAGINA = int(os.environ.get('DASHBOARD_FILAS_POR_PAGINA', 25))
+
+# Órdenes de proveedor/columna/filtro de fechas que se guardan en memoria para
+# paginar sin volver a ordenar
+MAX_ORDENES = 32
+
+
+def filas_proveedor(dataset, proveedor, desde=None, hasta=None):
+    """
+    Devuelve las filas de un proveedor con emisión entre `desde` y `hasta`, en orden de fecha.
+
+    Las filas salen del índice CSR del dataset: el segmento del proveedor ya está
+    ordenado por fecha, así que el rango de fechas se recorta con búsqueda binaria
+    sin recorrer el resto de las facturas.
+
+    Args:
+        dataset: DatasetFacturas con las facturas cargadas.
+        proveedor: Nombre del proveedor.
+        desde: Fecha inicial (opcional, inclusive).
+        hasta: Fecha final (opcional, inclusive).
+
+    Returns:
+        filas: Arreglo de posiciones de fila (vacío si el proveedor no existe, por
+        ejemplo, la barra "Otros").
+    """
+    indice = dataset.indice
+    codigo = indice.proveedores.get_indexer([proveedor])[0]
+    if codigo < 0:
+        return np.empty(0, dtype=np.intp)
+    segmento = indice.filas_por_proveedor[indice.inicios[codigo]:indice.inicios[codigo + 1]]
+    inicio, fin = indice.rango_fechas(desde, hasta)
+    a, b = np.searchsorted(segmento, [inicio, fin])
+    return segmento[a:b]
+
+
+def _clave_orden(columna, filas):
+    # Devuelve (clave, faltantes) para ordenar las filas por una columna: las
+    # categóricas por el orden alfabético de sus categorías y las fechas como enteros
+    if isinstance(columna.dtype, pd.CategoricalDtype):
+        codigos = np.asarray(columna.cat.codes)[filas]
+        rangos = np.empty(len(columna.cat.categories), dtype=np.int64)
+        rangos[np.argsort(columna.cat.categories.astype(str))] = np.arange(len(rangos))
+        return np.where(codigos >= 0, rangos[codigos], 0), codigos < 0
+    if columna.dtype.kind == 'M':
+        valores = columna.to_numpy()[filas]
+        return valores.view(np.int64), np.isnat(valores)
+    valores = columna.array[filas]
+    return valores.to_numpy(dtype='float64', na_value=0.0), np.asarray(pd.isna(valores))
+
+
+@lru_cache(maxsize=MAX_ORDENES)
+def _orden_filas(dataset, proveedor, desde, hasta, columna, descendente):
+    filas = filas_proveedor(dataset, proveedor, desde, hasta)
+    clave, faltantes = _clave_orden(dataset.facturas[columna], filas)
+    if descendente:
+        clave = -clave
+    # Los faltantes van al final y los empates quedan en orden de fecha
+    return filas[np.lexsort((np.arange(len(filas)), clave, faltantes))]
+
+
+def limpiar_ordenes():
+    """
+    Descarta los órdenes guardados (por ejemplo, al recargar los datos).
+    """
+    _orden_filas.cache_clear()
+
+
+def _registros(facturas, filas):
+    # Convierte las filas de una página en registros para la tabla (fechas como
+    # texto); las columnas que el archivo no trae quedan vacías
+    registros = {}
+    for nombre in COLUMNAS_DESGLOSE:
+        if nombre not in facturas.columns:
+            registros[nombre] = [None] * len(filas)
+            continue
+        columna = facturas[nombre]
+        valores = columna.iloc[filas]
+        if columna.dtype.kind == 'M':
+            # Con el tipo de texto de pandas, where(..., None) deja NaN: se pasa a objeto antes
+            texto = valores.dt.strftime('%Y-%m-%d').astype(object)
+            registros[nombre] = texto.where(valores.notna(), None).tolist()
+        else:
+            registros[nombre] = valores.astype(object).where(valores.notna(), None).tolist()
+    return [dict(zip(registros, fila)) for fila in zip(*registros.values())]
+
+
+def pagina_facturas(dataset, proveedor, desde=None, hasta=None, pagina=0, filas_por_pagina=None, orden=None):
+    """
+    Devuelve una página de las facturas de un proveedor.
+
+    Sin orden (o por fecha de emisión ascendente) la página es un tramo del
+    segmento del proveedor en el índice; con otro orden, las filas del proveedor se
+    ordenan una vez y el orden queda en memoria para las páginas siguientes.
+
+    Args:
+        dataset: DatasetFacturas con las facturas cargadas (o con su base SQLite).
+        proveedor: Nombre del proveedor.
+        desde: Fecha inicial (opcional, inclusive).
+        hasta: Fecha final (opcional, inclusive).
+        pagina: Número de página, desde 0.
+        filas_por_pagina: Tamaño de la página (por defecto FILAS_POR_PAGINA).
+        orden: Tupla (columna, descendente) de COLUMNAS_DESGLOSE (opcional).
+
+    Returns:
+        registros: Lista de diccionarios columna -> valor con las filas de la página.
+        total: Cantidad de facturas del proveedor con los filtros.
+    """
+    filas_por_pagina = filas_por_pagina or FILAS_POR_PAGINA
+    if dataset.almacen is not None:
+        return dataset.almacen.pagina_facturas(proveedor, desde, hasta, pagina, filas_por_pagina, orden)
+    if orden is not None and orden[0] not in COLUMNAS_DESGLOSE:
+        raise ValueError('No se puede ordenar por %s' % orden[0])
+    if orden is None or orden == ('Fecha de Emisión', False) or orden[0] not in dataset.facturas.columns:
+        # Una columna que el archivo no trae está vacía: no cambia el orden
+        filas = filas_proveedor(dataset, proveedor, desde, hasta)
+    else:
+        columna, descendente = orden
+        filas = _orden_filas(dataset, proveedor, desde, hasta, columna, bool(descendente))
+    inicio = max(pagina, 0) * filas_por_pagina
+    return _registros(dataset.facturas, filas[inicio:inicio + filas_por_pagina]), len(filas)
@@ -1,54 +1,205 @@
+import os
+
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+
+from modulos.agregados import obtener_agregados
+from modulos.compactar_figuras import OPTIMIZAR_CARGA
+from modulos.dataset import CATEGORIAS_ESTADO, COLUMNAS_FECHA, clasificar_diferencia, obtener_facturas
+
+# Por encima de esta cantidad de facturas el gráfico deja de dibujar cada factura
+# y agrupa los puntos en una grilla de fechas (ver `_agrupar_coincidentes`)
+LIMITE_PUNTOS_DISPERSION = int(os.environ.get('DASHBOARD_LIMITE_PUNTOS_DISPERSION', 20000))
+
+# Celdas de la grilla por eje en el modo agrupado: cada serie tiene a lo sumo
+# (CELDAS_POR_EJE + 1)² marcadores, sin importar los años de historia
+CELDAS_POR_EJE = int(os.environ.get('DASHBOARD_CELDAS_DISPERSION', 250))
+
+COLORES_ESTADO = {'Emisión': 'orange', 'Recepción': 'deepskyblue'}
+
+
+def _ancho_celda(dias, celdas):
+    # Días por celda (potencia de 2) para cubrir el rango de `dias` con unas
+    # `celdas` celdas. Como las celdas se alinean con 1970-01-01, la grilla de un
+    # rango más chico subdivide la de uno más grande y nunca junta celdas distintas
+    if len(dias) == 0:
+        return 1
+    ancho = max(1, -(-(int(dias.max()) - int(dias.min()) + 1) // celdas))
+    return 1 << (ancho - 1).bit_length()
+
+
+def _fecha_promedio(suma_dias, facturas):
+    # Día promedio (días desde 1970 ponderados por facturas) como datetime64[ns]
+    dias = np.round(suma_dias.to_numpy() / facturas.to_numpy()).astype(np.int64)
+    return dias.astype('datetime64[D]').astype('datetime64[ns]')
 
-def crear_grafico_fecha_proveedor(df):
+
+def _agrupar_coincidentes(por_fechas, columna_y, con_estado=False, celdas=None):
+    # Agrupa las facturas en una grilla fija de (emisión, columna_y) a partir del
+    # conteo por fechas de los agregados. Cada celda cubre tantos días como haga
+    # falta para que el rango de fechas entre en unas `celdas` celdas por eje (un
+    # día si el rango es corto, así los puntos coinciden con sus fechas exactas) y
+    # se dibuja en el promedio de fechas de sus facturas. El tamaño del gráfico
+    # queda acotado aunque la historia tenga muchos días distintos. Los agregados
+    # de la base SQLite ya vienen agrupados en esta misma grilla
+    if celdas is None:
+        celdas = CELDAS_POR_EJE
+    puntos = por_fechas[['Fecha de Emisión', columna_y, 'Facturas']].dropna(subset=['Fecha de Emisión', columna_y])
+    x = puntos['Fecha de Emisión'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    y = puntos[columna_y].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    facturas = puntos['Facturas'].to_numpy(dtype=np.int64)
+    ancho_x, ancho_y = _ancho_celda(x, celdas), _ancho_celda(y, celdas)
+    tabla = pd.DataFrame({
+        'celda_x': x // ancho_x,
+        'celda_y': y // ancho_y,
+        'suma_x': x * facturas,
+        'suma_y': y * facturas,
+        'Facturas': facturas,
+    })
+    claves = ['celda_x', 'celda_y']
+    if con_estado:
+        tabla['estado'] = clasificar_diferencia(y - x)
+        claves.append('estado')
+    grupos = tabla.groupby(claves, observed=True, sort=False)[['suma_x', 'suma_y', 'Facturas']].sum().reset_index()
+    resultado = pd.DataFrame({
+        'x': _fecha_promedio(grupos['suma_x'], grupos['Facturas']),
+        'y': _fecha_promedio(grupos['suma_y'], grupos['Facturas']),
+        'Facturas': grupos['Facturas'].to_numpy(),
+    })
+    if con_estado:
+        resultado['estado'] = grupos['estado'].to_numpy()
+    return resultado
+
+
+def _tamano_marcador(conteos):
+    # Escala logarítmica para que los grupos grandes no tapen al resto
+    return np.minimum(4 + 3 * np.log2(conteos.to_numpy(dtype=float)), 24)
+
+
+def _dibuja_facturas(facturas, limite_puntos):
+    # True si el gráfico muestra cada factura por separado (y no grupos por fecha)
+    if limite_puntos is None:
+        limite_puntos = LIMITE_PUNTOS_DISPERSION
+    return facturas is not None and len(facturas) <= limite_puntos
+
+
+def crear_grafico_fecha_proveedor(datos, limite_puntos=None, detalle_bajo_demanda=None):
     """
     Crea un gráfico de dispersión para la relación entre Fecha de Emisión, Fecha de Recepción y Fecha Estimada de Pago.
-    
+
+    Los puntos se dibujan con WebGL (Scattergl). Si hay más facturas que
+    `limite_puntos` (o si solo se dispone de los agregados), las facturas se
+    agrupan en una grilla de unas CELDAS_POR_EJE celdas por eje y cada celda
+    es un marcador cuyo tamaño depende de la cantidad de facturas.
+
     Args:
-        df: DataFrame con los datos de proveedores.
-    
+        datos: DatasetFacturas, Agregados o DataFrame con los datos de proveedores.
+        limite_puntos: Máximo de facturas a dibujar una por una (por defecto
+            LIMITE_PUNTOS_DISPERSION).
+        detalle_bajo_demanda: Si es True, los puntos solo llevan la posición de la
+            factura y el Nº Factura y el Proveedor se consultan con `detalle_factura`
+            al pasar el mouse (por defecto, con DASHBOARD_OPTIMIZAR_CARGA=1).
+
     Returns:
         fig: Figura de plotly con el gráfico de dispersión.
     """
-    # Asegurarse de que las columnas de fechas estén en formato datetime
-    df['Fecha de Emisión'] = pd.to_datetime(df['Fecha de Emisión'], errors='coerce')
-    df['Fecha Recepción'] = pd.to_datetime(df['Fecha Recepción'], errors='coerce')
-    df['Fecha Estimada Pago'] = pd.to_datetime(df['Fecha Estimada Pago'], errors='coerce')
-
-    # Crear una columna para la diferencia de fechas (emisión vs recepción)
-    df['Diferencia Fecha Recepción'] = (df['Fecha Recepción'] - df['Fecha de Emisión']).dt.days
-    df['Diferencia Fecha Pago Estimado'] = (df['Fecha Estimada Pago'] - df['Fecha de Emisión']).dt.days
-
-    # Clasificamos en dos grupos: "Emisión" y "Recepción" para ambos casos
-    df['Color Recepción'] = df['Diferencia Fecha Recepción'].apply(lambda x: 'Emisión' if x <= 0 else 'Recepción')
-    df['Color Pago'] = df['Diferencia Fecha Pago Estimado'].apply(lambda x: 'Emisión' if x <= 0 else 'Recepción')
-
-    # Crear gráfico de dispersión para la relación Fecha de Emisión vs Fecha de Recepción
-    fig = px.scatter(df, 
-                     x='Fecha de Emisión', 
-                     y='Fecha Recepción',
-                     title='Fecha de Emisión vs. Fecha de Recepción y Fecha Estimada de Pago',
-                     labels={'Fecha de Emisión': 'Fecha de Emisión', 'Fecha Recepción': 'Fecha de Recepción'},
-                     color='Color Recepción',  # Diferenciar por el valor de la columna 'Color Recepción'
-                     color_discrete_map={'Emisión': 'orange', 'Recepción': 'deepskyblue'},  # Colores para Emisión y Recepción
-                     hover_data={'Nº Factura': True, 'Proveedor Facturador': True, 'Fecha de Emisión': True, 'Fecha Recepción': True})  # Mostrar fechas exactas al interactuar
-
-    # Añadir los puntos para "Fecha Estimada Pago" sobre el mismo gráfico con etiquetas interactivas
-    fig.add_scatter(x=df['Fecha de Emisión'], 
-                    y=df['Fecha Estimada Pago'],
-                    mode='markers', 
-                    marker=dict(color='red', symbol='circle'),  # Color para los puntos de "Fecha Estimada Pago"
-                    name="Fecha Estimada Pago",
-                    hovertemplate=
-                    'Fecha Estimada de Pago: %{y}<br>' +
-                    'Fecha de Emisión: %{x}<br>' +
-                    'Nº Factura: %{customdata[0]}<br>' +
-                    'Proveedor Facturador: %{customdata[1]}',  # Personalización de la etiqueta
-                    customdata=df[['Nº Factura', 'Proveedor Facturador']])  # Incluir datos personalizados para las etiquetas interactivas
+    # Las fechas y las diferencias en días ya vienen calculadas en el dataset
+    facturas = obtener_facturas(datos)
+    if detalle_bajo_demanda is None:
+        detalle_bajo_demanda = OPTIMIZAR_CARGA
+
+    fig = go.Figure()
+
+    if not _dibuja_facturas(facturas, limite_puntos):
+        por_fechas = obtener_agregados(datos).por_fechas
+        coincidentes = _agrupar_coincidentes(por_fechas, 'Fecha Recepción', con_estado=True)
+        for estado in CATEGORIAS_ESTADO:
+            grupo = coincidentes[coincidentes['estado'] == estado]
+            fig.add_trace(go.Scattergl(
+                x=grupo['x'],
+                y=grupo['y'],
+                mode='markers',
+                name=estado,
+                legendgroup=estado,
+                marker=dict(color=COLORES_ESTADO[estado], symbol='circle', size=_tamano_marcador(grupo['Facturas'])),
+                customdata=grupo['Facturas'],
+                hovertemplate='Fecha de Emisión=%{x}<br>Fecha de Recepción=%{y}<br>Facturas=%{customdata:,}<extra>' + estado + '</extra>',
+            ))
+
+        coincidentes_pago = _agrupar_coincidentes(por_fechas, 'Fecha Estimada Pago')
+        fig.add_trace(go.Scattergl(
+            x=coincidentes_pago['x'],
+            y=coincidentes_pago['y'],
+            mode='markers',
+            marker=dict(color='red', symbol='circle', size=_tamano_marcador(coincidentes_pago['Facturas'])),
+            name="Fecha Estimada Pago",
+            customdata=coincidentes_pago['Facturas'],
+            hovertemplate='Fecha Estimada de Pago: %{y}<br>Fecha de Emisión: %{x}<br>Facturas: %{customdata:,}<extra></extra>',
+        ))
+    else:
+        emision = facturas['Fecha de Emisión']
+        recepcion = facturas['Fecha Recepción']
+        pago = facturas['Fecha Estimada Pago']
+
+        # Clasificación precalculada en el dataset: "Emisión" si se recibió el mismo
+        # día (o antes), "Recepción" si después
+        estados = facturas['Estado Recepción'].cat
+
+        if detalle_bajo_demanda:
+            # Solo la posición de cada factura; el detalle se pide al pasar el mouse
+            customdata = np.arange(len(facturas), dtype=np.int32)
+            etiqueta_pago = 'Fecha Estimada de Pago: %{y}<br>Fecha de Emisión: %{x}<extra></extra>'
+        else:
+            # Nº Factura y Proveedor para las etiquetas interactivas de cada punto
+            customdata = np.column_stack([
+                facturas['Nº Factura'].to_numpy(dtype=object),
+                facturas['Proveedor Facturador'].to_numpy(dtype=object),
+            ])
+            etiqueta_detalle = (
+                'Fecha de Emisión=%{x}<br>' +
+                'Fecha de Recepción=%{y}<br>' +
+                'Nº Factura=%{customdata[0]}<br>' +
+                'Proveedor Facturador=%{customdata[1]}<extra></extra>'
+            )
+            etiqueta_pago = (
+                'Fecha Estimada de Pago: %{y}<br>' +
+                'Fecha de Emisión: %{x}<br>' +
+                'Nº Factura: %{customdata[0]}<br>' +
+                'Proveedor Facturador: %{customdata[1]}'  # Personalización de la etiqueta
+            )
+        codigos = np.asarray(estados.codes)
+        for codigo, estado in enumerate(CATEGORIAS_ESTADO):
+            mascara = codigos == codigo
+            if detalle_bajo_demanda:
+                etiqueta_estado = 'Fecha de Emisión=%{x}<br>Fecha de Recepción=%{y}<extra>' + estado + '</extra>'
+            else:
+                etiqueta_estado = 'Color Recepción=' + estado + '<br>' + etiqueta_detalle
+            fig.add_trace(go.Scattergl(
+                x=emision.to_numpy()[mascara],
+                y=recepcion.to_numpy()[mascara],
+                mode='markers',
+                name=estado,
+                legendgroup=estado,
+                marker=dict(color=COLORES_ESTADO[estado], symbol='circle'),
+                customdata=customdata[mascara],
+                hovertemplate=etiqueta_estado,
+            ))
+
+        # Añadir los puntos para "Fecha Estimada Pago" sobre el mismo gráfico con etiquetas interactivas
+        fig.add_trace(go.Scattergl(
+            x=emision,
+            y=pago,
+            mode='markers',
+            marker=dict(color='red', symbol='circle'),  # Color para los puntos de "Fecha Estimada Pago"
+            name="Fecha Estimada Pago",
+            hovertemplate=etiqueta_pago,
+            customdata=customdata,
+        ))
 
     # Mejorar el diseño del gráfico
     fig.update_layout(
+        title='Fecha de Emisión vs. Fecha de Recepción y Fecha Estimada de Pago',
         xaxis_title='Fecha de Emisión',
         yaxis_title='Fecha de Recepción & Pago',
         xaxis_tickangle=45,
@@ -60,3 +211,35 @@ def crear_grafico_fecha_proveedor(df):
     )
 
     return fig
+
+
+def detalle_factura(datos, punto, limite_puntos=None):
+    """
+    Devuelve el detalle de la factura bajo el mouse en el gráfico de fechas generado
+    con `detalle_bajo_demanda`.
+
+    Args:
+        datos: El mismo dataset (con los mismos filtros) con que se generó el gráfico.
+        punto: Punto de `hoverData` de dcc.Graph (su 'customdata' es la posición de
+            la factura).
+        limite_puntos: El mismo límite con que se generó el gráfico.
+
+    Returns:
+        detalle: Diccionario campo -> texto, o None si el punto no es una factura
+        (por ejemplo, un grupo de facturas con las mismas fechas).
+    """
+    facturas = obtener_facturas(datos)
+    if not _dibuja_facturas(facturas, limite_puntos) or not isinstance(punto.get('customdata'), int):
+        return None
+    posicion = punto['customdata']
+    if not 0 <= posicion < len(facturas):
+        return None
+    factura = facturas.iloc[posicion]
+    detalle = {
+        'Nº Factura': str(factura['Nº Factura']),
+        'Proveedor Facturador': str(factura['Proveedor Facturador']),
+    }
+    for columna in COLUMNAS_FECHA:
+        detalle[columna] = '' if pd.isna(factura[columna]) else factura[columna].strftime('%d-%m-%Y')
+    detalle['Monto Total'] = '' if pd.isna(factura['Monto Total']) else '$' + format(factura['Monto Total'], ',.0f')
+    return detalle
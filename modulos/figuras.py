@@ -0,0 +1,76 @@
+from dataclasses import dataclass, replace
+
+from modulos import figuras_rapidas
+from modulos.compactar_figuras import COMPACTAR_FIGURAS, OPTIMIZAR_CARGA, con_figura_compacta
+from modulos.emision_recepcion_pago import crear_grafico_fecha_proveedor, detalle_factura
+from modulos.grafico_latencias import crear_grafico_latencias
+from modulos.ranking import TOP_PROVEEDORES
+
+# Las figuras de barras y de líneas se arman como diccionarios sin pasar por la
+# validación de plotly (ver modulos.figuras_rapidas), salvo con DASHBOARD_FIGURAS=plotly
+if figuras_rapidas.MODO_FIGURAS == 'plotly':
+    from modulos.Proveedores_Principales import (
+        crear_barras_proveedores_top,
+        crear_barras_monto_total,
+        crear_barras_monto_promedio
+    )
+    from modulos.tendencia_comparativa import crear_tendencia_comparativa_costos
+    from modulos.Tendencia_diaria_evolutiva import crear_tendencia_costos
+    from modulos.tendencia_evolutiva_mensual import crear_tendencia_mensual_costos
+else:
+    from modulos.figuras_rapidas import (
+        crear_barras_proveedores_top,
+        crear_barras_monto_total,
+        crear_barras_monto_promedio,
+        crear_tendencia_comparativa_costos,
+        crear_tendencia_costos,
+        crear_tendencia_mensual_costos,
+    )
+
+
+@dataclass(frozen=True)
+class Grafico:
+    """
+    Describe un gráfico del dashboard.
+
+    Attributes:
+        id: Identificador del dcc.Graph en el layout.
+        titulo: Título de la tarjeta que contiene el gráfico.
+        crear: Función que recibe el dataset y devuelve la figura (objeto de plotly
+            o diccionario equivalente).
+        zoom: Si es True, `crear` acepta `rango_x` y la figura se vuelve a generar
+            con más detalle para el tramo visible cuando el usuario hace zoom.
+        detalle: Función opcional (dataset, punto de hoverData) -> diccionario con
+            el detalle del punto bajo el mouse, que se muestra debajo del gráfico.
+        desglose: Si es True, el eje X son proveedores y al hacer clic en una barra
+            se abre la tabla con las facturas de ese proveedor.
+    """
+    id: str
+    titulo: str
+    crear: object
+    zoom: bool = False
+    detalle: object = None
+    desglose: bool = False
+
+
+# Gráficos del dashboard, en el orden en que aparecen en la página
+GRAFICOS = [
+    Grafico('top-proveedores', "Top %d Proveedores por Número de Facturas" % TOP_PROVEEDORES, crear_barras_proveedores_top, desglose=True),
+    Grafico('grafico-monto-total', "Proveedores por Monto Total", crear_barras_monto_total, desglose=True),
+    Grafico('grafico-monto-promedio', "Proveedores por Monto Promedio", crear_barras_monto_promedio, desglose=True),
+    Grafico('tendencia-diaria-evolutiva', "Tendencia Diaria Evolutiva de los Costos", crear_tendencia_costos, zoom=True),
+    Grafico('tendencia-evolutiva-mensual', "Tendencia Evolutiva Mensual de los Costos", crear_tendencia_mensual_costos),
+    Grafico('tendencia-comparativa', "Tendencia Comparativa de los Costos por Año", crear_tendencia_comparativa_costos),
+    Grafico(
+        'grafico-fechas', "Fechas de Emisión, Recepción y Pago", crear_grafico_fecha_proveedor,
+        detalle=detalle_factura if OPTIMIZAR_CARGA else None,
+    ),
+    Grafico('grafico-latencias', "Días a Recepción y a Pago Estimado", crear_grafico_latencias),
+]
+
+# Con DASHBOARD_OPTIMIZAR_CARGA=1 todas las figuras se envían compactadas (si el
+# plotly.js instalado lo permite)
+if COMPACTAR_FIGURAS:
+    GRAFICOS = [replace(grafico, crear=con_figura_compacta(grafico.crear)) for grafico in GRAFICOS]
+
+GRAFICOS_POR_ID = {grafico.id: grafico for grafico in GRAFICOS}
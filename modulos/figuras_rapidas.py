@@ -0,0 +1,288 @@
+# modulos/figuras_rapidas.py
+import base64
+import functools
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import plotly.colors as pc
+import plotly.io as pio
+
+from modulos.agregados import obtener_agregados
+from modulos.ranking import TOP_PROVEEDORES
+from modulos.reduccion_puntos import reducir_serie
+from modulos.Proveedores_Principales import (
+    crear_barras_proveedores_top as _barras_proveedores_top_plotly,
+    crear_barras_monto_total as _barras_monto_total_plotly,
+    crear_barras_monto_promedio as _barras_monto_promedio_plotly,
+)
+from modulos.tendencia_comparativa import (
+    crear_tendencia_comparativa_costos as _tendencia_comparativa_plotly,
+    figura_comparativa,
+)
+from modulos.Tendencia_diaria_evolutiva import crear_tendencia_costos as _tendencia_costos_plotly
+from modulos.tendencia_evolutiva_mensual import crear_tendencia_mensual_costos as _tendencia_mensual_plotly
+
+# Cómo se construyen las figuras de barras y de líneas:
+#   'rapidas'   -> diccionarios armados directamente desde los arreglos, sin validar
+#   'verificar' -> igual que 'rapidas', pero cada figura se compara con la versión
+#                  de plotly.express y se lanza un error si no coinciden
+#   'plotly'    -> las funciones originales con plotly.express (con validación)
+MODO_FIGURAS = os.environ.get('DASHBOARD_FIGURAS', 'rapidas')
+
+# plotly.express usa WebGL para las líneas con más puntos que estos
+LIMITE_PUNTOS_SVG = 1000
+
+MARGEN = {'l': 50, 'r': 50, 't': 50, 'b': 50}
+
+EJE_FECHAS = {'tickformat': '%b %Y', 'tickmode': 'array', 'showticklabels': True}
+
+
+@lru_cache(maxsize=None)
+def plantilla_oscura():
+    """
+    Devuelve la plantilla 'plotly_dark' como diccionario, calculada una sola vez y
+    compartida por todas las figuras (no debe modificarse).
+    """
+    return pio.templates['plotly_dark'].to_plotly_json()
+
+
+@lru_cache(maxsize=None)
+def _escala_colores(nombre):
+    # Mismas posiciones que calcula plotly al validar una escala por nombre
+    colores = getattr(pc.sequential, nombre)
+    return [[posicion / (len(colores) - 1), color] for posicion, color in enumerate(colores)]
+
+
+def _fechas(indice):
+    # Mismo texto que genera plotly para las fechas ('2024-01-31T00:00:00')
+    return np.datetime_as_string(indice.to_numpy(dtype='datetime64[s]'), unit='s')
+
+
+def _layout(titulo, **propiedades):
+    layout = {
+        'template': plantilla_oscura(),
+        'title': {'text': titulo, 'x': 0.5},
+        'margin': dict(MARGEN),
+        'hovermode': 'closest',
+    }
+    layout.update(propiedades)
+    return layout
+
+
+def _eje(titulo, ancla, **propiedades):
+    eje = {'anchor': ancla, 'domain': [0.0, 1.0], 'title': {'text': titulo}}
+    eje.update(propiedades)
+    return eje
+
+
+def _figura_barras(serie, titulo, escala, texttemplate):
+    # Equivalente a px.bar(..., color=<columna>, text=<columna>) con el estilo de
+    # Proveedores_Principales
+    columna = serie.name
+    valores = serie.to_numpy()
+    return {
+        'data': [{
+            'type': 'bar',
+            'x': serie.index.to_numpy(dtype=object),
+            'y': valores,
+            'text': valores.astype(float),
+            'texttemplate': texttemplate,
+            'textposition': 'outside',
+            'textfont': {'color': 'white'},
+            'marker': {'color': valores, 'coloraxis': 'coloraxis', 'pattern': {'shape': ''}},
+            'hovertemplate': 'Proveedor=%{x}<br>' + columna + '=%{marker.color}<extra></extra>',
+            'legendgroup': '',
+            'name': '',
+            'orientation': 'v',
+            'showlegend': False,
+            'xaxis': 'x',
+            'yaxis': 'y',
+        }],
+        'layout': _layout(
+            titulo,
+            xaxis=_eje('Proveedor', 'y', tickangle=45, showticklabels=False),
+            yaxis=_eje(columna, 'x', tickformat=','),
+            coloraxis={'colorbar': {'title': {'text': columna}}, 'colorscale': _escala_colores(escala), 'autocolorscale': False},
+            legend={'tracegroupgap': 0},
+            barmode='relative',
+            showlegend=False,
+        ),
+    }
+
+
+def _figura_linea(serie, titulo, hovertemplate):
+    # Equivalente a px.line con una sola serie y el estilo de las tendencias
+    traza = {
+        'type': 'scatter',
+        'x': _fechas(serie.index),
+        'y': serie.to_numpy(),
+        'mode': 'lines',
+        'line': {'color': 'deepskyblue', 'dash': 'solid', 'shape': 'linear'},
+        'marker': {'symbol': 'circle'},
+        'hovertemplate': hovertemplate,
+        'legendgroup': '',
+        'name': '',
+        'orientation': 'v',
+        'showlegend': False,
+        'xaxis': 'x',
+        'yaxis': 'y',
+    }
+    if len(serie) > LIMITE_PUNTOS_SVG:
+        # Scattergl no tiene orientación
+        traza['type'] = 'scattergl'
+        del traza['orientation']
+    return {
+        'data': [traza],
+        'layout': _layout(
+            titulo,
+            xaxis=_eje('Fecha de Emisión', 'y', tickangle=45, **EJE_FECHAS),
+            yaxis=_eje('Monto Total', 'x'),
+            legend={'tracegroupgap': 0},
+            showlegend=False,
+        ),
+    }
+
+
+def _normalizar(valor):
+    # Lleva una figura serializada a una forma comparable: arreglos base64 y listas
+    # numéricas como listas de float, con los NaN como None (igual que en JSON)
+    if isinstance(valor, dict):
+        if set(valor) == {'dtype', 'bdata'}:
+            numeros = np.frombuffer(base64.b64decode(valor['bdata']), dtype=valor['dtype']).astype(float)
+            return [_normalizar(numero) for numero in numeros.tolist()]
+        return {clave: _normalizar(dato) for clave, dato in valor.items()}
+    if isinstance(valor, list):
+        return [_normalizar(dato) for dato in valor]
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return None if valor != valor else float(valor)
+    return valor
+
+
+def _primera_diferencia(a, b, ruta=''):
+    if isinstance(a, dict) and isinstance(b, dict):
+        for clave in sorted(set(a) | set(b)):
+            diferencia = _primera_diferencia(a.get(clave), b.get(clave), ruta + '/' + clave)
+            if diferencia:
+                return diferencia
+        return None
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        for posicion, (x, y) in enumerate(zip(a, b)):
+            diferencia = _primera_diferencia(x, y, '%s/%d' % (ruta, posicion))
+            if diferencia:
+                return diferencia
+        return None
+    if a != b:
+        return '%s: %r != %r' % (ruta or '/', str(a)[:80], str(b)[:80])
+    return None
+
+
+def verificar_figura(rapida, referencia, nombre=''):
+    """
+    Comprueba que una figura rápida sea equivalente a la construida con plotly.
+
+    Args:
+        rapida: Diccionario de la figura rápida.
+        referencia: Figura de plotly (o diccionario) de referencia.
+        nombre: Nombre del gráfico para el mensaje de error.
+
+    Raises:
+        ValueError: Si las figuras difieren (el mensaje indica la primera diferencia).
+    """
+    diferencia = _primera_diferencia(
+        _normalizar(json.loads(pio.to_json(rapida, validate=False))),
+        _normalizar(json.loads(pio.to_json(referencia, validate=False))),
+    )
+    if diferencia:
+        raise ValueError('La figura rápida %s no coincide con la de plotly en %s' % (nombre, diferencia))
+
+
+def _con_referencia(referencia):
+    # Asocia a cada función rápida su versión con plotly.express, que se usa para
+    # compararlas en modo 'verificar'
+    def decorador(crear):
+        @functools.wraps(crear)
+        def envoltura(datos, *args, **kwargs):
+            figura = crear(datos, *args, **kwargs)
+            if MODO_FIGURAS == 'verificar':
+                verificar_figura(figura, referencia(datos, *args, **kwargs), crear.__name__)
+            return figura
+        envoltura.referencia = referencia
+        return envoltura
+    return decorador
+
+
+@_con_referencia(_barras_proveedores_top_plotly)
+def crear_barras_proveedores_top(datos, n=None, otros=None):
+    """
+    Versión rápida de `Proveedores_Principales.crear_barras_proveedores_top`.
+
+    Args:
+        datos: DatasetFacturas, Agregados o DataFrame con los datos de proveedores.
+        n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+        otros: Agregar una barra "Otros" con el resto de los proveedores.
+
+    Returns:
+        fig: Diccionario con la figura (data y layout) listo para serializar.
+    """
+    n = TOP_PROVEEDORES if n is None else n
+    top = obtener_agregados(datos).ranking.top('Número de Facturas', n, otros)
+    return _figura_barras(top, 'Top %d Proveedores por Número de Facturas' % n, 'Blues', '%{text:,.0f}')
+
+
+@_con_referencia(_barras_monto_total_plotly)
+def crear_barras_monto_total(datos, n=None, otros=None):
+    """
+    Versión rápida de `Proveedores_Principales.crear_barras_monto_total`.
+    """
+    n = TOP_PROVEEDORES if n is None else n
+    top = obtener_agregados(datos).ranking.top('Monto Total', n, otros)
+    return _figura_barras(top, 'Monto Total por Proveedor (Top %d)' % n, 'Viridis', '$%{text:,.0f}')
+
+
+@_con_referencia(_barras_monto_promedio_plotly)
+def crear_barras_monto_promedio(datos, n=None, otros=None, min_facturas=None):
+    """
+    Versión rápida de `Proveedores_Principales.crear_barras_monto_promedio`.
+    """
+    n = TOP_PROVEEDORES if n is None else n
+    top = obtener_agregados(datos).ranking.top('Monto Promedio', n, otros, min_facturas)
+    return _figura_barras(top, 'Monto Promedio por Proveedor (Top %d)' % n, 'Cividis', '$%{text:,.0f}')
+
+
+@_con_referencia(_tendencia_costos_plotly)
+def crear_tendencia_costos(datos, rango_x=None, max_puntos=None):
+    """
+    Versión rápida de `Tendencia_diaria_evolutiva.crear_tendencia_costos`.
+    """
+    fig = _figura_linea(
+        reducir_serie(obtener_agregados(datos).por_dia, max_puntos, rango_x),
+        'Tendencia Evolutiva Diaria de los Costos en el Tiempo',
+        '<b>%{x}</b><br>Monto Total: %{y:,.0f}<extra></extra>',
+    )
+    if rango_x is not None:
+        fig['layout']['xaxis']['range'] = list(rango_x)
+    return fig
+
+
+@_con_referencia(_tendencia_mensual_plotly)
+def crear_tendencia_mensual_costos(datos):
+    """
+    Versión rápida de `tendencia_evolutiva_mensual.crear_tendencia_mensual_costos`.
+    """
+    return _figura_linea(
+        obtener_agregados(datos).por_mes,
+        'Tendencia Evolutiva Mensual de los Costos',
+        '<b>%{x}</b><br>Monto Total: $%{y:,.0f}<extra></extra>',
+    )
+
+
+@_con_referencia(_tendencia_comparativa_plotly)
+def crear_tendencia_comparativa_costos(datos, anios=None, superponer=True, variacion=False):
+    """
+    Versión rápida de `tendencia_comparativa.crear_tendencia_comparativa_costos`.
+    """
+    trazas, layout = figura_comparativa(obtener_agregados(datos), anios, superponer, variacion)
+    return {'data': trazas, 'layout': dict(layout, template=plantilla_oscura())}
+
@@ -0,0 +1,86 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from modulos.agregados import obtener_agregados
+from modulos.ranking import TOP_PROVEEDORES
+
+COLORES_MEDIDA = {'Recepción': 'deepskyblue', 'Pago': 'orange'}
+
+
+def _etiqueta(nombre_x):
+    return (
+        '<b>%{x}</b><br>' + nombre_x +
+        '<br>Facturas: %{customdata[0]:,}<br>Promedio: %{customdata[1]:.1f} días'
+        '<br>Mediana: %{customdata[2]} días<br>P90: %{customdata[3]} días<br>P99: %{customdata[4]} días'
+    )
+
+
+def _datos_hover(tabla):
+    return tabla[['Facturas', 'Promedio', 'Mediana', 'P90', 'P99']].to_numpy()
+
+
+def crear_grafico_latencias(datos, n=None):
+    """
+    Crea un gráfico con los días de emisión a recepción y a pago estimado.
+
+    Arriba se muestran, por mes de emisión, la mediana (línea continua) y el p90
+    (línea punteada) de cada demora; abajo, la mediana de los proveedores con más
+    facturas, con una barra de error hasta el p90. Todo sale de las estadísticas
+    precalculadas de los agregados, sin recorrer las facturas.
+
+    Args:
+        datos: DatasetFacturas, Agregados o DataFrame con los datos de proveedores.
+        n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+
+    Returns:
+        fig: Figura de plotly con el gráfico de demoras.
+    """
+    agregados = obtener_agregados(datos)
+    n = TOP_PROVEEDORES if n is None else n
+    por_mes = agregados.latencia_por_mes
+    por_proveedor = agregados.latencia_por_proveedor
+    principales = list(agregados.ranking.top('Número de Facturas', n, otros=False).index)
+
+    fig = make_subplots(
+        rows=2, cols=1, vertical_spacing=0.18,
+        subplot_titles=('Por mes de emisión', 'Top %d proveedores por número de facturas' % n),
+    )
+    for medida, color in COLORES_MEDIDA.items():
+        if medida in por_mes.index.get_level_values('Medida'):
+            mensual = por_mes.xs(medida, level='Medida')
+            fig.add_trace(go.Scatter(
+                x=mensual.index, y=mensual['Mediana'], mode='lines', name='Mediana ' + medida,
+                legendgroup=medida, line=dict(color=color, width=3),
+                customdata=_datos_hover(mensual), hovertemplate=_etiqueta(medida) + '<extra></extra>',
+            ), row=1, col=1)
+            fig.add_trace(go.Scatter(
+                x=mensual.index, y=mensual['P90'], mode='lines', name='P90 ' + medida,
+                legendgroup=medida, line=dict(color=color, width=2, dash='dot'),
+                hoverinfo='skip',
+            ), row=1, col=1)
+
+        if medida in por_proveedor.index.get_level_values('Medida'):
+            proveedores = por_proveedor.xs(medida, level='Medida').reindex(principales).dropna(subset=['Facturas'])
+            fig.add_trace(go.Bar(
+                x=proveedores.index, y=proveedores['Mediana'], name='Mediana ' + medida,
+                legendgroup=medida, showlegend=False, marker_color=color,
+                error_y=dict(type='data', symmetric=False, array=proveedores['P90'] - proveedores['Mediana'], arrayminus=[0] * len(proveedores)),
+                customdata=_datos_hover(proveedores), hovertemplate=_etiqueta(medida) + '<extra></extra>',
+            ), row=2, col=1)
+
+    # Estilo oscuro, igual que el resto de los gráficos
+    fig.update_layout(
+        title='Días de Emisión a Recepción y a Pago Estimado',
+        title_x=0.5,
+        template='plotly_dark',
+        barmode='group',
+        height=700,
+        margin={'l': 50, 'r': 50, 't': 80, 'b': 50},
+        hovermode='closest',
+        legend_title='Demora',
+    )
+    fig.update_xaxes(tickformat='%b %Y', tickangle=45, row=1, col=1)
+    fig.update_xaxes(showticklabels=False, title_text='Proveedor', row=2, col=1)
+    fig.update_yaxes(title_text='Días')
+    return fig
+
@@ -0,0 +1,89 @@
+# modulos/ingesta.py
+import argparse
+
+from modulos.cargar_datos import anexar_a_cache, cargar_datos, directorio_cache_para, leer_fuente, version_datos
+from modulos.dataset import version_contenido
+from modulos.preparar_datos import preparar_columnas_fecha
+
+# Columnas mínimas que debe traer un lote para que los gráficos funcionen
+COLUMNAS_REQUERIDAS = [
+    'Nº Factura',
+    'Proveedor Facturador',
+    'Fecha de Emisión',
+    'Fecha Recepción',
+    'Fecha Estimada Pago',
+    'Monto Total',
+]
+
+
+def validar_lote(df):
+    """
+    Comprueba que un lote (ya preparado) tenga las columnas y tipos que espera el dashboard.
+
+    Args:
+        df: DataFrame del lote con las fechas preparadas.
+
+    Raises:
+        ValueError: Si faltan columnas, si 'Monto Total' no es numérico o si hay
+            facturas sin fecha de emisión válida.
+    """
+    faltantes = [columna for columna in COLUMNAS_REQUERIDAS if columna not in df.columns]
+    if faltantes:
+        raise ValueError('Al lote le faltan columnas: %s' % ', '.join(faltantes))
+    if df['Monto Total'].dtype.kind not in 'biuf':
+        raise ValueError("La columna 'Monto Total' del lote no es numérica")
+    sin_fecha = int(df['Fecha de Emisión'].isna().sum())
+    if sin_fecha:
+        raise ValueError("El lote tiene %d facturas sin 'Fecha de Emisión' válida" % sin_fecha)
+
+
+def leer_lote(ruta_lote):
+    """
+    Lee un lote de facturas (xlsx o csv), prepara sus fechas igual que
+    `preparar_columnas_fecha` y lo valida.
+
+    Args:
+        ruta_lote: Ruta al archivo del lote.
+
+    Returns:
+        df: DataFrame del lote listo para anexar.
+    """
+    df = preparar_columnas_fecha(leer_fuente(ruta_lote))
+    validar_lote(df)
+    return df
+
+
+def anexar_lote(ruta_lote, ruta_fuente="data_proveedores.xlsx", directorio_cache=None):
+    """
+    Incorpora un lote de facturas nuevas al dataset guardado sin recargar el histórico.
+
+    El lote se guarda como un segmento más de la cache columnar y los agregados
+    por proveedor y por día se actualizan sumando los del lote. Los servidores en
+    ejecución detectan la nueva versión y la cargan sin reiniciarse. Si más tarde
+    se reemplaza el archivo principal, la cache se reconstruye desde ese archivo
+    (que debería incluir ya los lotes anexados).
+
+    Args:
+        ruta_lote: Ruta al archivo del lote (xlsx o csv).
+        ruta_fuente: Archivo de datos principal al que se anexa el lote.
+        directorio_cache: Carpeta base para la cache (opcional).
+
+    Returns:
+        version: Nueva versión de los datos.
+    """
+    lote = leer_lote(ruta_lote)
+
+    # Si todavía no existe la cache del histórico se crea a partir del origen
+    if version_datos(ruta_fuente, directorio_cache) is None:
+        cargar_datos(ruta_fuente, directorio_cache)
+
+    directorio = directorio_cache_para(ruta_fuente, directorio_cache)
+    return anexar_a_cache(directorio, lote, version_contenido(lote))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Anexa un lote de facturas (xlsx o csv) al dataset del dashboard.")
+    parser.add_argument('lote', help="Archivo con las facturas nuevas")
+    parser.add_argument('--fuente', default="data_proveedores.xlsx", help="Archivo de datos principal")
+    argumentos = parser.parse_args()
+    print("Nueva versión de los datos:", anexar_lote(argumentos.lote, argumentos.fuente))
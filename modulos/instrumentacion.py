@@ -0,0 +1,226 @@
+# modulos/instrumentacion.py
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Si es '1' se miden las etapas de carga, la construcción y serialización de cada
+# figura y la latencia de cada callback; desactivada no agrega trabajo por petición
+INSTRUMENTACION = os.environ.get('DASHBOARD_INSTRUMENTACION', '0') == '1'
+
+# Ruta del endpoint con las métricas (solo existe con la instrumentación activa)
+RUTA_METRICAS = os.environ.get('DASHBOARD_RUTA_METRICAS', '/_metricas')
+
+# Límites superiores (en milisegundos) de los intervalos de los histogramas de latencia
+LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+_SIN_MEDICION = nullcontext()
+
+
+class Histograma:
+    """
+    Histograma de duraciones con intervalos fijos (LIMITES_MS más uno final sin límite).
+
+    Guarda además la cantidad, la suma y el máximo, así que el promedio es exacto y
+    los percentiles se aproximan por el límite del intervalo.
+    """
+
+    def __init__(self):
+        self.conteos = [0] * (len(LIMITES_MS) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, milisegundos):
+        self.conteos[bisect.bisect_left(LIMITES_MS, milisegundos)] += 1
+        self.cantidad += 1
+        self.suma += milisegundos
+        self.maximo = max(self.maximo, milisegundos)
+
+    def percentil(self, fraccion):
+        """
+        Devuelve el límite del intervalo donde cae el percentil `fraccion` (0 a 1),
+        acotado por el máximo registrado.
+        """
+        if not self.cantidad:
+            return None
+        objetivo = fraccion * self.cantidad
+        acumulado = 0
+        for posicion, conteo in enumerate(self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo and conteo:
+                return min(LIMITES_MS[posicion], self.maximo) if posicion < len(LIMITES_MS) else self.maximo
+        return self.maximo
+
+    def como_dict(self):
+        return {
+            'cantidad': self.cantidad,
+            'promedio_ms': round(self.suma / self.cantidad, 3) if self.cantidad else None,
+            'p50_ms': self.percentil(0.5),
+            'p90_ms': self.percentil(0.9),
+            'p99_ms': self.percentil(0.99),
+            'maximo_ms': round(self.maximo, 3),
+            'intervalos': {
+                ('<=%d' % limite if posicion < len(LIMITES_MS) else '>%d' % LIMITES_MS[-1]): conteo
+                for posicion, (limite, conteo) in enumerate(zip(LIMITES_MS + (None,), self.conteos))
+                if conteo
+            },
+        }
+
+
+class Metricas:
+    """
+    Contadores, tamaños e histogramas de duración del servidor.
+
+    Las duraciones medidas durante una petición se acumulan además por hilo, para
+    enviarlas en la cabecera Server-Timing de la respuesta.
+
+    Args:
+        activa: Si es False, `etapa` no mide nada y los demás métodos no registran.
+    """
+
+    def __init__(self, activa=False):
+        self.activa = activa
+        self._candado = threading.Lock()
+        self._peticion = threading.local()
+        self.limpiar()
+
+    def limpiar(self):
+        """
+        Descarta todo lo registrado hasta ahora.
+        """
+        with self._candado:
+            self.histogramas = {}
+            self.contadores = {}
+            self.bytes = {}
+
+    def registrar_duracion(self, nombre, milisegundos):
+        if not self.activa:
+            return
+        with self._candado:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = Histograma()
+            histograma.registrar(milisegundos)
+        etapas = getattr(self._peticion, 'etapas', None)
+        if etapas is not None:
+            etapas[nombre] = etapas.get(nombre, 0.0) + milisegundos
+
+    def contar(self, nombre, cantidad=1):
+        if not self.activa:
+            return
+        with self._candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def registrar_bytes(self, nombre, cantidad):
+        if not self.activa:
+            return
+        with self._candado:
+            total = self.bytes.setdefault(nombre, {'respuestas': 0, 'total': 0, 'maximo': 0})
+            total['respuestas'] += 1
+            total['total'] += cantidad
+            total['maximo'] = max(total['maximo'], cantidad)
+
+    def etapa(self, nombre):
+        """
+        Context manager que mide la duración de una etapa (por ejemplo 'carga' o
+        'figura.top-proveedores'). Con la instrumentación desactivada no hace nada.
+        """
+        if not self.activa:
+            return _SIN_MEDICION
+        return self._medir(nombre)
+
+    @contextmanager
+    def _medir(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_duracion(nombre, (time.perf_counter() - inicio) * 1000)
+
+    def iniciar_peticion(self):
+        self._peticion.etapas = {}
+
+    def terminar_peticion(self):
+        """
+        Devuelve las etapas medidas en la petición del hilo actual (nombre -> ms).
+        """
+        etapas = getattr(self._peticion, 'etapas', None) or {}
+        self._peticion.etapas = None
+        return etapas
+
+    def instantanea(self):
+        """
+        Devuelve todo lo registrado como un diccionario serializable.
+        """
+        with self._candado:
+            return {
+                'duraciones': {nombre: histograma.como_dict() for nombre, histograma in sorted(self.histogramas.items())},
+                'contadores': dict(sorted(self.contadores.items())),
+                'bytes': {nombre: dict(total) for nombre, total in sorted(self.bytes.items())},
+            }
+
+
+# Métricas del proceso, compartidas por los módulos del dashboard
+metricas = Metricas(INSTRUMENTACION)
+
+
+def cabecera_server_timing(etapas):
+    """
+    Arma el valor de la cabecera Server-Timing ('carga;dur=12.3, figura.top;dur=4.0').
+    """
+    return ', '.join('%s;dur=%.1f' % (nombre.replace(' ', '-'), duracion) for nombre, duracion in etapas.items())
+
+
+def _nombre_callback(request):
+    # Dash envía en el cuerpo la salida del callback ('top-proveedores.figure')
+    cuerpo = request.get_json(silent=True) or {}
+    return 'callback.%s' % cuerpo.get('output', '?')
+
+
+def instrumentar_servidor(server, extras=None, ruta=None):
+    """
+    Registra en la app Flask la medición de las peticiones y el endpoint de métricas.
+
+    Cada respuesta lleva la cabecera Server-Timing con las etapas medidas durante
+    la petición y el total; las llamadas a callbacks de Dash registran su latencia
+    y el tamaño de la respuesta por callback.
+
+    Args:
+        server: App Flask (`app.server`).
+        extras: Función sin argumentos que devuelve información adicional para el
+            endpoint (por ejemplo, las estadísticas de las caches).
+        ruta: Ruta del endpoint de métricas (por defecto RUTA_METRICAS).
+    """
+    from flask import Response, g, request
+
+    @server.before_request
+    def _iniciar_medicion():
+        g.inicio_medicion = time.perf_counter()
+        metricas.iniciar_peticion()
+
+    @server.after_request
+    def _terminar_medicion(respuesta):
+        etapas = metricas.terminar_peticion()
+        inicio = g.pop('inicio_medicion', None)
+        if inicio is None:
+            return respuesta
+        total = (time.perf_counter() - inicio) * 1000
+        if request.path.endswith('/_dash-update-component'):
+            nombre = _nombre_callback(request)
+            metricas.registrar_duracion(nombre, total)
+            if not respuesta.direct_passthrough:
+                metricas.registrar_bytes(nombre, respuesta.calculate_content_length() or 0)
+        metricas.contar('peticiones')
+        etapas['total'] = total
+        respuesta.headers['Server-Timing'] = cabecera_server_timing(etapas)
+        return respuesta
+
+    @server.route(ruta or RUTA_METRICAS)
+    def _metricas():
+        datos = metricas.instantanea()
+        if extras is not None:
+            datos.update(extras())
+        return Response(json.dumps(datos, ensure_ascii=False, default=str), mimetype='application/json')
@@ -0,0 +1,149 @@
+# modulos/latencias.py
+import numpy as np
+import pandas as pd
+
+# Demoras que se miden desde la fecha de emisión
+MEDIDAS = {'Recepción': 'Fecha Recepción', 'Pago': 'Fecha Estimada Pago'}
+
+# Hasta estos días (en valor absoluto) los histogramas guardan cada día por separado;
+# hasta un año se agrupan por semanas y después por meses de 30 días
+LIMITE_DIAS_EXACTOS = 60
+LIMITE_DIAS_SEMANAS = 365
+
+CUANTILES = {'Mediana': 0.5, 'P90': 0.9, 'P99': 0.99}
+
+COLUMNAS_HISTOGRAMA = ['Proveedor Facturador', 'Mes', 'Medida', 'Dias', 'Facturas', 'Suma Dias']
+
+
+def intervalo_dias(dias):
+    """
+    Lleva cada demora en días al inicio de su intervalo del histograma.
+
+    Las demoras de hasta LIMITE_DIAS_EXACTOS días se conservan exactas; las mayores
+    se agrupan por semanas (hasta LIMITE_DIAS_SEMANAS) y luego por meses, lo que
+    acota el tamaño de los histogramas aunque haya demoras muy largas.
+
+    Args:
+        dias: Arreglo de enteros (días entre la emisión y la recepción o el pago).
+
+    Returns:
+        intervalos: Arreglo del mismo largo con el inicio de cada intervalo.
+    """
+    dias = np.asarray(dias, dtype=np.int64)
+    absolutos = np.abs(dias)
+    intervalos = np.where(
+        absolutos <= LIMITE_DIAS_EXACTOS, absolutos,
+        np.where(absolutos <= LIMITE_DIAS_SEMANAS, absolutos // 7 * 7, absolutos // 30 * 30),
+    )
+    return np.sign(dias) * intervalos
+
+
+def calcular_histogramas(df):
+    """
+    Calcula los histogramas de demora de recepción y de pago por proveedor y mes de emisión.
+
+    Las dos medidas se apilan y se agrupan en una sola pasada vectorizada. Cada fila del
+    resultado es un intervalo de días con la cantidad de facturas y la suma exacta
+    de sus demoras, así que dos histogramas se combinan sumándolos (ver
+    `combinar_histogramas`) y el promedio no depende de los intervalos.
+
+    Args:
+        df: DataFrame con 'Proveedor Facturador' y las fechas ya preparadas.
+
+    Returns:
+        histogramas: DataFrame con las columnas COLUMNAS_HISTOGRAMA; las facturas
+        sin la fecha correspondiente no se cuentan.
+    """
+    emision = df['Fecha de Emisión'].to_numpy(dtype='datetime64[ns]')
+    mes = emision.astype('datetime64[M]').astype(np.int64)
+    proveedor = df['Proveedor Facturador']
+    if not isinstance(proveedor.dtype, pd.CategoricalDtype):
+        proveedor = proveedor.astype('category')
+    codigos = np.asarray(proveedor.cat.codes)
+    proveedor_categorias = proveedor.cat.categories
+
+    # Las dos medidas se apilan: cada factura aporta una fila por cada fecha que tenga
+    partes = []
+    for posicion, columna in enumerate(MEDIDAS.values()):
+        diferencia = df[columna].to_numpy(dtype='datetime64[ns]') - emision
+        validas = ~np.isnat(diferencia) & (codigos >= 0)
+        dias = diferencia[validas].astype('timedelta64[D]').astype(np.int64)
+        partes.append((codigos[validas], mes[validas], np.full(len(dias), posicion), dias))
+    proveedores, numero_mes, medidas, dias = (np.concatenate(columnas) for columnas in zip(*partes))
+    intervalos = intervalo_dias(dias)
+
+    # Las cuatro claves se combinan en un único entero, así la agrupación es un
+    # solo `np.unique` más dos `np.bincount` en lugar de un groupby por cuatro columnas
+    primer_mes = numero_mes.min() if len(numero_mes) else 0
+    primer_intervalo = intervalos.min() if len(intervalos) else 0
+    cantidad_meses = (numero_mes.max() - primer_mes + 1) if len(numero_mes) else 1
+    cantidad_intervalos = (intervalos.max() - primer_intervalo + 1) if len(intervalos) else 1
+    clave = (proveedores.astype(np.int64) * cantidad_meses + (numero_mes - primer_mes)) * len(MEDIDAS) + medidas
+    clave = clave * cantidad_intervalos + (intervalos - primer_intervalo)
+    claves, grupos = np.unique(clave, return_inverse=True)
+    facturas = np.bincount(grupos, minlength=len(claves))
+    sumas = np.bincount(grupos, weights=dias, minlength=len(claves)).round().astype(np.int64)
+
+    resto, intervalo = np.divmod(claves, cantidad_intervalos)
+    resto, medida = np.divmod(resto, len(MEDIDAS))
+    proveedor, numero_mes = np.divmod(resto, cantidad_meses)
+    return pd.DataFrame({
+        'Proveedor Facturador': pd.Categorical.from_codes(proveedor, proveedor_categorias),
+        'Mes': (numero_mes + primer_mes).astype('datetime64[M]').astype('datetime64[ns]'),
+        'Medida': pd.Categorical.from_codes(medida, list(MEDIDAS)),
+        'Dias': intervalo + primer_intervalo,
+        'Facturas': facturas.astype(np.int64),
+        'Suma Dias': sumas,
+    })
+
+
+def combinar_histogramas(anteriores, nuevos):
+    """
+    Suma dos tablas de histogramas (por ejemplo, la del histórico y la de un lote nuevo).
+    """
+    tabla = pd.concat([anteriores, nuevos], ignore_index=True)
+    tabla['Proveedor Facturador'] = tabla['Proveedor Facturador'].astype(object)
+    tabla['Medida'] = tabla['Medida'].astype(object)
+    tabla = tabla.groupby(['Proveedor Facturador', 'Mes', 'Medida', 'Dias'], sort=False)[['Facturas', 'Suma Dias']].sum().reset_index()
+    tabla['Proveedor Facturador'] = tabla['Proveedor Facturador'].astype('category')
+    tabla['Medida'] = pd.Categorical(tabla['Medida'], categories=list(MEDIDAS))
+    return tabla[COLUMNAS_HISTOGRAMA]
+
+
+def estadisticas_latencia(histogramas, por):
+    """
+    Calcula cantidad, promedio, mediana, p90 y p99 de cada demora a partir de los histogramas.
+
+    Los percentiles se toman por rango (el primer intervalo donde la cantidad
+    acumulada alcanza el cuantil), así que son exactos en días hasta
+    LIMITE_DIAS_EXACTOS y aproximados al inicio de la semana o del mes después.
+
+    Args:
+        histogramas: Tabla de `calcular_histogramas` o `combinar_histogramas`.
+        por: 'Proveedor Facturador' o 'Mes'.
+
+    Returns:
+        estadisticas: DataFrame indexado por (`por`, 'Medida') con las columnas
+        'Facturas', 'Promedio', 'Mediana', 'P90' y 'P99' (en días).
+    """
+    tabla = (
+        histogramas.groupby([por, 'Medida', 'Dias'], observed=True, sort=True)[['Facturas', 'Suma Dias']].sum()
+    )
+    tabla = tabla[tabla['Facturas'] > 0]
+    niveles = [por, 'Medida']
+    grupos = tabla.index.droplevel('Dias')
+    dias = tabla.index.get_level_values('Dias').to_numpy()
+    facturas = tabla['Facturas'].groupby(level=niveles, sort=False)
+    acumuladas = facturas.cumsum().to_numpy()
+    totales = facturas.transform('sum').to_numpy()
+
+    estadisticas = tabla.groupby(level=niveles, sort=True).sum()
+    estadisticas['Promedio'] = estadisticas['Suma Dias'] / estadisticas['Facturas']
+    for nombre, cuantil in CUANTILES.items():
+        alcanzado = acumuladas >= cuantil * totales
+        estadisticas[nombre] = pd.Series(dias[alcanzado], index=grupos[alcanzado]).groupby(level=niveles, sort=False).first()
+    if isinstance(estadisticas.index.levels[0], pd.CategoricalIndex):
+        # Proveedores como texto plano y en orden alfabético, igual que en cualquier tabla
+        estadisticas.index = estadisticas.index.set_levels(estadisticas.index.levels[0].astype(object), level=0)
+        estadisticas = estadisticas.sort_index()
+    return estadisticas[['Facturas', 'Promedio'] + list(CUANTILES)]
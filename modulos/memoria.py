@@ -0,0 +1,25 @@
+# modulos/memoria.py
+import pandas as pd
+
+
+def reporte_memoria(antes, despues):
+    """
+    Compara la memoria usada por columna entre dos versiones de la tabla de facturas.
+
+    Args:
+        antes: DataFrame original (por ejemplo, el de `pd.read_excel`).
+        despues: DataFrame compactado (por ejemplo, `DatasetFacturas.facturas`).
+
+    Returns:
+        reporte: DataFrame con los bytes por columna antes y después, la reducción
+        y una fila 'Total'. Las columnas que solo existen en una de las tablas
+        aparecen con 0 en la otra.
+    """
+    reporte = pd.DataFrame({
+        'Bytes antes': antes.memory_usage(index=False, deep=True),
+        'Bytes después': despues.memory_usage(index=False, deep=True),
+    }).fillna(0).astype('int64')
+    reporte.loc['Total'] = reporte.sum()
+    reporte['Reducción'] = 1 - reporte['Bytes después'] / reporte['Bytes antes'].where(reporte['Bytes antes'] > 0)
+    return reporte
+
@@ -1,4 +1,5 @@
 # modulos/preparar_datos.py
+import numpy as np
 import pandas as pd
 
 def preparar_columnas_fecha(df):
@@ -22,3 +23,43 @@ def preparar_columnas_fecha(df):
 
     return df
 
+
+# Columnas que se suman en los agregados y rankings: se dejan en 64 bits para que
+# las sumas no desborden
+COLUMNAS_MONTO = ('Monto Total',)
+
+
+def compactar_columnas(df):
+    """
+    Convierte las columnas del DataFrame a tipos compactos.
+
+    Las columnas de texto pasan a categóricas (cada valor distinto se guarda una
+    sola vez y las filas guardan un código entero), 'Nº Factura' pasa a entero si
+    todos sus valores lo son y las columnas enteras se reducen al tipo más pequeño
+    que conserve sus valores, salvo los montos (COLUMNAS_MONTO), que se suman y
+    quedan como int64.
+
+    Args:
+        df: DataFrame con los datos de proveedores.
+
+    Returns:
+        df: Nuevo DataFrame con las columnas compactadas.
+    """
+    columnas = {}
+    for nombre in df.columns:
+        serie = df[nombre]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype.kind in 'fMmb':
+            columnas[nombre] = serie
+        elif serie.dtype.kind in 'iu':
+            if nombre in COLUMNAS_MONTO:
+                columnas[nombre] = serie.astype(np.int64)
+            else:
+                columnas[nombre] = pd.to_numeric(serie, downcast='integer')
+        else:
+            if nombre == 'Nº Factura':
+                numeros = pd.to_numeric(serie, errors='coerce')
+                if numeros.notna().all() and (numeros % 1 == 0).all():
+                    columnas[nombre] = pd.to_numeric(numeros.astype(np.int64), downcast='integer')
+                    continue
+            columnas[nombre] = serie.astype('category')
+    return pd.DataFrame(columnas, index=df.index)
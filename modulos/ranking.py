@@ -0,0 +1,121 @@
+# modulos/ranking.py
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Cantidad de proveedores que muestran los gráficos de barras
+TOP_PROVEEDORES = int(os.environ.get('DASHBOARD_TOP_PROVEEDORES', 10))
+
+# Si es '1', los gráficos de barras agregan una barra "Otros" con el resto de los proveedores
+BARRA_OTROS = os.environ.get('DASHBOARD_BARRA_OTROS', '0') == '1'
+
+# Facturas con monto que necesita un proveedor para entrar al ranking de monto promedio
+# (evita que un proveedor con una sola factura grande encabece el ranking)
+MIN_FACTURAS_PROMEDIO = int(os.environ.get('DASHBOARD_MIN_FACTURAS_PROMEDIO', 1))
+
+METRICAS = ('Número de Facturas', 'Monto Total', 'Monto Promedio')
+
+
+@dataclass(frozen=True)
+class RankingProveedores:
+    """
+    Datos por proveedor como arreglos NumPy para calcular rankings sin ordenar la tabla completa.
+
+    Un mismo objeto sirve para los rankings por cantidad de facturas, monto total y
+    monto promedio (el promedio se calcula a partir del monto y las facturas con
+    monto, así la barra "Otros" también es un promedio ponderado correcto).
+
+    Attributes:
+        nombres: Nombre de cada proveedor.
+        facturas: Número de facturas de cada proveedor.
+        con_monto: Facturas con monto informado de cada proveedor.
+        montos: Monto total de cada proveedor.
+    """
+    nombres: np.ndarray
+    facturas: np.ndarray
+    con_monto: np.ndarray
+    montos: np.ndarray
+
+    @classmethod
+    def desde_por_proveedor(cls, por_proveedor):
+        return cls(
+            nombres=por_proveedor.index.to_numpy(dtype=object),
+            facturas=por_proveedor['Número de Facturas'].to_numpy(),
+            con_monto=por_proveedor['Facturas con Monto'].to_numpy(),
+            montos=por_proveedor['Monto Total'].to_numpy(),
+        )
+
+    def _valores(self, metrica, min_facturas):
+        if metrica == 'Número de Facturas':
+            return self.facturas.astype(float), np.ones(len(self.nombres), dtype=bool)
+        if metrica == 'Monto Total':
+            return self.montos.astype(float), np.ones(len(self.nombres), dtype=bool)
+        if metrica == 'Monto Promedio':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                promedio = self.montos / self.con_monto
+            return promedio, (self.con_monto >= max(min_facturas, 1))
+        raise ValueError('Métrica de ranking desconocida: %s' % metrica)
+
+    def top(self, metrica, n=None, otros=None, min_facturas=None):
+        """
+        Devuelve los `n` proveedores con mayor valor de la métrica.
+
+        La selección es parcial (`np.argpartition`): solo se ordenan los `n`
+        elegidos, no todos los proveedores. Los empates se resuelven por el orden
+        original de los proveedores.
+
+        Args:
+            metrica: Una de METRICAS.
+            n: Cantidad de proveedores (por defecto TOP_PROVEEDORES).
+            otros: Si es True se agrega al final una fila "Otros (k)" con el resto de
+                los proveedores del ranking (por defecto BARRA_OTROS).
+            min_facturas: Para 'Monto Promedio', facturas con monto mínimas para
+                entrar al ranking (por defecto MIN_FACTURAS_PROMEDIO).
+
+        Returns:
+            ranking: Serie con nombre `metrica` indexada por 'Proveedor Facturador',
+            de mayor a menor.
+        """
+        if n is None:
+            n = TOP_PROVEEDORES
+        if otros is None:
+            otros = BARRA_OTROS
+        if min_facturas is None:
+            min_facturas = MIN_FACTURAS_PROMEDIO
+
+        valores, elegibles = self._valores(metrica, min_facturas)
+        posiciones = np.flatnonzero(elegibles & ~np.isnan(valores))
+        if len(posiciones) > n:
+            candidatos = valores[posiciones]
+            # Umbral del n-ésimo mayor valor; se toman todos los que lo igualan para
+            # resolver los empates por posición de forma estable
+            umbral = candidatos[np.argpartition(-candidatos, n - 1)[n - 1]] if n > 0 else np.inf
+            posiciones = posiciones[candidatos >= umbral]
+        elegidos = posiciones[np.lexsort((posiciones, -valores[posiciones]))][:n]
+
+        nombres = list(self.nombres[elegidos])
+        resultado = list(valores[elegidos])
+        if otros:
+            resto = elegibles & ~np.isnan(valores)
+            resto[elegidos] = False
+            if resto.any():
+                nombres.append('Otros (%d)' % resto.sum())
+                if metrica == 'Monto Promedio':
+                    resultado.append(self.montos[resto].sum() / self.con_monto[resto].sum())
+                else:
+                    resultado.append(valores[resto].sum())
+
+        ranking = pd.Series(
+            np.array(resultado, dtype=float),
+            index=pd.Index(nombres, name='Proveedor Facturador', dtype=object),
+            name=metrica,
+        )
+        if metrica != 'Monto Promedio':
+            # Conteos y montos enteros vuelven a entero, pero de 64 bits: la barra
+            # "Otros" suma muchos proveedores y no entra en el tipo compacto original
+            tipo = (self.facturas if metrica == 'Número de Facturas' else self.montos).dtype
+            if tipo.kind in 'iub':
+                ranking = ranking.astype('int64')
+        return ranking
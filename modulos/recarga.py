@@ -0,0 +1,167 @@
+# modulos/recarga.py
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from modulos.instrumentacion import metricas
+
+registro = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Publicacion:
+    """
+    Versión publicada de los datos: lo que ven todas las peticiones a partir del
+    momento en que se publica.
+
+    Attributes:
+        datos: El dataset (u objeto equivalente) listo para usar.
+        numero: Número de publicación, creciente dentro del proceso (1 la primera).
+        firma: Firma del origen con que se cargaron los datos.
+        momento: Hora (time.time()) de la publicación.
+    """
+    datos: object
+    numero: int
+    firma: object
+    momento: float
+
+
+class Recargador:
+    """
+    Mantiene publicada la última versión de los datos y la renueva en segundo plano.
+
+    Un hilo revisa cada `intervalo` segundos la firma del origen; si cambió, carga y
+    prepara los datos nuevos fuera de las peticiones y recién entonces los publica
+    reemplazando una única referencia. Las peticiones toman la publicación vigente
+    una vez y trabajan con ella hasta terminar, así que nunca ven una mezcla de dos
+    versiones ni esperan a que termine una recarga. Si la carga falla se conserva la
+    versión anterior y se reintenta en la revisión siguiente.
+
+    El hilo se inicia con el primer `vigente()` de cada proceso, así que también
+    funciona en workers creados con fork (por ejemplo, gunicorn --preload).
+
+    Args:
+        cargar: Función sin argumentos que devuelve los datos nuevos.
+        firma: Función sin argumentos que devuelve algo que cambia cuando cambia el origen.
+        intervalo: Segundos entre revisiones (0 o menos desactiva el hilo).
+        preparar: Función opcional que recibe los datos nuevos antes de publicarlos
+            (por ejemplo, para construir índices o precalentar caches).
+        al_publicar: Función opcional que recibe la publicación anterior y la nueva
+            después del reemplazo (por ejemplo, para vaciar caches de la anterior).
+    """
+
+    def __init__(self, cargar, firma, intervalo, preparar=None, al_publicar=None):
+        self._cargar = cargar
+        self._firma = firma
+        self.intervalo = intervalo
+        self._preparar = preparar
+        self._al_publicar = al_publicar
+        self._publicacion = None
+        self._candado = threading.Lock()
+        self._candado_hilo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self.errores = 0
+        self.ultimo_error = None
+
+    def _publicar(self, datos, firma):
+        if self._preparar is not None:
+            self._preparar(datos)
+        anterior = self._publicacion
+        numero = anterior.numero + 1 if anterior is not None else 1
+        # Asignar una referencia es atómico: cada petición ve la publicación anterior
+        # o la nueva completa
+        self._publicacion = Publicacion(datos=datos, numero=numero, firma=firma, momento=time.time())
+        metricas.contar('recarga.publicaciones')
+        if self._al_publicar is not None:
+            self._al_publicar(anterior, self._publicacion)
+        return self._publicacion
+
+    def revisar(self):
+        """
+        Revisa el origen una vez y, si cambió (o aún no hay datos), carga y publica
+        la versión nueva.
+
+        Returns:
+            publicada: True si se publicó una versión nueva.
+        """
+        with self._candado:
+            firma = self._firma()
+            if self._publicacion is not None and firma == self._publicacion.firma:
+                return False
+            with metricas.etapa('recarga'):
+                datos = self._cargar()
+            # La firma se vuelve a tomar porque la carga misma puede cambiarla (por
+            # ejemplo, al reconstruir la cache columnar con una versión nueva)
+            self._publicar(datos, self._firma())
+            return True
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.revisar()
+            except Exception as error:
+                self.errores += 1
+                self.ultimo_error = '%s: %s' % (type(error).__name__, error)
+                metricas.contar('recarga.errores')
+                registro.exception('No se pudieron recargar los datos; se mantiene la versión %d', self._publicacion.numero)
+
+    def iniciar(self):
+        """
+        Inicia el hilo de revisión en este proceso (si no está corriendo).
+        """
+        if self.intervalo <= 0 or (self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive()):
+            return
+        if self._pid is not None and self._pid != os.getpid():
+            # Proceso hijo de un fork: los candados copiados pueden haber quedado tomados
+            self._candado = threading.Lock()
+            self._candado_hilo = threading.Lock()
+        with self._candado_hilo:
+            if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name='recarga-datos', daemon=True)
+            self._pid = os.getpid()
+            self._hilo.start()
+
+    def detener(self):
+        """
+        Detiene el hilo de revisión (la publicación vigente se conserva).
+        """
+        self._detener.set()
+        if self._hilo is not None and self._pid == os.getpid():
+            self._hilo.join()
+        self._hilo = None
+
+    @property
+    def publicacion(self):
+        """
+        Publicación vigente (carga los datos la primera vez).
+        """
+        if self._publicacion is None:
+            self.revisar()
+        return self._publicacion
+
+    def vigente(self):
+        """
+        Devuelve los datos de la publicación vigente, sin esperar ninguna recarga.
+        """
+        self.iniciar()
+        return self.publicacion.datos
+
+    def estado(self):
+        """
+        Número, versión y antigüedad de la publicación vigente, para el endpoint de métricas.
+        """
+        publicacion = self._publicacion
+        return {
+            'numero': publicacion.numero if publicacion else None,
+            'version': getattr(publicacion.datos, 'version', None) if publicacion else None,
+            'antiguedad_s': round(time.time() - publicacion.momento, 1) if publicacion else None,
+            'intervalo_s': self.intervalo,
+            'errores': self.errores,
+            'ultimo_error': self.ultimo_error,
+        }
@@ -0,0 +1,173 @@
+# modulos/reduccion_puntos.py
+import os
+
+import numpy as np
+import pandas as pd
+
+# Máximo de puntos por traza que se envían al navegador cuando no se conoce el
+# ancho del gráfico (del orden de su ancho en píxeles; con más puntos no se ve
+# más detalle)
+MAX_PUNTOS_SERIE = int(os.environ.get('DASHBOARD_MAX_PUNTOS_SERIE', 1500))
+
+# Con el ancho del gráfico en el navegador, puntos por píxel que se envían. El
+# ancho se redondea hacia arriba a múltiplos de PASO_ANCHO (así las figuras de
+# anchos parecidos comparten la cache) y se limita a ANCHO_MAXIMO
+PUNTOS_POR_PIXEL = float(os.environ.get('DASHBOARD_PUNTOS_POR_PIXEL', 2))
+PASO_ANCHO = 100
+ANCHO_MAXIMO = 4000
+
+# Método de reducción: 'lttb' (Largest-Triangle-Three-Buckets, conserva la forma
+# de la curva) o 'minmax' (conserva exactamente el mínimo y el máximo de cada tramo)
+METODO_REDUCCION = os.environ.get('DASHBOARD_REDUCCION', 'lttb')
+
+
+def _como_float(valores):
+    valores = np.asarray(valores)
+    if valores.dtype.kind in 'mM':
+        valores = valores.view(np.int64)
+    return valores.astype(float)
+
+
+def _tramos(inicios, fines):
+    # Posiciones de cada tramo [inicio, fin) como filas de una matriz; las filas más
+    # cortas se completan repitiendo su último punto (la máscara indica los válidos)
+    posiciones = inicios[:, None] + np.arange(max(int((fines - inicios).max()), 1))
+    validas = posiciones < fines[:, None]
+    return np.where(validas, posiciones, np.maximum(fines - 1, inicios)[:, None]), validas
+
+
+def _promedios(valores, inicios, fines):
+    # Promedio de cada tramo [inicio, fin) con sumas acumuladas
+    sumas = np.concatenate(([0.0], np.cumsum(valores)))
+    return (sumas[fines] - sumas[inicios]) / (fines - inicios)
+
+
+def indices_lttb(x, y, max_puntos):
+    """
+    Elige los puntos a conservar con el algoritmo Largest-Triangle-Three-Buckets.
+
+    Se conservan el primer y el último punto; el resto se divide en tramos y de cada
+    tramo se elige el punto que forma el triángulo de mayor área con el promedio del
+    tramo anterior y el del tramo siguiente, lo que preserva los picos. Usar el
+    promedio del tramo anterior (y no el punto elegido en él) hace que los tramos
+    sean independientes y se resuelvan todos juntos con operaciones de numpy.
+
+    Args:
+        x: Arreglo ordenado con las posiciones (números o datetime64).
+        y: Arreglo con los valores.
+        max_puntos: Cantidad de puntos a conservar.
+
+    Returns:
+        indices: Posiciones de los puntos elegidos, en orden.
+    """
+    n = len(x)
+    if max_puntos >= n or max_puntos < 3:
+        return np.arange(n)
+    x = _como_float(x)
+    # Las áreas solo dependen de diferencias: restar el origen evita perder
+    # precisión al acumular fechas en nanosegundos
+    x = x - x[0]
+    y = _como_float(y)
+
+    bordes = np.linspace(1, n - 1, max_puntos - 1).astype(np.intp)
+    inicios, fines = bordes[:-1], bordes[1:]
+    # Tramo anterior (el primer punto para el primer tramo) y siguiente (el último
+    # punto para el último tramo)
+    anteriores_desde = np.concatenate(([0], inicios[:-1]))
+    anteriores_hasta = inicios
+    siguientes_desde = fines
+    siguientes_hasta = np.append(bordes[2:], n)
+    anterior_x = _promedios(x, anteriores_desde, anteriores_hasta)[:, None]
+    anterior_y = _promedios(y, anteriores_desde, anteriores_hasta)[:, None]
+    siguiente_x = _promedios(x, siguientes_desde, siguientes_hasta)[:, None]
+    siguiente_y = _promedios(y, siguientes_desde, siguientes_hasta)[:, None]
+
+    posiciones, validas = _tramos(inicios, fines)
+    areas = np.abs(
+        (anterior_x - siguiente_x) * (y[posiciones] - anterior_y)
+        - (anterior_x - x[posiciones]) * (siguiente_y - anterior_y)
+    )
+    areas[~validas] = -1
+    elegidos = posiciones[np.arange(len(inicios)), np.argmax(areas, axis=1)]
+    return np.concatenate(([0], elegidos, [n - 1]))
+
+
+def indices_min_max(y, max_puntos):
+    """
+    Elige los puntos a conservar guardando el mínimo y el máximo de cada tramo.
+
+    Args:
+        y: Arreglo con los valores (ordenados según su posición).
+        max_puntos: Cantidad máxima de puntos a conservar.
+
+    Returns:
+        indices: Posiciones de los puntos elegidos, en orden y sin repetir.
+    """
+    n = len(y)
+    if max_puntos >= n or max_puntos < 4:
+        return np.arange(n)
+    y = _como_float(y)
+    # El primer y el último punto se agregan aparte
+    bordes = np.linspace(0, n, (max_puntos - 2) // 2 + 1).astype(np.intp)
+    inicios, fines = bordes[:-1], bordes[1:]
+    no_vacios = fines > inicios
+    posiciones, validas = _tramos(inicios[no_vacios], fines[no_vacios])
+    valores = y[posiciones]
+    filas = np.arange(len(posiciones))
+    minimos = posiciones[filas, np.argmin(np.where(validas, valores, np.inf), axis=1)]
+    maximos = posiciones[filas, np.argmax(np.where(validas, valores, -np.inf), axis=1)]
+    return np.unique(np.concatenate(([0, n - 1], minimos, maximos)))
+
+
+def puntos_para_ancho(ancho):
+    """
+    Devuelve el máximo de puntos por traza para un gráfico de `ancho` píxeles.
+
+    Args:
+        ancho: Ancho del gráfico en el navegador, o None si no se conoce.
+
+    Returns:
+        max_puntos: PUNTOS_POR_PIXEL por píxel del ancho redondeado, o
+        MAX_PUNTOS_SERIE sin ancho.
+    """
+    if not ancho or ancho <= 0:
+        return MAX_PUNTOS_SERIE
+    ancho = min(-(-int(ancho) // PASO_ANCHO) * PASO_ANCHO, ANCHO_MAXIMO)
+    return int(ancho * PUNTOS_POR_PIXEL)
+
+
+def reducir_serie(serie, max_puntos=None, rango=None, metodo=None):
+    """
+    Recorta una serie temporal a un rango y reduce sus puntos para dibujarla.
+
+    Args:
+        serie: Serie indexada por fecha (índice ordenado).
+        max_puntos: Máximo de puntos a devolver (por defecto MAX_PUNTOS_SERIE).
+        rango: Tupla (desde, hasta) con el tramo visible; None para toda la serie.
+        metodo: 'lttb' o 'minmax' (por defecto METODO_REDUCCION).
+
+    Returns:
+        serie: Subconjunto de la serie con a lo sumo `max_puntos` puntos. Si el
+        rango no cubre toda la serie se incluye además un punto a cada lado, para
+        que la línea llegue hasta los bordes del gráfico.
+    """
+    if max_puntos is None:
+        max_puntos = MAX_PUNTOS_SERIE
+    if metodo is None:
+        metodo = METODO_REDUCCION
+
+    if rango is not None:
+        desde, hasta = (pd.Timestamp(limite) for limite in rango)
+        inicio = max(int(serie.index.searchsorted(desde, 'left')) - 1, 0)
+        fin = min(int(serie.index.searchsorted(hasta, 'right')) + 1, len(serie))
+        serie = serie.iloc[inicio:fin]
+
+    if len(serie) <= max_puntos:
+        return serie
+    if metodo == 'minmax':
+        indices = indices_min_max(serie.to_numpy(), max_puntos)
+    elif metodo == 'lttb':
+        indices = indices_lttb(serie.index.to_numpy(), serie.to_numpy(), max_puntos)
+    else:
+        raise ValueError('Método de reducción desconocido: %s' % metodo)
+    return serie.iloc[indices]
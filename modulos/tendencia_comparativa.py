@@ -1,89 +1,168 @@
-import pandas as pd
+import os
+
+import numpy as np
 import plotly.graph_objects as go
 
-def crear_tendencia_comparativa_costos(df):
+from modulos.agregados import obtener_agregados
+
+# Cantidad de años que se comparan por defecto (los últimos con datos)
+ANIOS_COMPARATIVA = int(os.environ.get('DASHBOARD_ANIOS_COMPARATIVA', 3))
+
+NOMBRES_MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+# Colores de los años anteriores al último (el último va en amarillo y punteado)
+COLORES_ANIOS = ['deepskyblue', 'orange', 'mediumseagreen', 'orchid', 'salmon', 'lightgray']
+
+
+def elegir_anios(matriz, anios=None):
+    """
+    Devuelve los años a comparar presentes en la matriz año x mes.
+
+    Args:
+        matriz: DataFrame año x mes de los agregados (`por_anio_mes`).
+        anios: None para los últimos ANIOS_COMPARATIVA años, un entero N para los
+            últimos N años o una lista de años concretos.
     """
-    Crea un gráfico comparativo de la tendencia evolutiva de los costos en los años 2023, 2024 y 2025.
-    
+    disponibles = [int(anio) for anio in matriz.index if matriz.loc[anio].notna().any()]
+    if anios is None:
+        anios = ANIOS_COMPARATIVA
+    if isinstance(anios, int):
+        return disponibles[-anios:] if anios > 0 else []
+    return [anio for anio in disponibles if anio in set(int(anio) for anio in anios)]
+
+
+def figura_comparativa(agregados, anios=None, superponer=True, variacion=False):
+    """
+    Calcula las trazas y el diseño del gráfico comparativo a partir de la matriz año x mes.
+
+    Todos los años salen de la misma matriz (una sola agregación), así que comparar
+    más años no agrega cálculos. Los meses fuera del período con datos no se
+    dibujan, por lo que el año en curso llega hasta el último mes con facturas.
+
     Args:
-        df: DataFrame con los datos de facturación (Proveedor, Fecha de Emisión, Monto Total).
-    
+        agregados: Objeto Agregados.
+        anios: Años a comparar (ver `elegir_anios`).
+        superponer: Si es True los años se superponen sobre un eje de meses (Ene a
+            Dic); si es False cada año ocupa sus propias fechas.
+        variacion: Si es True se agregan barras con la variación porcentual respecto
+            del mismo mes del año anterior (eje derecho).
+
     Returns:
-        fig: Figura de plotly con el gráfico de la tendencia comparativa de los costos.
+        trazas: Lista de diccionarios de trazas (con 'type').
+        layout: Diccionario de diseño, sin plantilla.
+    """
+    matriz = agregados.por_anio_mes
+    anios = elegir_anios(matriz, anios)
+    anterior = matriz.shift(1)
+    variaciones = ((matriz - anterior) / anterior).replace([np.inf, -np.inf], np.nan)
+
+    trazas = []
+    barras = []
+    maximo = 0
+    for posicion, anio in enumerate(anios):
+        fila = matriz.loc[anio].dropna()
+        meses = fila.index.to_numpy()
+        if superponer:
+            x = [NOMBRES_MESES[mes - 1] for mes in meses]
+            hovertemplate = '<b>%{x} ' + str(anio) + '</b><br>Monto Total: $%{y:,.0f}<extra></extra>'
+        else:
+            fechas = np.array(['%04d-%02d' % (anio, mes) for mes in meses], dtype='datetime64[M]')
+            x = np.datetime_as_string((fechas + 1).astype('datetime64[D]') - 1, unit='D')
+            x = np.char.add(x, 'T00:00:00')
+            hovertemplate = '<b>%{x}</b><br>Monto Total: $%{y:,.0f}<extra></extra>'
+
+        if posicion == len(anios) - 1 and len(anios) > 1:
+            linea = {'color': 'yellow', 'width': 3, 'dash': 'dot'}
+        else:
+            linea = {'color': COLORES_ANIOS[posicion % len(COLORES_ANIOS)], 'width': 3}
+        trazas.append({
+            'type': 'scatter',
+            'x': x,
+            'y': fila.to_numpy(),
+            'mode': 'lines',
+            'name': str(anio),
+            'line': linea,
+            'hovertemplate': hovertemplate,
+        })
+        if len(fila):
+            maximo = max(maximo, fila.max())
+
+        if variacion:
+            cambio = variaciones.loc[anio, meses]
+            if cambio.notna().any():
+                barras.append({
+                    'type': 'bar',
+                    'x': x,
+                    'y': cambio.to_numpy(),
+                    'name': 'Variación %d' % anio,
+                    'yaxis': 'y2',
+                    'opacity': 0.35,
+                    'marker': {'color': linea['color']},
+                    'hovertemplate': '<b>%{x}</b><br>Variación anual: %{y:+.1%}<extra>' + str(anio) + '</extra>',
+                })
+
+    if superponer:
+        eje_x = {
+            'title': {'text': 'Mes'},
+            'tickangle': 45,
+            'categoryorder': 'array',
+            'categoryarray': NOMBRES_MESES,
+        }
+    else:
+        eje_x = {
+            'title': {'text': 'Fecha de Emisión'},
+            'tickangle': 45,
+            'tickformat': '%b %Y',  # Mostrar las fechas en formato Mes Año (Ene 2024, Feb 2024)
+            'tickmode': 'array',
+            'showticklabels': True,
+        }
+    layout = {
+        'title': {'text': 'Tendencia Evolutiva Comparativa de los Costos ' + ' - '.join(str(anio) for anio in anios), 'x': 0.5},
+        'xaxis': eje_x,
+        'yaxis': {'title': {'text': 'Monto Total'}, 'range': [0, float(maximo)]},
+        'margin': {'l': 50, 'r': 50, 't': 50, 'b': 50},
+        'hovermode': 'closest',
+        'showlegend': True,
+    }
+    if barras:
+        layout['yaxis2'] = {
+            'title': {'text': 'Variación anual'},
+            'overlaying': 'y',
+            'side': 'right',
+            'tickformat': '+.0%',
+            'showgrid': False,
+        }
+        layout['barmode'] = 'group'
+    return barras + trazas, layout
+
+
+def crear_tendencia_comparativa_costos(datos, anios=None, superponer=True, variacion=False):
     """
-    # Asegurarse de que la columna 'Fecha de Emisión' esté en formato datetime
-    df['Fecha de Emisión'] = pd.to_datetime(df['Fecha de Emisión'], format='%d-%m-%Y')
+    Crea un gráfico comparativo de la tendencia mensual de los costos entre años.
 
-    # Filtrar los datos para 2023, 2024 y 2025
-    cost_trend_2023 = df[df['Fecha de Emisión'].dt.year == 2023]
-    cost_trend_2024 = df[df['Fecha de Emisión'].dt.year == 2024]
-    cost_trend_2025 = df[df['Fecha de Emisión'].dt.year == 2025]
+    Por defecto compara los últimos ANIOS_COMPARATIVA años superpuestos sobre un eje
+    de meses, de modo que cada mes se compara directamente con el del año anterior.
 
-    # Agrupar los datos por mes y año, sumando el monto total para 2023, 2024 y 2025
-    cost_trend_2023_monthly = cost_trend_2023.groupby(pd.Grouper(key='Fecha de Emisión', freq='ME'))['Monto Total'].sum().reset_index()
-    cost_trend_2024_monthly = cost_trend_2024.groupby(pd.Grouper(key='Fecha de Emisión', freq='ME'))['Monto Total'].sum().reset_index()
-    cost_trend_2025_monthly = cost_trend_2025.groupby(pd.Grouper(key='Fecha de Emisión', freq='ME'))['Monto Total'].sum().reset_index()
+    Args:
+        datos: Agregados precalculados (o DataFrame con los datos de facturación).
+        anios: Años a comparar: None (los últimos ANIOS_COMPARATIVA), un entero N
+            (los últimos N) o una lista de años.
+        superponer: Superponer los años sobre un eje de meses (True) o dibujarlos
+            uno a continuación del otro sobre el eje de fechas (False).
+        variacion: Agregar la variación porcentual respecto del año anterior.
 
-    # Filtrar solo los primeros tres meses de 2025
-    cost_trend_2025_monthly = cost_trend_2025_monthly[cost_trend_2025_monthly['Fecha de Emisión'].dt.month <= 3]
+    Returns:
+        fig: Figura de plotly con el gráfico de la tendencia comparativa de los costos.
+    """
+    trazas, layout = figura_comparativa(obtener_agregados(datos), anios, superponer, variacion)
 
-    # Crear una figura para mostrar las tres líneas comparativas en el mismo gráfico
+    # Las barras de variación van detrás de las líneas
     fig = go.Figure()
+    for traza in trazas:
+        fig.add_trace(traza)
 
-    # Añadir la línea para 2023
-    fig.add_trace(go.Scatter(
-        x=cost_trend_2023_monthly['Fecha de Emisión'],
-        y=cost_trend_2023_monthly['Monto Total'],
-        mode='lines',
-        name='2023',
-        line=dict(color='deepskyblue', width=3),  # Color de la línea para 2023
-    ))
-
-    # Añadir la línea para 2024
-    fig.add_trace(go.Scatter(
-        x=cost_trend_2024_monthly['Fecha de Emisión'],
-        y=cost_trend_2024_monthly['Monto Total'],
-        mode='lines',
-        name='2024',
-        line=dict(color='orange', width=3),  # Color de la línea para 2024
-    ))
-
-    # Añadir la línea para 2025 (solo los primeros tres meses)
-    fig.add_trace(go.Scatter(
-        x=cost_trend_2025_monthly['Fecha de Emisión'],
-        y=cost_trend_2025_monthly['Monto Total'],
-        mode='lines',
-        name='2025',
-        line=dict(color='yellow', width=3, dash='dot'),  # Línea para 2025, en color amarillo y con línea discontinua
-    ))
-
-    # Mejorar el diseño del gráfico
-    fig.update_layout(
-        title='Tendencia Evolutiva Comparativa de los Costos 2023 - 2024 - 2025',
-        xaxis_title='Fecha de Emisión',
-        yaxis_title='Monto Total',
-        xaxis_tickangle=45,
-        template='plotly_dark',  # Estilo oscuro para un look profesional
-        title_x=0.5,
-        margin={'l': 50, 'r': 50, 't': 50, 'b': 50},  # Ajustar márgenes
-        hovermode="closest",             # Mejor interacción con los puntos
-        showlegend=True,                 # Mostrar leyenda para identificar las líneas de 2023, 2024 y 2025
-        yaxis=dict(range=[0, max(cost_trend_2023_monthly['Monto Total'].max(),
-                                 cost_trend_2024_monthly['Monto Total'].max(),
-                                 cost_trend_2025_monthly['Monto Total'].max())]),  # Ajustar rango del eje Y
-    )
-
-    # Mejorar la visualización de las fechas (Ajustar el formato de fecha)
-    fig.update_xaxes(
-        tickformat="%b %Y",  # Mostrar las fechas en formato Mes Año (Ene 2024, Feb 2024)
-        tickmode='array',    # Para asegurar que las fechas se muestren bien
-        showticklabels=True  # Mostrar las etiquetas de las fechas en el eje X
-    )
-
-    # Cambiar la visualización del tooltip para mostrar la fecha completa al pasar el cursor
-    fig.update_traces(
-        hovertemplate="<b>%{x}</b><br>Monto Total: $%{y:,.0f}<extra></extra>",  # Fecha completa en el hover
-    )
+    # Estilo oscuro para un look profesional, márgenes ajustados y rango del eje Y
+    # desde 0 hasta el mayor monto mensual de los años comparados
+    fig.update_layout(template='plotly_dark', **layout)
 
     return fig
-
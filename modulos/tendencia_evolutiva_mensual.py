@@ -1,21 +1,19 @@
-import pandas as pd
 import plotly.express as px
 
-def crear_tendencia_mensual_costos(df):
+from modulos.agregados import obtener_agregados
+
+def crear_tendencia_mensual_costos(datos):
     """
     Crea un gráfico de línea para la tendencia evolutiva mensual de los costos en el tiempo.
     
     Args:
-        df: DataFrame con los datos de proveedores.
+        datos: Agregados precalculados (o DataFrame con los datos de proveedores).
     
     Returns:
         fig: Figura de plotly con el gráfico de la tendencia evolutiva de los costos.
     """
-    # Asegurar que la columna 'Fecha de Emisión' esté en formato datetime
-    df['Fecha de Emisión'] = pd.to_datetime(df['Fecha de Emisión'], format='%d-%m-%Y')
-
-    # Agrupar los datos por mes y año, sumando el monto total
-    cost_trend_monthly = df.groupby(pd.Grouper(key='Fecha de Emisión', freq='ME'))['Monto Total'].sum().reset_index()
+    # Monto total por mes (ya agrupado en los agregados)
+    cost_trend_monthly = obtener_agregados(datos).por_mes.reset_index()
 
     # Crear el gráfico de línea de tendencia usando Plotly
     fig = px.line(
@@ -0,0 +1,64 @@
+# tests/conftest.py
+import pandas as pd
+import pytest
+
+from modulos.agregados import COLUMNAS_FECHAS
+from modulos.benchmark import escribir_fuente, generar_facturas
+
+
+@pytest.fixture
+def facturas():
+    """
+    Facturas sintéticas con el esquema de data_proveedores.xlsx (unas pocas sin
+    recepción ni pago, ver `generar_facturas`).
+    """
+    return generar_facturas(3000, 40, semilla=7)
+
+
+@pytest.fixture
+def ruta_csv(tmp_path, facturas):
+    """
+    Archivo csv con las facturas sintéticas, con las fechas en dd-mm-aaaa.
+    """
+    ruta = str(tmp_path / 'facturas.csv')
+    escribir_fuente(facturas, ruta)
+    return ruta
+
+
+def _ordenar(tabla, columnas):
+    return tabla.sort_values(columnas).reset_index(drop=True)
+
+
+def comparar_agregados(obtenidos, esperados, con_fechas=True):
+    """
+    Comprueba que dos Agregados tengan los mismos valores (sin importar el orden de
+    las filas ni si los proveedores vienen como texto o como categoría).
+    """
+    por_proveedor = obtenidos.por_proveedor.copy()
+    por_proveedor.index = por_proveedor.index.astype(str)
+    esperado = esperados.por_proveedor.copy()
+    esperado.index = esperado.index.astype(str)
+    pd.testing.assert_frame_equal(
+        por_proveedor.sort_index(), esperado.sort_index(), check_dtype=False, check_names=False,
+        check_index_type=False, check_like=True,
+    )
+    # Las fechas pueden venir en ns o en us según de dónde se leyeron
+    pd.testing.assert_series_equal(
+        obtenidos.por_dia, esperados.por_dia, check_dtype=False, check_names=False, check_freq=False, check_index_type=False,
+    )
+    pd.testing.assert_series_equal(obtenidos.por_mes, esperados.por_mes, check_dtype=False, check_freq=False, check_index_type=False)
+    pd.testing.assert_frame_equal(obtenidos.por_anio_mes, esperados.por_anio_mes, check_dtype=False)
+
+    if con_fechas:
+        tipos = dict(dict.fromkeys(COLUMNAS_FECHAS, 'datetime64[ns]'), Facturas='int64')
+        pd.testing.assert_frame_equal(
+            _ordenar(obtenidos.por_fechas.astype(tipos), COLUMNAS_FECHAS),
+            _ordenar(esperados.por_fechas.astype(tipos), COLUMNAS_FECHAS),
+        )
+
+    claves = ['Proveedor Facturador', 'Mes', 'Medida', 'Dias']
+    latencias = [
+        _ordenar(tabla.astype({'Proveedor Facturador': str, 'Mes': 'datetime64[ns]', 'Medida': str}), claves)
+        for tabla in (obtenidos.latencias, esperados.latencias)
+    ]
+    pd.testing.assert_frame_equal(latencias[0], latencias[1], check_dtype=False)
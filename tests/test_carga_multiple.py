@@ -0,0 +1,60 @@
+# tests/test_carga_multiple.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.benchmark import escribir_fuente
+from modulos.carga_multiple import cargar_fuentes, concatenar_facturas
+
+
+def test_concatenar_numeros_de_distinto_ancho():
+    partes = [
+        pd.DataFrame({'Monto Total': np.array([1, 2], dtype=np.int32)}),
+        pd.DataFrame({'Monto Total': np.array([3.5], dtype=np.float64)}),
+        pd.DataFrame({'Monto Total': np.array([2 ** 40], dtype=np.int64)}),
+    ]
+    df = concatenar_facturas(partes)
+    assert df['Monto Total'].dtype == np.float64
+    assert df['Monto Total'].tolist() == [1, 2, 3.5, 2 ** 40]
+
+
+def test_concatenar_numeros_y_texto():
+    # 'Nº Factura' numérico en un archivo y con prefijo en otro: se une como texto
+    partes = [
+        pd.DataFrame({'Nº Factura': np.array([10, 11], dtype=np.int64)}),
+        pd.DataFrame({'Nº Factura': pd.Categorical(['F-12', None])}),
+    ]
+    df = concatenar_facturas(partes)
+    assert isinstance(df['Nº Factura'].dtype, pd.CategoricalDtype)
+    assert df['Nº Factura'].astype(object).where(df['Nº Factura'].notna(), None).tolist() == ['10', '11', 'F-12', None]
+
+
+def test_concatenar_categorias_distintas():
+    partes = [
+        pd.DataFrame({'Proveedor Facturador': pd.Categorical(['A', 'B'])}),
+        pd.DataFrame({'Proveedor Facturador': pd.Categorical(['C', 'A'])}),
+    ]
+    df = concatenar_facturas(partes)
+    assert isinstance(df['Proveedor Facturador'].dtype, pd.CategoricalDtype)
+    assert df['Proveedor Facturador'].astype(str).tolist() == ['A', 'B', 'C', 'A']
+
+
+def test_concatenar_columnas_distintas():
+    with pytest.raises(ValueError):
+        concatenar_facturas([pd.DataFrame({'a': [1]}), pd.DataFrame({'b': [1]})])
+
+
+def test_cargar_fuentes_con_tipos_distintos(tmp_path, facturas):
+    carpeta = tmp_path / 'datos'
+    carpeta.mkdir()
+    escribir_fuente(facturas.iloc[:1500], str(carpeta / 'a.csv'))
+    segunda = facturas.iloc[1500:].copy()
+    segunda['Nº Factura'] = 'F-' + segunda['Nº Factura'].astype(str)
+    escribir_fuente(segunda, str(carpeta / 'b.csv'))
+
+    df, agregados, _, leidos = cargar_fuentes(str(carpeta), str(tmp_path / 'cache'), trabajadores=1)
+    assert len(df) == len(facturas) and len(leidos) == 2
+    numeros = df['Nº Factura'].astype(str)
+    assert numeros.iloc[0] == str(facturas['Nº Factura'].iloc[0])
+    assert numeros.iloc[-1] == 'F-%d' % facturas['Nº Factura'].iloc[-1]
+    assert agregados.por_proveedor['Número de Facturas'].sum() == len(facturas)
@@ -0,0 +1,14 @@
+# tests/test_carga_por_bloques.py
+import pytest
+
+from modulos.agregados import calcular_agregados
+from modulos.carga_por_bloques import agregar_por_bloques
+from modulos.cargar_datos import cargar_datos
+
+from conftest import comparar_agregados
+
+
+@pytest.mark.parametrize('tamano_bloque', [97, 1000, 10000])
+def test_agregar_por_bloques_igual_a_calcular_agregados(ruta_csv, tmp_path, tamano_bloque):
+    esperados = calcular_agregados(cargar_datos(ruta_csv, str(tmp_path / 'cache')))
+    comparar_agregados(agregar_por_bloques(ruta_csv, tamano_bloque), esperados)
@@ -0,0 +1,77 @@
+# tests/test_cargar_datos.py
+import os
+
+import pandas as pd
+import pytest
+
+from modulos import cargar_datos as modulo
+from modulos.benchmark import escribir_fuente
+from modulos.cargar_datos import cache_vigente, cargar_datos, cargar_datos_versionados, version_datos
+
+
+def _sin_leer_fuente(monkeypatch):
+    # Falla si se vuelve a leer el archivo de origen (la carga tiene que salir de la cache)
+    def leer_fuente(ruta):
+        raise AssertionError('se leyó el archivo de origen: %s' % ruta)
+    monkeypatch.setattr(modulo, 'leer_fuente', leer_fuente)
+
+
+def test_primera_carga_igual_a_las_siguientes(ruta_csv, tmp_path):
+    primera = cargar_datos(ruta_csv, str(tmp_path / 'cache'))
+    siguiente = cargar_datos(ruta_csv, str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(primera, siguiente)
+    assert isinstance(primera['Proveedor Facturador'].dtype, pd.CategoricalDtype)
+
+
+def test_cache_vigente_sin_cambios(ruta_csv, tmp_path, monkeypatch):
+    directorio = str(tmp_path / 'cache')
+    esperado = cargar_datos(ruta_csv, directorio)
+    version = version_datos(ruta_csv, directorio)
+    assert cache_vigente(ruta_csv, directorio)
+
+    _sin_leer_fuente(monkeypatch)
+    pd.testing.assert_frame_equal(cargar_datos(ruta_csv, directorio), esperado)
+    assert version_datos(ruta_csv, directorio) == version
+
+
+def test_cambio_de_fecha_con_el_mismo_contenido_no_reconstruye(ruta_csv, tmp_path, monkeypatch):
+    directorio = str(tmp_path / 'cache')
+    cargar_datos(ruta_csv, directorio)
+    version = version_datos(ruta_csv, directorio)
+    info = os.stat(ruta_csv)
+    os.utime(ruta_csv, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+
+    # El hash coincide: la cache sigue vigente y se actualiza la fecha guardada
+    _sin_leer_fuente(monkeypatch)
+    assert cache_vigente(ruta_csv, directorio)
+    cargar_datos(ruta_csv, directorio)
+    assert version_datos(ruta_csv, directorio) == version
+
+
+@pytest.mark.parametrize('mismo_tamano', [False, True])
+def test_cambio_de_contenido_reconstruye(ruta_csv, tmp_path, facturas, mismo_tamano):
+    directorio = str(tmp_path / 'cache')
+    cargar_datos(ruta_csv, directorio)
+    version = version_datos(ruta_csv, directorio)
+
+    if mismo_tamano:
+        # Otro contenido con el mismo tamaño (y otra fecha de modificación)
+        with open(ruta_csv, 'rb') as archivo:
+            contenido = archivo.read()
+        posicion = contenido.index(b'PROVEEDOR 000000')
+        contenido = contenido[:posicion] + b'PROVEEDOR 999999' + contenido[posicion + 16:]
+        with open(ruta_csv, 'wb') as archivo:
+            archivo.write(contenido)
+        info = os.stat(ruta_csv)
+        os.utime(ruta_csv, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+    else:
+        escribir_fuente(facturas.iloc[:1000], ruta_csv)
+
+    assert not cache_vigente(ruta_csv, directorio)
+    df, agregados, nueva_version = cargar_datos_versionados(ruta_csv, directorio)
+    assert nueva_version != version
+    if mismo_tamano:
+        assert 'PROVEEDOR 999999 S.A.' in set(df['Proveedor Facturador'].astype(str))
+    else:
+        assert len(df) == 1000
+        assert agregados.por_proveedor['Número de Facturas'].sum() == 1000
@@ -0,0 +1,50 @@
+# tests/test_figuras_rapidas.py
+import pytest
+
+from modulos import figuras_rapidas
+from modulos.benchmark import generar_facturas
+from modulos.dataset import crear_dataset, filtrar_dataset
+from modulos.figuras_rapidas import verificar_figura
+
+RAPIDAS = [
+    figuras_rapidas.crear_barras_proveedores_top,
+    figuras_rapidas.crear_barras_monto_total,
+    figuras_rapidas.crear_barras_monto_promedio,
+    figuras_rapidas.crear_tendencia_costos,
+    figuras_rapidas.crear_tendencia_mensual_costos,
+    figuras_rapidas.crear_tendencia_comparativa_costos,
+]
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return crear_dataset(generar_facturas(3000, 40, semilla=7))
+
+
+@pytest.mark.parametrize('crear', RAPIDAS, ids=lambda crear: crear.__name__)
+def test_figura_rapida_igual_a_plotly(crear, dataset):
+    verificar_figura(crear(dataset), crear.referencia(dataset), crear.__name__)
+
+
+@pytest.mark.parametrize('crear', RAPIDAS, ids=lambda crear: crear.__name__)
+def test_figura_rapida_filtrada_igual_a_plotly(crear, dataset):
+    filtrado = filtrar_dataset(dataset, '2024-01-01', None, ['PROVEEDOR 000001 S.A.', 'PROVEEDOR 000003 S.A.'])
+    verificar_figura(crear(filtrado), crear.referencia(filtrado), crear.__name__)
+
+
+@pytest.mark.parametrize('argumentos', [
+    {'max_puntos': 100},
+    {'rango_x': ('2024-02-01', '2024-05-31')},
+    {'rango_x': ('2024-02-01', '2024-05-31'), 'max_puntos': 20},
+])
+def test_tendencia_diaria_reducida_igual_a_plotly(argumentos, dataset):
+    crear = figuras_rapidas.crear_tendencia_costos
+    verificar_figura(crear(dataset, **argumentos), crear.referencia(dataset, **argumentos), crear.__name__)
+
+
+def test_verificar_figura_detecta_diferencias(dataset):
+    crear = figuras_rapidas.crear_barras_monto_total
+    figura = crear(dataset)
+    figura['layout']['title']['text'] = 'Otro título'
+    with pytest.raises(ValueError):
+        verificar_figura(figura, crear.referencia(dataset), crear.__name__)
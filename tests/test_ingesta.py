@@ -0,0 +1,28 @@
+# tests/test_ingesta.py
+import pandas as pd
+
+from modulos.agregados import calcular_agregados
+from modulos.benchmark import escribir_fuente
+from modulos.cargar_datos import cargar_datos_versionados, version_datos
+from modulos.ingesta import anexar_lote
+
+from conftest import comparar_agregados
+
+
+def test_anexar_lote_igual_a_recargar_todo(tmp_path, facturas):
+    historico = str(tmp_path / 'historico.csv')
+    lote = str(tmp_path / 'lote.csv')
+    completo = str(tmp_path / 'completo.csv')
+    escribir_fuente(facturas.iloc[:2000], historico)
+    escribir_fuente(facturas.iloc[2000:], lote)
+    escribir_fuente(facturas, completo)
+    directorio = str(tmp_path / 'cache')
+
+    version = anexar_lote(lote, historico, directorio)
+    assert version == version_datos(historico, directorio)
+
+    df, agregados, _ = cargar_datos_versionados(historico, directorio)
+    esperado, esperados, _ = cargar_datos_versionados(completo, directorio)
+    pd.testing.assert_frame_equal(df.astype(str), esperado.astype(str))
+    comparar_agregados(agregados, esperados)
+    comparar_agregados(agregados, calcular_agregados(esperado))
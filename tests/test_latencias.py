@@ -0,0 +1,44 @@
+# tests/test_latencias.py
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from modulos.agregados import calcular_agregados, combinar_agregados
+from modulos.cargar_datos import cargar_datos
+
+from conftest import comparar_agregados
+
+
+def _partes(df, cortes):
+    return [df.iloc[inicio:fin].reset_index(drop=True) for inicio, fin in zip([0] + cortes, cortes + [len(df)])]
+
+
+def test_combinar_agregados_es_asociativo(ruta_csv, tmp_path):
+    df = cargar_datos(ruta_csv, str(tmp_path / 'cache'))
+    a, b, c = (calcular_agregados(parte) for parte in _partes(df, [700, 1900]))
+    izquierda = combinar_agregados(combinar_agregados(a, b), c)
+    derecha = combinar_agregados(a, combinar_agregados(b, c))
+    completo = calcular_agregados(df)
+
+    comparar_agregados(izquierda, derecha)
+    comparar_agregados(izquierda, completo)
+    for estadisticas in ('latencia_por_proveedor', 'latencia_por_mes'):
+        pd.testing.assert_frame_equal(getattr(izquierda, estadisticas), getattr(derecha, estadisticas), check_dtype=False)
+        pd.testing.assert_frame_equal(getattr(izquierda, estadisticas), getattr(completo, estadisticas), check_dtype=False)
+
+
+def test_estadisticas_de_latencia(ruta_csv, tmp_path):
+    df = cargar_datos(ruta_csv, str(tmp_path / 'cache'))
+    estadisticas = calcular_agregados(df).latencia_por_proveedor
+    proveedor = 'PROVEEDOR 000002 S.A.'
+    facturas = df[df['Proveedor Facturador'] == proveedor]
+    dias = (facturas['Fecha Recepción'] - facturas['Fecha de Emisión']).dt.days.dropna().to_numpy()
+
+    # Las demoras sintéticas son de pocos días: los percentiles son exactos
+    fila = estadisticas.xs(proveedor, level='Proveedor Facturador').iloc[0]
+    assert fila['Facturas'] == len(dias)
+    assert np.isclose(fila['Promedio'], dias.mean())
+    ordenados = np.sort(dias)
+    assert fila['Mediana'] == ordenados[int(np.ceil(0.5 * len(dias))) - 1]
+    assert fila['P90'] == ordenados[int(np.ceil(0.9 * len(dias))) - 1]
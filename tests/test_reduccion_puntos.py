@@ -0,0 +1,68 @@
+# tests/test_reduccion_puntos.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.reduccion_puntos import (
+    MAX_PUNTOS_SERIE, PUNTOS_POR_PIXEL, indices_lttb, indices_min_max, puntos_para_ancho, reducir_serie,
+)
+
+
+def _serie_con_picos(n=10000):
+    rng = np.random.default_rng(3)
+    y = rng.normal(size=n)
+    y[1234] = 50
+    y[7777] = -50
+    return np.arange(n) * 86400 * 10 ** 9, y
+
+
+@pytest.mark.parametrize('max_puntos', [3, 10, 100, 1500])
+def test_lttb_conserva_los_extremos(max_puntos):
+    x, y = _serie_con_picos()
+    indices = indices_lttb(x, y, max_puntos)
+    assert len(indices) == max_puntos
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+    if max_puntos > 3:
+        assert {1234, 7777} <= set(indices.tolist())
+
+
+def test_lttb_sin_reducir():
+    x, y = np.arange(50), np.random.default_rng(3).normal(size=50)
+    assert np.array_equal(indices_lttb(x, y, 50), np.arange(50))
+    assert np.array_equal(indices_lttb(x, y, 2), np.arange(50))
+
+
+def test_lttb_con_fechas():
+    x, y = _serie_con_picos()
+    assert np.array_equal(indices_lttb(x.astype('datetime64[ns]'), y, 200), indices_lttb(x, y, 200))
+
+
+@pytest.mark.parametrize('max_puntos', [4, 11, 300])
+def test_min_max_conserva_minimo_y_maximo_de_cada_tramo(max_puntos):
+    _, y = _serie_con_picos()
+    indices = indices_min_max(y, max_puntos)
+    assert len(indices) <= max_puntos
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.all(np.diff(indices) > 0)
+    assert {int(np.argmin(y)), int(np.argmax(y))} <= set(indices.tolist())
+    bordes = np.linspace(0, len(y), (max_puntos - 2) // 2 + 1).astype(np.intp)
+    for inicio, fin in zip(bordes[:-1], bordes[1:]):
+        assert inicio + int(np.argmax(y[inicio:fin])) in indices
+        assert inicio + int(np.argmin(y[inicio:fin])) in indices
+
+
+def test_reducir_serie_con_rango():
+    x, y = _serie_con_picos()
+    serie = pd.Series(y, index=pd.DatetimeIndex(x.astype('datetime64[ns]')))
+    reducida = reducir_serie(serie, 100, (serie.index[2000], serie.index[3000]))
+    assert len(reducida) == 100
+    assert reducida.index[0] == serie.index[1999] and reducida.index[-1] == serie.index[3001]
+
+
+def test_puntos_para_ancho():
+    assert puntos_para_ancho(None) == MAX_PUNTOS_SERIE
+    assert puntos_para_ancho(0) == MAX_PUNTOS_SERIE
+    assert puntos_para_ancho(640) == int(700 * PUNTOS_POR_PIXEL)
+    assert puntos_para_ancho(700) == int(700 * PUNTOS_POR_PIXEL)
+    assert puntos_para_ancho(10 ** 6) == puntos_para_ancho(10 ** 7)